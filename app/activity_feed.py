@@ -0,0 +1,118 @@
+from sqlalchemy import text
+
+# ==== Activity feed ====
+# ActivityFeed is an append-only log of what students do in classes: lesson
+# started / completed, activity submitted, submission graded. Each event is
+# appended in the transaction that made the change, with the class, its
+# section and the section adviser (teacher_id) resolved in the same INSERT
+# ... SELECT, so a dashboard reads the latest N events of a teacher, section
+# or class with one backward range scan of (key, id). Ids are assigned in
+# insertion order and stand in for time.
+#
+# The table has no foreign keys (appends stay cheap and events outlive what
+# they mention): reads skip events of deleted classes / students and show
+# deleted lessons and activities without a title. Old events are removed by
+# age with `flask prune-activity-feed`.
+
+EVENT_LESSON_STARTED = "lesson_started"
+EVENT_LESSON_COMPLETED = "lesson_completed"
+EVENT_ACTIVITY_SUBMITTED = "activity_submitted"
+EVENT_SUBMISSION_GRADED = "submission_graded"
+
+FEED_SIZE = 15
+FEED_RETENTION_DAYS = 180
+PRUNE_BATCH = 5000
+
+FEED_SCOPES = {
+    "teacher": "teacher_id",
+    "section": "section_id",
+    "class": "class_id",
+}
+
+# {column} is one of FEED_SCOPES
+RECENT_EVENTS_QUERY = """
+    SELECT
+        f.id,
+        f.event_type,
+        f.created_at,
+        f.score,
+        f.class_id,
+        CONCAT(u.first_name, ' ', u.last_name) AS student_name,
+        sub.name AS subject_name,
+        c.status AS class_status,
+        l.title AS lesson_title,
+        a.title AS activity_title,
+        a.max_score
+    FROM (
+        SELECT * FROM ActivityFeed
+        WHERE {column} = :scope_id AND id > :after_id
+        ORDER BY id DESC
+        LIMIT :limit
+    ) f
+    JOIN StudentProfile sp ON sp.id = f.student_id
+    JOIN Users u ON u.id = sp.user_id
+    JOIN Class c ON c.id = f.class_id
+    JOIN Subject sub ON sub.id = c.subject_id
+    LEFT JOIN Lesson l ON l.id = f.lesson_id
+    LEFT JOIN Activity a ON a.id = f.activity_id
+    ORDER BY f.id DESC
+"""
+
+# =======================
+# Writes
+# =======================
+def log_lesson_event(db, event_type, student_id, lesson_id):
+    """Append a lesson event. Does not commit."""
+    db.session.execute(text("""
+        INSERT INTO ActivityFeed (event_type, teacher_id, section_id, class_id, student_id, lesson_id)
+        SELECT :event_type, sec.teacher_id, c.section_id, c.id, :student_id, l.id
+        FROM Lesson l
+        JOIN Class c ON c.id = l.class_id
+        JOIN Section sec ON sec.id = c.section_id
+        WHERE l.id = :lesson_id
+    """), {"event_type": event_type, "student_id": student_id, "lesson_id": lesson_id})
+
+
+def log_activity_event(db, event_type, student_id, activity_id, score=None):
+    """Append an activity event (`score` for grades). Does not commit."""
+    db.session.execute(text("""
+        INSERT INTO ActivityFeed
+            (event_type, teacher_id, section_id, class_id, student_id, lesson_id, activity_id, score)
+        SELECT :event_type, sec.teacher_id, c.section_id, c.id, :student_id, a.lesson_id, a.id, :score
+        FROM Activity a
+        JOIN Class c ON c.id = a.class_id
+        JOIN Section sec ON sec.id = c.section_id
+        WHERE a.id = :activity_id
+    """), {"event_type": event_type, "student_id": student_id, "activity_id": activity_id, "score": score})
+
+
+def prune_activity_feed(db, days=FEED_RETENTION_DAYS, batch=PRUNE_BATCH):
+    """Delete events older than `days` in batches, committing each. Returns rows deleted."""
+    deleted = 0
+    while True:
+        count = db.session.execute(text("""
+            DELETE FROM ActivityFeed
+            WHERE created_at < NOW() - INTERVAL :days DAY
+            LIMIT :batch
+        """), {"days": days, "batch": batch}).rowcount
+        db.session.commit()
+        deleted += count
+        if count < batch:
+            return deleted
+
+
+# =======================
+# Reads
+# =======================
+def recent_events(db, scope, scope_id, limit=FEED_SIZE, after_id=0):
+    """
+    The latest `limit` events of a teacher, section or class, newest first;
+    with `after_id`, only events newer than that one (live page updates).
+    """
+    if scope not in FEED_SCOPES:
+        raise ValueError(f"Unknown feed scope: {scope}")
+
+    return db.session.execute(
+        text(RECENT_EVENTS_QUERY.format(column=FEED_SCOPES[scope])),
+        {"scope_id": scope_id, "limit": limit, "after_id": after_id}
+    ).mappings().all()
@@ -7,112 +7,113 @@ from helpers import *
 from database import db
 from datetime import datetime
 from decorators import role_required
+from query_stats import recent_request_list, endpoint_summary, reset_query_stats
+from identity import invalidate_identity
+from reference_data import bump_ref_version, ref_rows
+from search import search_filter
+from pagination import paginate, wants_json, page_json
+import roster_import
+from school_ids import next_school_id, preview_school_id
+from enrollment import enroll_section, enrollment_message
+from enrollment_index import enrollment_index
+from dashboard_stats import (
+    get_dashboard_stats, bump, on_user_status_changed, on_user_deleted,
+    on_student_course_changed, on_teacher_department_changed, on_bucket_deleted
+)
 
 # ==== GLOBAL VARIABLES ====
 ADMIN_DELETABLE_ROWS = ("Users", "Subject", "Course", "Department", "Section", "Class")
 NOW = datetime.now()
 ACADEMIC_YEAR = str(NOW.year) + '-' + str((NOW.year + 1))
 
-admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
-
-# =======================
-# API(AJAX)
-# =======================
-@admin_bp.route("/api/sections/search", methods=["GET"])
-@login_required
-def search_sections():
-    """
-    Search sections dynamically by education level, course, year, or section name.
-    Supports partial matches for easier search.
-    """
-    education_lvl = request.args.get("education_level_id")
-    query_text = request.args.get("q", "").strip()  # user search input
-
-    sql = """
-        SELECT Section.id, Section.name AS section_name,
-               Course.name AS course_name,
-               YearLevel.name AS year_name
-        FROM Section
-        LEFT JOIN Course ON Section.course_id = Course.id
-        LEFT JOIN YearLevel ON Section.year_id = YearLevel.id
-        WHERE 1=1
-    """
-    params = {}
-
-    if education_lvl:
-        sql += " AND YearLevel.education_level_id = :education_lvl"
-        params["education_lvl"] = education_lvl
-
-    if query_text:
-        sql += """ AND (
-            Section.name LIKE :q OR
-            Course.name LIKE :q OR
-            YearLevel.name LIKE :q
-        )"""
-        params["q"] = f"%{query_text}%"
-
-    sql += " ORDER BY Section.name ASC"
-
-    results = db.session.execute(text(sql), params).mappings().all()
-    # Return combined display text for easy searching
-    return jsonify([
-        {"id": r["id"], "text": f"{r['course_name']} - {r['year_name']} - {r['section_name']}"}
-        for r in results
-    ])
-
-def next_id_preview():
-    """
-    Returns the next ID for display purposes only (does NOT save/increment the counter).
-    """
-    now = datetime.now()
-    year = now.year
-    START_COUNTER = 1111  # <-- start from 1111
-
-    result = db.session.execute(
-        text("SELECT counter FROM IdCounter WHERE year = :year"),
-        {"year": year}
-    ).fetchone()
-
-    if result is None:
-        counter = START_COUNTER
-    else:
-        counter = result[0] + 1
-
-    return f"{str(counter).zfill(4)}{year}"
-
-def generate_next_id():
-    """
-    Increment the counter in IdCounter and return a new school ID.
-    Format: YEAR + 4-digit counter, e.g., 20251111
-    """
-    now = datetime.now()
-    year = now.year
-    START_COUNTER = 1000
-
-
-    result = db.session.execute(
-        text("SELECT counter FROM IdCounter WHERE year = :year"),
-        {"year": year}
-    ).fetchone()
-
-    if result is None:
-        counter = START_COUNTER
-        # Insert initial row
-        db.session.execute(
-            text("INSERT INTO IdCounter (year, counter) VALUES (:year, :counter)"),
-            {"year": year, "counter": counter}
-        )
-    else:
-        counter = result[0] + 1
-        # Update counter
-        db.session.execute(
-            text("UPDATE IdCounter SET counter = :counter WHERE year = :year"),
-            {"counter": counter, "year": year}
-        )
-
-    # Return formatted ID: YEAR + 4-digit counter
-    return f"{str(counter).zfill(4)}{year}"
+# Server-side sort keys for the paginated lists (see pagination.py).
+# The last column of each is unique so pages never overlap.
+PERSON_NAME_SORT = [("Users.last_name", "last_name"), ("Users.first_name", "first_name"), ("Users.id", "user_id")]
+STUDENT_SORTS = {
+    "name": PERSON_NAME_SORT,
+    "school_id": [("COALESCE(Users.school_id, '')", "school_id"), ("Users.id", "user_id")],
+    "course": [("COALESCE(Course.name, '')", "course_name")] + PERSON_NAME_SORT,
+    "section": [("COALESCE(Section.name, '')", "section_name")] + PERSON_NAME_SORT,
+    "year": [("COALESCE(YearLevel.name, '')", "academic_year_name")] + PERSON_NAME_SORT,
+}
+TEACHER_SORTS = {
+    "name": PERSON_NAME_SORT,
+    "school_id": [("COALESCE(Users.school_id, '')", "school_id"), ("Users.id", "user_id")],
+    "department": [("COALESCE(Department.name, '')", "department_name")] + PERSON_NAME_SORT,
+}
+SECTION_SORTS = {
+    "name": [("Section.name", "section_name"), ("Section.id", "section_id")],
+    "course": [("COALESCE(Course.name, '')", "course_name"), ("Section.name", "section_name"), ("Section.id", "section_id")],
+    "year": [("COALESCE(YearLevel.name, '')", "year_name"), ("Section.name", "section_name"), ("Section.id", "section_id")],
+    "academic_year": [("COALESCE(Section.academic_year, '')", "academic_year"), ("Section.name", "section_name"), ("Section.id", "section_id")],
+}
+COURSE_SORTS = {
+    "name": [("Course.name", "course_name"), ("Course.id", "course_id")],
+    "level": [("COALESCE(EducationLevel.name, '')", "education_level_name"), ("Course.name", "course_name"), ("Course.id", "course_id")],
+}
+DEPARTMENT_SORTS = {
+    "name": [("Department.name", "department_name"), ("Department.id", "department_id")],
+    "level": [("COALESCE(EducationLevel.name, '')", "education_level_name"), ("Department.name", "department_name"), ("Department.id", "department_id")],
+}
+SUBJECT_SORTS = {
+    "name": [("Subject.name", "subject_name"), ("Subject.id", "subject_id")],
+    "level": [("COALESCE(EducationLevel.name, '')", "education_level_name"), ("Subject.name", "subject_name"), ("Subject.id", "subject_id")],
+}
+CLASS_SORTS = {
+    "section": [("COALESCE(Section.name, '')", "section_name"), ("COALESCE(Subject.name, '')", "subject_name"), ("Class.id", "class_id")],
+    "subject": [("COALESCE(Subject.name, '')", "subject_name"), ("COALESCE(Section.name, '')", "section_name"), ("Class.id", "class_id")],
+    "teacher": [("COALESCE(Users.last_name, '')", "teacher_last_name"), ("COALESCE(Users.first_name, '')", "teacher_first_name"), ("Class.id", "class_id")],
+    "status": [("Class.status", "status"), ("Class.id", "class_id")],
+}
+
+# Lists the paginated routes extend with their filters; query_plans.py
+# EXPLAINs the same SQL
+STUDENT_LIST_QUERY = """
+    SELECT
+        Users.id AS user_id,
+        Users.first_name,
+        Users.middle_name,
+        Users.last_name,
+        Users.email,
+        Users.school_id,
+        Users.is_verified,
+        StudentProfile.is_suspended AS is_suspended,
+        StudentProfile.id AS profile_id,
+        EducationLevel.name AS education_level_name,
+        Course.name AS course_name,
+        Section.name AS section_name,
+        YearLevel.name AS academic_year_name
+    FROM Users
+    JOIN StudentProfile ON Users.id = StudentProfile.user_id
+    LEFT JOIN EducationLevel ON StudentProfile.education_level_id = EducationLevel.id
+    LEFT JOIN Course ON StudentProfile.course_id = Course.id
+    LEFT JOIN Section ON StudentProfile.section_id = Section.id
+    LEFT JOIN YearLevel ON StudentProfile.year_id = YearLevel.id
+    WHERE Users.role = 'student'
+    AND Users.status = :status
+"""
+TEACHER_LIST_QUERY = """
+    SELECT
+        Users.id AS user_id,
+        Users.first_name,
+        Users.middle_name,
+        Users.last_name,
+        Users.email,
+        Users.school_id,
+        Users.is_verified,
+        Users.status,
+        TeacherProfile.id AS profile_id,
+        EducationLevel.name AS education_level_name,
+        Department.name AS department_name
+    FROM Users
+    JOIN TeacherProfile ON Users.id = TeacherProfile.user_id
+    LEFT JOIN EducationLevel ON TeacherProfile.education_level_id = EducationLevel.id
+    LEFT JOIN Department ON TeacherProfile.department_id = Department.id
+    WHERE Users.role = 'teacher'
+    AND Users.status = :status
+"""
 
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 # =======================
 # HOME
@@ -121,79 +122,53 @@ def generate_next_id():
 @login_required
 @role_required("admin")
 def dashboard():
-    # --- Summary Counts ---
-    def get_count(query):
-        return db.session.execute(text(query)).scalar() or 0
-
-    total_students = get_count("SELECT COUNT(*) FROM Users WHERE role='student' AND status=1")
-    archived_students = get_count("SELECT COUNT(*) FROM Users WHERE role='student' AND status=0")
-    total_teachers = get_count("SELECT COUNT(*) FROM Users WHERE role='teacher' AND status=1")
-    archived_teachers = get_count("SELECT COUNT(*) FROM Users WHERE role='teacher' AND status=0")
-    total_courses = get_count("SELECT COUNT(*) FROM Course")
-    total_departments = get_count("SELECT COUNT(*) FROM Department")
-    total_subjects = get_count("SELECT COUNT(*) FROM Subject")
+    # --- Summary counts and chart data (StatsCounter rollup) ---
+    stats = get_dashboard_stats(db)
 
     # --- Recent Activity ---
-    recent_students = db.session.execute(text("""
-        SELECT first_name, middle_name, last_name, school_id 
-        FROM Users 
-        WHERE role='student' 
-        ORDER BY id DESC LIMIT 5
-    """)).mappings().all()
-
-    recent_teachers = db.session.execute(text("""
-        SELECT first_name, middle_name, last_name, school_id 
-        FROM Users 
-        WHERE role='teacher' 
-        ORDER BY id DESC LIMIT 5
-    """)).mappings().all()
-
-    # --- Chart Data ---
-    students_per_course = db.session.execute(text("""
-        SELECT COALESCE(c.name, 'Unassigned') AS course_name, COUNT(s.id) AS student_count
-        FROM StudentProfile s
-        LEFT JOIN Course c ON s.course_id = c.id
-        GROUP BY c.name
-        ORDER BY student_count DESC
-    """)).mappings().all()
-
-    teachers_per_dept = db.session.execute(text("""
-        SELECT COALESCE(d.name, 'Unassigned') AS department_name, COUNT(t.id) AS teacher_count
-        FROM TeacherProfile t
-        LEFT JOIN Department d ON t.department_id = d.id
-        GROUP BY d.name
-        ORDER BY teacher_count DESC
-    """)).mappings().all()
-
-    top_courses = db.session.execute(text("""
-        SELECT 
-            COALESCE(c.name, 'Unassigned') AS course_name,
-            COUNT(s.id) AS total_students
-        FROM StudentProfile s
-        LEFT JOIN Course c ON s.course_id = c.id
-        GROUP BY c.name
-        ORDER BY total_students DESC
-        LIMIT 5
+    recent = db.session.execute(text("""
+        (SELECT role, first_name, middle_name, last_name, school_id
+         FROM Users WHERE role = 'student' ORDER BY id DESC LIMIT 5)
+        UNION ALL
+        (SELECT role, first_name, middle_name, last_name, school_id
+         FROM Users WHERE role = 'teacher' ORDER BY id DESC LIMIT 5)
     """)).mappings().all()
-
+    recent_students = [r for r in recent if r["role"] == "student"]
+    recent_teachers = [r for r in recent if r["role"] == "teacher"]
 
     return render_template(
         "admin/dashboard.html",
-        total_students=total_students,
-        archived_students=archived_students,
-        total_teachers=total_teachers,
-        archived_teachers=archived_teachers,
-        total_courses=total_courses,
-        total_departments=total_departments,
-        total_subjects=total_subjects,
+        **stats,
         recent_students=recent_students,
         recent_teachers=recent_teachers,
-        students_per_course=students_per_course,
-        teachers_per_dept=teachers_per_dept,
-        top_courses=top_courses,
         name=session.get("first_name")
     )
 
+# =======================
+# Query stats
+# =======================
+@admin_bp.route("/query-stats", methods=["GET", "POST"])
+@login_required
+@role_required("admin")
+def query_stats():
+    """Statement counts, DB time and N+1 suspects recorded by query_stats."""
+    if request.method == "POST":
+        reset_query_stats()
+        flash("Query stats cleared.", "success")
+        return redirect(url_for("admin.query_stats"))
+
+    only_flagged = request.args.get("flagged") == "1"
+    requests_list = recent_request_list()
+    if only_flagged:
+        requests_list = [r for r in requests_list if r["n_plus_one"]]
+
+    return render_template(
+        "admin/query_stats.html",
+        endpoints=endpoint_summary(),
+        recent=requests_list,
+        only_flagged=only_flagged
+    )
+
 # =======================
 # Admin utilities
 # =======================
@@ -214,13 +189,37 @@ def delete():
         return redirect(request.referrer)
 
     try:
+        update_stats_for_delete(table, row_id)
         delete_table_row(db, table, row_id)
     except:
         flash("Something went wrong.", "error")
         return redirect(request.referrer)
+    if table == "Users":
+        invalidate_identity(row_id)
     flash("Successfully deleted the row.", "success")
     return redirect(request.referrer)
 
+def update_stats_for_delete(table, row_id):
+    """Adjust the dashboard rollup for a row that is about to be deleted."""
+    if table == "Users":
+        user = db.session.execute(text("""
+            SELECT u.role, u.status, sp.course_id, tp.department_id
+            FROM Users u
+            LEFT JOIN StudentProfile sp ON sp.user_id = u.id
+            LEFT JOIN TeacherProfile tp ON tp.user_id = u.id
+            WHERE u.id = :id
+        """), {"id": row_id}).mappings().first()
+        if user:
+            on_user_deleted(db, user["role"], user["status"], user["course_id"], user["department_id"])
+    elif table == "Course":
+        bump(db, "courses", -1)
+        on_bucket_deleted(db, "course_students", row_id)
+    elif table == "Department":
+        bump(db, "departments", -1)
+        on_bucket_deleted(db, "department_teachers", row_id)
+    elif table == "Subject":
+        bump(db, "subjects", -1)
+
 @admin_bp.route("/reset", methods=["POST"])
 @login_required
 @role_required("admin")
@@ -242,6 +241,7 @@ def reset():
     except:
         flash("Something went wrong.", "error")
         return redirect(request.referrer)
+    invalidate_identity(row_id)
     flash("Successfully reset.", "success")
     return redirect(request.referrer)
 
@@ -260,46 +260,15 @@ def student():
     section_id = request.args.get("section")
     year_id = request.args.get("year")
 
-    # Base query
-    base_query = """
-        SELECT 
-            Users.id AS user_id,
-            Users.first_name,
-            Users.middle_name,
-            Users.last_name,
-            Users.email,
-            Users.school_id,
-            Users.is_verified,
-            StudentProfile.is_suspended AS is_suspended,
-            StudentProfile.id AS profile_id,
-            EducationLevel.name AS education_level_name,
-            Course.name AS course_name,
-            Section.name AS section_name,
-            YearLevel.name AS academic_year_name
-        FROM Users
-        JOIN StudentProfile ON Users.id = StudentProfile.user_id
-        LEFT JOIN EducationLevel ON StudentProfile.education_level_id = EducationLevel.id
-        LEFT JOIN Course ON StudentProfile.course_id = Course.id
-        LEFT JOIN Section ON StudentProfile.section_id = Section.id
-        LEFT JOIN YearLevel ON StudentProfile.year_id = YearLevel.id
-        WHERE Users.role = 'student'
-        AND Users.status = :status
-    """
+    base_query = STUDENT_LIST_QUERY
 
     params = {"status": 0 if show_archive else 1}
 
-    # Search filter
-    if search:
-        base_query += """
-            AND (
-                Users.first_name LIKE :search OR
-                Users.middle_name LIKE :search OR
-                Users.last_name LIKE :search OR
-                Users.email LIKE :search OR
-                Users.school_id LIKE :search
-            )
-        """
-        params["search"] = f"%{search}%"
+    # Search filter (narrows the list; order comes from the selected sort)
+    condition, search_params, _ = search_filter(search, [("people", "Users")])
+    if condition:
+        base_query += f" AND {condition}"
+        params.update(search_params)
 
     # Additional filters
     if education_level_id:
@@ -318,19 +287,20 @@ def student():
         base_query += " AND StudentProfile.year_id = :year_id"
         params["year_id"] = year_id
 
-    base_query += " ORDER BY Users.last_name, Users.first_name"
-
-    students = db.session.execute(text(base_query), params).mappings().all()
+    page = paginate(db, base_query, params, STUDENT_SORTS, "name")
+    if wants_json():
+        return jsonify(page_json(page))
 
     # Fetch dropdown data for filters
-    education_levels = db.session.execute(text("SELECT id, name FROM EducationLevel")).mappings().all()
-    courses = db.session.execute(text("SELECT id, name FROM Course WHERE status = 1")).mappings().all()
-    sections = db.session.execute(text("SELECT id, name FROM Section WHERE status = 1")).mappings().all()
-    years = db.session.execute(text("SELECT id, name FROM YearLevel")).mappings().all()
+    education_levels = ref_rows(db, "EducationLevel")
+    courses = ref_rows(db, "Course", status=1)
+    sections = ref_rows(db, "Section", status=1)
+    years = ref_rows(db, "YearLevel")
 
     return render_template(
         "admin/student/list.html",
-        students=students,
+        students=page["rows"],
+        page=page,
         show_archive=show_archive,
         search=search,
         education_levels=education_levels,
@@ -395,25 +365,63 @@ def student_add():
             return redirect(url_for("admin.student_add"))
 
         # Auto-generate school ID
-        school_id = generate_next_id()
+        school_id = next_school_id(db)
         email = f"{school_id}@holycross.edu.ph"
 
         # Add user
         user = add_user(db, first, second, last, email, int(school_id), gender, "student")
         user_id = user["id"]
         assign_student_profile(db, user_id, education_lvl, course_id, section_id, year_id)
+        enrollment_index.students_changed()
         flash("Succesfully added", "succes")
         return redirect(url_for("admin.student_add"))
 
     # GET request
-    education_lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
-    sections = db.session.execute(text("SELECT * FROM Section")).mappings().all()
+    education_lvls = ref_rows(db, "EducationLevel")
+    sections = ref_rows(db, "Section")
 
     return render_template(
         "admin/student/add_form.html",
         education_lvls=education_lvls,
         sections=sections,
-        prev_school_id=next_id_preview()
+        prev_school_id=preview_school_id(db)
+    )
+
+# Student import
+@admin_bp.route("/student/import", methods=["POST", "GET"])
+@login_required
+@role_required("admin")
+def student_import():
+    return roster_import_page("student")
+
+def roster_import_page(role):
+    """Shared GET/POST handler for the student and teacher roster import."""
+    report = None
+    if request.method == "POST":
+        file = request.files.get("file")
+        if not file or not file.filename:
+            flash("Please choose a file to import.", "error")
+            return redirect(url_for(f"admin.{role}_import"))
+        try:
+            report = roster_import.import_roster(db, file, role)
+        except roster_import.ImportFileError as e:
+            flash(str(e), "error")
+            return redirect(url_for(f"admin.{role}_import"))
+
+        if report["imported"]:
+            if role == "student":
+                enrollment_index.students_changed()
+            flash(f"Imported {report['imported']} {role}(s).", "success")
+
+    return render_template(
+        "admin/import.html",
+        role=role,
+        role_label=role.capitalize(),
+        columns=roster_import.COLUMNS[role],
+        required=roster_import.REQUIRED[role],
+        xlsx_supported=roster_import.openpyxl is not None,
+        report=report,
+        report_csv=roster_import.error_report_csv(report) if report and report["errors"] else ""
     )
 
 # Student edit
@@ -515,8 +523,11 @@ def student_edit(school_id):
                 "year_id": year_id,
                 "user_id": student["user_id"]
             })
+            on_student_course_changed(db, student["course_id"], course_id)
 
             db.session.commit()
+            invalidate_identity(student["user_id"])
+            enrollment_index.students_changed()
             flash("Student record updated successfully.", "success")
             return redirect(url_for("admin.student"))
 
@@ -533,10 +544,17 @@ def student_edit(school_id):
         return redirect(url_for("admin.student_edit", school_id=school_id))
 
     # --- GET Request ---
-    education_lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
-    courses = db.session.execute(text("SELECT * FROM Course")).mappings().all()
-    sections = db.session.execute(text("SELECT * FROM Section")).mappings().all()
-    years = db.session.execute(text("SELECT * FROM YearLevel")).mappings().all()
+    education_lvls = ref_rows(db, "EducationLevel")
+    courses = ref_rows(db, "Course")
+    sections = ref_rows(db, "Section")
+    years = ref_rows(db, "YearLevel")
+
+    # The hierarchy tree only lists active sections: keep the student's own
+    # section selectable once it is archived, or saving the form would clear it
+    archived_section = next((
+        {key: s[key] for key in ("id", "name", "academic_year", "course_id", "year_id")}
+        for s in sections if s["id"] == student["section_id"] and not s["status"]
+    ), None)
 
     return render_template(
         "admin/student/edit_form.html",
@@ -544,9 +562,19 @@ def student_edit(school_id):
         education_lvls=education_lvls,
         courses=courses,
         sections=sections,
-        years=years
+        years=years,
+        archived_section=archived_section
     )
 
+def update_stats_for_archive(school_id):
+    """Move a user between the active/archived counters after their status was toggled."""
+    user = db.session.execute(
+        text("SELECT role, status FROM Users WHERE school_id = :school_id"),
+        {"school_id": school_id}
+    ).mappings().first()
+    if user:
+        on_user_status_changed(db, user["role"], user["status"])
+
 # Student archive
 @admin_bp.route("/student/archive/<string:school_id>", methods=["POST", "GET"])
 def student_archive(school_id):
@@ -562,7 +590,9 @@ def student_archive(school_id):
         """),
         {"school_id": school_id}
     )
+    update_stats_for_archive(school_id)
     db.session.commit()
+    invalidate_identity(school_id=school_id)
     return redirect(url_for("admin.student"))
 
 # Student archive
@@ -581,6 +611,7 @@ def student_suspend(user_id):
         {"user_id": user_id}
     )
     db.session.commit()
+    invalidate_identity(user_id)
     flash("Successfully suspended.", "success")
     return redirect(url_for("admin.student"))
 
@@ -606,42 +637,15 @@ def teacher():
     education_level_id = request.args.get("education_level")
     department_id = request.args.get("department")
 
-    # Base query
-    base_query = """
-        SELECT 
-            Users.id AS user_id,
-            Users.first_name,
-            Users.middle_name,
-            Users.last_name,
-            Users.email,
-            Users.school_id,
-            Users.is_verified,
-            Users.status,
-            TeacherProfile.id AS profile_id,
-            EducationLevel.name AS education_level_name,
-            Department.name AS department_name
-        FROM Users
-        JOIN TeacherProfile ON Users.id = TeacherProfile.user_id
-        LEFT JOIN EducationLevel ON TeacherProfile.education_level_id = EducationLevel.id
-        LEFT JOIN Department ON TeacherProfile.department_id = Department.id
-        WHERE Users.role = 'teacher'
-        AND Users.status = :status
-    """
+    base_query = TEACHER_LIST_QUERY
 
     params = {"status": 0 if show_archive else 1}
 
-    # Search filter
-    if search:
-        base_query += """
-            AND (
-                Users.first_name LIKE :search OR
-                Users.middle_name LIKE :search OR
-                Users.last_name LIKE :search OR
-                Users.email LIKE :search OR
-                Users.school_id LIKE :search
-            )
-        """
-        params["search"] = f"%{search}%"
+    # Search filter (narrows the list; order comes from the selected sort)
+    condition, search_params, _ = search_filter(search, [("people", "Users")])
+    if condition:
+        base_query += f" AND {condition}"
+        params.update(search_params)
 
     # Additional filters
     if education_level_id:
@@ -652,17 +656,18 @@ def teacher():
         base_query += " AND TeacherProfile.department_id = :department_id"
         params["department_id"] = department_id
 
-    base_query += " ORDER BY Users.last_name, Users.first_name"
-
-    teachers = db.session.execute(text(base_query), params).mappings().all()
+    page = paginate(db, base_query, params, TEACHER_SORTS, "name")
+    if wants_json():
+        return jsonify(page_json(page))
 
     # Fetch dropdown data for filters
-    education_levels = db.session.execute(text("SELECT id, name FROM EducationLevel")).mappings().all()
-    departments = db.session.execute(text("SELECT id, name FROM Department WHERE status = 1")).mappings().all()
+    education_levels = ref_rows(db, "EducationLevel")
+    departments = ref_rows(db, "Department", status=1)
 
     return render_template(
         "admin/teacher/list.html",
-        teachers=teachers,
+        teachers=page["rows"],
+        page=page,
         show_archive=show_archive,
         search=search,
         education_levels=education_levels,
@@ -697,16 +702,6 @@ def teacher_add():
             flash("School ID must be an integer.", "warning")
             return redirect(url_for("admin.teacher_add"))
 
-        # Auto-generate school ID
-        school_id = generate_next_id()
-        email = f"{school_id}@holycross.edu.ph"
-
-        # Check for existing school ID
-        if is_exist(db, school_id, "school_id", "Users"):
-            flash("The school ID already exists.", "info")
-            generate_next_id()
-            return redirect(url_for("admin.teacher_add"))
-
         # Check for existing full name
         if (
             is_exist(db, first, "first_name", "Users") and
@@ -716,6 +711,11 @@ def teacher_add():
             flash("The name already exists.", "info")
             return redirect(url_for("admin.teacher_add"))
 
+        # Auto-generate school ID once the form is valid: the counter is
+        # reserved (and committed) even if the add fails afterwards
+        school_id = next_school_id(db)
+        email = f"{school_id}@holycross.edu.ph"
+
         # Add user in db
         user = add_user(db, first, second, last, email, school_id, gender, "teacher")
         user_id = user["id"]
@@ -731,15 +731,22 @@ def teacher_add():
 
     else:
         # GET request — render form
-        departments = db.session.execute(text("SELECT * FROM Department")).mappings().all()
-        lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+        departments = ref_rows(db, "Department")
+        lvls = ref_rows(db, "EducationLevel")
         return render_template(
             "admin/teacher/add_form.html",
             departments=departments,
             lvls=lvls,
-            school_id_prev=next_id_preview()
+            school_id_prev=preview_school_id(db)
         )
 
+# Teacher import
+@admin_bp.route("/teacher/import", methods=["POST", "GET"])
+@login_required
+@role_required("admin")
+def teacher_import():
+    return roster_import_page("teacher")
+
 # Teacher edit
 @admin_bp.route("/teacher/edit/<string:school_id>", methods=["POST", "GET"])
 @login_required
@@ -810,14 +817,16 @@ def teacher_edit(school_id):
             "lvl_id": lvl_id,
             "user_id": teacher["user_id"]
         })
+        on_teacher_department_changed(db, teacher["department_id"], department_id)
       
         db.session.commit()
+        invalidate_identity(teacher["user_id"])
         flash("Teacher record updated successfully.", "success")
         return redirect(url_for("admin.teacher"))
 
     # GET mode - render form
-    departments = db.session.execute(text("SELECT * FROM Department")).mappings().all()
-    lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+    departments = ref_rows(db, "Department")
+    lvls = ref_rows(db, "EducationLevel")
 
     return render_template(
         "admin/teacher/edit_form.html",
@@ -841,7 +850,9 @@ def teacher_archive(school_id):
         """),
         {"school_id": school_id}
     )
+    update_stats_for_archive(school_id)
     db.session.commit()
+    invalidate_identity(school_id=school_id)
     return redirect(url_for("admin.teacher"))
 
 # Teacher toggle archive
@@ -866,9 +877,9 @@ def section():
     education_level_id = request.args.get("education_level")
 
     # Fetch filters
-    courses = db.session.execute(text("SELECT id, name FROM Course ORDER BY name")).mappings().all()
-    years = db.session.execute(text("SELECT id, name FROM YearLevel ORDER BY name")).mappings().all()
-    education_levels = db.session.execute(text("SELECT id, name FROM EducationLevel ORDER BY name")).mappings().all()
+    courses = sorted(ref_rows(db, "Course"), key=lambda row: row["name"].lower())
+    years = sorted(ref_rows(db, "YearLevel"), key=lambda row: row["name"].lower())
+    education_levels = sorted(ref_rows(db, "EducationLevel"), key=lambda row: row["name"].lower())
 
     base_query = """
         SELECT 
@@ -891,18 +902,13 @@ def section():
     params = {"status": 0 if show_archive else 1}
 
     # 🔍 Optional search
-    if search:
-        base_query += """
-            AND (
-                Section.name LIKE :search
-                OR Section.academic_year LIKE :search
-                OR Course.name LIKE :search
-                OR YearLevel.name LIKE :search
-                OR EducationLevel.name LIKE :search
-                OR CONCAT(Users.first_name, ' ', IFNULL(Users.middle_name,''), ' ', Users.last_name) LIKE :search
-            )
-        """
-        params["search"] = f"%{search}%"
+    condition, search_params, _ = search_filter(search, [
+        ("section", "Section"), ("course", "Course"), ("people", "Users"),
+        "YearLevel.name", "EducationLevel.name"
+    ])
+    if condition:
+        base_query += f" AND {condition}"
+        params.update(search_params)
 
     # Filters
     if course_id:
@@ -917,13 +923,14 @@ def section():
         base_query += " AND Section.education_lvl_id = :education_level_id"
         params["education_level_id"] = education_level_id
 
-    base_query += " ORDER BY Section.name"
-
-    sections = db.session.execute(text(base_query), params).mappings().all()
+    page = paginate(db, base_query, params, SECTION_SORTS, "name")
+    if wants_json():
+        return jsonify(page_json(page))
 
     return render_template(
         "admin/section/list.html",
-        sections=sections,
+        sections=page["rows"],
+        page=page,
         show_archive=show_archive,
         search=search,
         course_id=course_id,
@@ -1051,15 +1058,16 @@ def section_add():
                 "teacher_id": teacher_id
             }
         )
+        bump_ref_version(db, "Section")
         db.session.commit()
 
         flash("Section added successfully!", "success")
         return redirect(url_for("admin.section_add"))
 
     # --- GET request ---
-    education_lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
-    courses = db.session.execute(text("SELECT * FROM Course")).mappings().all()
-    years = db.session.execute(text("SELECT * FROM YearLevel")).mappings().all()
+    education_lvls = ref_rows(db, "EducationLevel")
+    courses = ref_rows(db, "Course")
+    years = ref_rows(db, "YearLevel")
     teachers = db.session.execute(
         text("""
             SELECT TeacherProfile.id, Users.first_name, Users.middle_name, Users.last_name
@@ -1199,15 +1207,16 @@ def section_edit(section_id):
             "teacher_id": teacher_id,
             "section_id": section_id
         })
+        bump_ref_version(db, "Section")
         db.session.commit()
 
         flash("Section updated successfully!", "success")
         return redirect(url_for("admin.section"))
 
     # --- GET request ---
-    education_lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
-    courses = db.session.execute(text("SELECT * FROM Course")).mappings().all()
-    years = db.session.execute(text("SELECT * FROM YearLevel")).mappings().all()
+    education_lvls = ref_rows(db, "EducationLevel")
+    courses = ref_rows(db, "Course")
+    years = ref_rows(db, "YearLevel")
     teachers = db.session.execute(text("""
         SELECT TeacherProfile.id, Users.first_name, Users.middle_name, Users.last_name
         FROM TeacherProfile
@@ -1248,6 +1257,7 @@ def section_archive(section_id):
         """),
         {"section_id": section_id}
     )
+    bump_ref_version(db, "Section")
     db.session.commit()
     flash("Section archive status updated.", "success")
     return redirect(url_for("admin.section"))
@@ -1272,9 +1282,7 @@ def course():
     education_level_id = request.args.get("education_level")
 
     # Fetch education levels for filter dropdown
-    education_levels = db.session.execute(
-        text("SELECT id, name FROM EducationLevel ORDER BY name")
-    ).mappings().all()
+    education_levels = sorted(ref_rows(db, "EducationLevel"), key=lambda row: row["name"].lower())
 
     base_query = """
         SELECT
@@ -1289,27 +1297,24 @@ def course():
     params = {"status": 0 if show_archive else 1}
 
     # Optional search
-    if search:
-        base_query += """
-            AND (
-                Course.name LIKE :search
-                OR EducationLevel.name LIKE :search
-            )
-        """
-        params["search"] = f"%{search}%"
+    condition, search_params, _ = search_filter(search, [("course", "Course"), "EducationLevel.name"])
+    if condition:
+        base_query += f" AND {condition}"
+        params.update(search_params)
 
     # Filter by education level
     if education_level_id:
         base_query += " AND Course.education_level_id = :education_level_id"
         params["education_level_id"] = education_level_id
 
-    base_query += " ORDER BY Course.name"
-
-    courses = db.session.execute(text(base_query), params).mappings().all()
+    page = paginate(db, base_query, params, COURSE_SORTS, "name")
+    if wants_json():
+        return jsonify(page_json(page))
 
     return render_template(
         "admin/course/list.html",
-        courses=courses,
+        courses=page["rows"],
+        page=page,
         show_archive=show_archive,
         search=search,
         education_level_id=education_level_id,
@@ -1344,7 +1349,7 @@ def course_add():
         flash("Successfully added.", "success")
         return redirect(url_for("admin.course_add"))
     else:
-        ed_lvl = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+        ed_lvl = ref_rows(db, "EducationLevel")
         valid_course = []
         for lvl in ed_lvl:
             if lvl["name"] in ["Senior High", "College"]:
@@ -1362,6 +1367,7 @@ def course_edit(id):
 
         query = text("UPDATE Course SET name = :name, education_level_id = :lvl_id WHERE id = :id")
         db.session.execute(query, {"name": name, "lvl_id": lvl_id, "id": id})
+        bump_ref_version(db, "Course")
         db.session.commit()
 
         flash("Course updated successfully!", "success")
@@ -1376,8 +1382,8 @@ def course_edit(id):
     """)
     course = db.session.execute(query, {"id": id}).mappings().first()
 
-    lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
-    ed_lvl = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+    lvls = ref_rows(db, "EducationLevel")
+    ed_lvl = ref_rows(db, "EducationLevel")
     valid_course = []
     for lvl in ed_lvl:
         if lvl["name"] in ["Senior High", "College"]:
@@ -1401,6 +1407,7 @@ def course_archive(course_id):
         """),
         {"course_id": course_id}
     )
+    bump_ref_version(db, "Course")
     db.session.commit()
     flash("Course archive status updated.", "success")
     return redirect(url_for("admin.course"))
@@ -1426,9 +1433,7 @@ def department():
     education_level_id = request.args.get("education_level")
 
     # Fetch all education levels for the filter dropdown
-    education_levels = db.session.execute(
-        text("SELECT id, name FROM EducationLevel ORDER BY name")
-    ).mappings().all()
+    education_levels = sorted(ref_rows(db, "EducationLevel"), key=lambda row: row["name"].lower())
 
     # Base query
     query = """
@@ -1443,23 +1448,25 @@ def department():
 
     params = {"status": 0 if show_archive else 1}
 
-    # Search filter
-    if search:
-        query += " AND (Department.name LIKE :search OR EducationLevel.name LIKE :search)"
-        params["search"] = f"%{search}%"
+    # Search filter (narrows the list; order comes from the selected sort)
+    condition, search_params, _ = search_filter(search, [("department", "Department"), "EducationLevel.name"])
+    if condition:
+        query += f" AND {condition}"
+        params.update(search_params)
 
     # Education level filter
     if education_level_id:
         query += " AND Department.education_level_id = :education_level_id"
         params["education_level_id"] = education_level_id
 
-    query += " ORDER BY Department.name"
-
-    departments = db.session.execute(text(query), params).mappings().all()
+    page = paginate(db, query, params, DEPARTMENT_SORTS, "name")
+    if wants_json():
+        return jsonify(page_json(page))
 
     return render_template(
         "admin/department/list.html",
-        departments=departments,
+        departments=page["rows"],
+        page=page,
         show_archive=show_archive,
         search=search,
         education_level_id=education_level_id,
@@ -1492,7 +1499,7 @@ def department_add():
         return redirect(url_for("admin.department_add"))
         
     else:
-        lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+        lvls = ref_rows(db, "EducationLevel")
         return render_template("admin/department/add_form.html", lvls=lvls)
 
 # Department edit
@@ -1510,6 +1517,7 @@ def department_edit(id):
             WHERE id = :id
         """)
         db.session.execute(query, {"name": name, "lvl_id": lvl_id, "id": id})
+        bump_ref_version(db, "Department")
         db.session.commit()
 
         flash("Department updated successfully!", "success")
@@ -1527,7 +1535,7 @@ def department_edit(id):
     """)
     department = db.session.execute(query, {"id": id}).mappings().first()
 
-    lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+    lvls = ref_rows(db, "EducationLevel")
 
     return render_template("admin/department/edit_form.html", department=department, lvls=lvls)
 
@@ -1547,6 +1555,7 @@ def department_archive(department_id):
         """),
         {"department_id": department_id}
     )
+    bump_ref_version(db, "Department")
     db.session.commit()
     flash("Department archive status updated.", "success")
     return redirect(url_for("admin.department"))
@@ -1572,15 +1581,13 @@ def subject():
     education_level_id = request.args.get("education_level")
 
     # Fetch all education levels for the filter dropdown
-    education_levels = db.session.execute(
-        text("SELECT id, name FROM EducationLevel ORDER BY name")
-    ).mappings().all()
+    education_levels = sorted(ref_rows(db, "EducationLevel"), key=lambda row: row["name"].lower())
 
     # Base SQL
     query = """
         SELECT 
-            Subject.id,
-            Subject.name,
+            Subject.id AS subject_id,
+            Subject.name AS subject_name,
             Subject.status,
             EducationLevel.name AS education_level_name
         FROM Subject
@@ -1591,27 +1598,24 @@ def subject():
     params = {"status": 0 if show_archive else 1}
 
     # Add search condition if provided
-    if search:
-        query += """
-            AND (
-                Subject.name LIKE :search OR
-                EducationLevel.name LIKE :search
-            )
-        """
-        params["search"] = f"%{search}%"
+    condition, search_params, _ = search_filter(search, [("subject", "Subject"), "EducationLevel.name"])
+    if condition:
+        query += f" AND {condition}"
+        params.update(search_params)
 
     # Filter by education level if selected
     if education_level_id:
         query += " AND Subject.education_level_id = :education_level_id"
         params["education_level_id"] = education_level_id
 
-    query += " ORDER BY Subject.name"
-
-    subjects = db.session.execute(text(query), params).mappings().all()
+    page = paginate(db, query, params, SUBJECT_SORTS, "name")
+    if wants_json():
+        return jsonify(page_json(page))
 
     return render_template(
         "admin/subject/list.html",
-        subjects=subjects,
+        subjects=page["rows"],
+        page=page,
         show_archive=show_archive,
         search=search,
         education_level_id=education_level_id,
@@ -1640,11 +1644,13 @@ def subject_add():
             text("INSERT INTO Subject (name, education_level_id) VALUES (:name, :lvl)"),
             {"name": subject_name, "lvl": lvl}
         )
+        bump(db, "subjects")
+        bump_ref_version(db, "Subject")
         db.session.commit()
         flash("Subject added successfully!", "success")
         return redirect(url_for("admin.subject_add"))
     else:
-        lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+        lvls = ref_rows(db, "EducationLevel")
         return render_template("admin/subject/add_form.html", lvls=lvls)
 
 # Subject edit
@@ -1667,6 +1673,7 @@ def subject_edit(id):
             WHERE id = :id
         """)
         db.session.execute(query, {"name": name, "lvl_id": lvl_id, "id": id})
+        bump_ref_version(db, "Subject")
         db.session.commit()
 
         flash("Subject updated successfully!", "success")
@@ -1684,7 +1691,7 @@ def subject_edit(id):
     """)
     subject = db.session.execute(query, {"id": id}).mappings().first()
 
-    lvls = db.session.execute(text("SELECT * FROM EducationLevel")).mappings().all()
+    lvls = ref_rows(db, "EducationLevel")
 
     return render_template("admin/subject/edit_form.html", subject=subject, lvls=lvls)
 
@@ -1705,6 +1712,7 @@ def subject_archive(subject_id):
         """),
         {"subject_id": subject_id}
     )
+    bump_ref_version(db, "Subject")
     db.session.commit()
     return redirect(url_for("admin.subject"))
 
@@ -1758,15 +1766,12 @@ def class_list():
 
 
     # --- Search filter ---
-    if search:
-        query += """
-            AND (
-                Subject.name LIKE :search OR
-                Section.name LIKE :search OR
-                CONCAT(Users.first_name, ' ', Users.last_name) LIKE :search
-            )
-        """
-        params["search"] = f"%{search}%"
+    condition, search_params, _ = search_filter(
+        search, [("subject", "Subject"), ("section", "Section"), ("people", "Users")]
+    )
+    if condition:
+        query += f" AND {condition}"
+        params.update(search_params)
 
     if selected_status != "all":
         query += " AND Class.status = :status"
@@ -1787,18 +1792,14 @@ def class_list():
         query += " AND Class.teacher_id = :teacher_id"
         params["teacher_id"] = teacher_id
 
-    query += " ORDER BY Section.name, Subject.name"
-
-    classes = db.session.execute(text(query), params).mappings().all()
+    page = paginate(db, query, params, CLASS_SORTS, "section")
+    if wants_json():
+        return jsonify(page_json(page))
 
     # --- Fetch data for dropdowns ---
-    subjects = db.session.execute(
-        text("SELECT id, name FROM Subject WHERE status=1 ORDER BY name")
-    ).mappings().all()
+    subjects = sorted(ref_rows(db, "Subject", status=1), key=lambda row: row["name"].lower())
 
-    sections = db.session.execute(
-        text("SELECT id, name FROM Section WHERE status=1 ORDER BY name")
-    ).mappings().all()
+    sections = sorted(ref_rows(db, "Section", status=1), key=lambda row: row["name"].lower())
 
     teachers = db.session.execute(
         text("""
@@ -1812,7 +1813,8 @@ def class_list():
 
     return render_template(
         "admin/class/list.html",
-        classes=classes,
+        classes=page["rows"],
+        page=page,
         selected_status=selected_status,
         search=search,
         subject_id=subject_id,
@@ -1848,22 +1850,27 @@ def class_add():
             flash("This class already exists.", "info")
             return redirect(url_for("admin.class_add"))
 
-        db.session.execute(
+        class_id = db.session.execute(
             text("""
                 INSERT INTO Class (teacher_id, subject_id, section_id)
                 VALUES (:teacher, :subject, :section)
             """),
             {"teacher": teacher_id, "subject": subject_id, "section": section_id}
-        )
+        ).lastrowid
+
+        message = "Class added successfully!"
+        if request.form.get("enroll_section"):
+            result = enroll_section(db, class_id)
+            message += f" {enrollment_message(result, 'section student(s)')}"
         db.session.commit()
-        flash("Class added successfully!", "success")
+        flash(message, "success")
         return redirect(url_for("admin.class_add"))
 
     # GET request - fetch teachers, subjects, sections
-    teachers = db.session.execute(text("SELECT TeacherProfile.id, Users.first_name, Users.last_name "   
+    teachers = db.session.execute(text("SELECT TeacherProfile.id, TeacherProfile.education_level_id, Users.first_name, Users.last_name "   
                                        "FROM TeacherProfile "
                                        "LEFT JOIN Users ON TeacherProfile.user_id = Users.id")).mappings().all()
-    subjects = db.session.execute(text("SELECT * FROM Subject WHERE status=1")).mappings().all()
+    subjects = ref_rows(db, "Subject", status=1)
     sections = db.session.execute(
         text("""
             SELECT s.*, y.name AS year_name 
@@ -1908,11 +1915,11 @@ def class_edit(id):
         text("SELECT * FROM Class WHERE id=:id"), {"id": id}
     ).mappings().first()
 
-    teachers = db.session.execute(text("SELECT TeacherProfile.id, Users.first_name, Users.last_name "
+    teachers = db.session.execute(text("SELECT TeacherProfile.id, TeacherProfile.education_level_id, Users.first_name, Users.last_name "
                                        "FROM TeacherProfile "
                                        "LEFT JOIN Users ON TeacherProfile.user_id = Users.id")).mappings().all()
-    subjects = db.session.execute(text("SELECT * FROM Subject WHERE status=1")).mappings().all()
-    sections = db.session.execute(text("SELECT * FROM Section WHERE status=1")).mappings().all()
+    subjects = ref_rows(db, "Subject", status=1)
+    sections = ref_rows(db, "Section", status=1)
 
     return render_template("admin/class/edit_form.html", cls=cls, teachers=teachers, subjects=subjects, sections=sections)
 
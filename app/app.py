@@ -1,55 +1,140 @@
 # utilities
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory,current_app
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory,current_app
+from flask.cli import AppGroup
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import date, datetime
 import re
 import os
+import click
 
 
 # Own created helpers/mini-framework
 from helpers import *
 from database import db
-from models import load_user
+from models import load_user, User
+from identity import fetch_identity_row, remember_identity, invalidate_identity, current_profile_id
+from query_stats import init_query_stats
+from config import CONFIGS
+from reference_data import reference_data, hierarchy_json
+from live_events import init_live_events, user_channels, open_stream
+from gradebook import rebuild_grade_summary
+from lesson_manifest import rebuild_lesson_manifest
+from progress_rollup import rebuild_progress_rollup
+from activity_feed import prune_activity_feed, FEED_RETENTION_DAYS
+from dashboard_stats import reconcile_stats
+from migrate import apply_migrations
+from query_plans import run_plan_checks, seed_plan_data, clear_plan_data
+from school_ids import stress_allocation
 
 # Blueprints
 from admin_routes import admin_bp
 from teacher_routes import teacher_bp
 from student_routes import student_bp
 
-app = Flask(__name__)
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-app.secret_key = "tmpsecretkey"
 
-# ==== DATABASE CONFIG ====
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://cool:HardPass_1@db/lms_db'
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_recycle': 280,
-    'pool_pre_ping': True
-}
-
-
-# ==== Initialize extensions ====
-db.init_app(app)
+# ==== App factory ====
+# create_app() builds one app from a config (config.py). The routes, filter
+# and CLI commands of this module are declared below with @route,
+# @template_filter and @commands.command and bound to the app there, so
+# their endpoint names ("login", "index", ...) stay free of a blueprint prefix.
+#   development  flask --app app --debug run    (Flask finds create_app)
+#   production   gunicorn -c gunicorn.conf.py wsgi:app
+_app_setup = []
+commands = AppGroup("pulse")
 
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = "login"
 
 # Connect Flask-Login to our user loader
 login_manager.user_loader(load_user)
 
+
+def route(rule, **options):
+    def register(view):
+        _app_setup.append(lambda app: app.add_url_rule(rule, view_func=view, **options))
+        return view
+    return register
+
+
+def template_filter(name):
+    def register(f):
+        _app_setup.append(lambda app: app.add_template_filter(f, name))
+        return f
+    return register
+
+
+def create_app(config=None):
+    """
+    Build the app. `config` is a name from config.CONFIGS or a config class;
+    by default the PULSE_ENV environment variable, else "development".
+    """
+    if config is None:
+        config = os.environ.get("PULSE_ENV", "development")
+    if isinstance(config, str):
+        config = CONFIGS[config]
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if not app.secret_key:
+        raise RuntimeError("SECRET_KEY must be set in the environment.")
+
+    # ==== Initialize extensions ====
+    db.init_app(app)
+    init_query_stats(app)
+    init_live_events(app)
+    login_manager.init_app(app)
+
+    for setup in _app_setup:
+        setup(app)
+
+    # ==== BLUEPRINT =====
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(teacher_bp)
+    app.register_blueprint(student_bp)
+
+    for command in commands.commands.values():
+        app.cli.add_command(command)
+
+    return app
+
+
+def warm_up(app):
+    """
+    Prime a freshly started worker before it takes requests: compile every
+    template, open WARM_UP_CONNECTIONS pooled database connections and load
+    the reference data cache. Called by gunicorn's post_worker_init hook.
+    """
+    for name in app.jinja_env.list_templates():
+        if name.endswith(".html"):
+            app.jinja_env.get_template(name)
+
+    with app.app_context():
+        # With preload_app the engine was created in the master; its
+        # connections (if any) belong to the master, never share them
+        db.engine.dispose(close=False)
+        try:
+            connections = [db.engine.connect() for _ in range(app.config["WARM_UP_CONNECTIONS"])]
+            for connection in connections:
+                connection.execute(text("SELECT 1"))
+                connection.close()
+            reference_data.hierarchy(db)
+        except SQLAlchemyError as e:
+            app.logger.warning(f"Warm-up could not reach the database: {e}")
+        finally:
+            db.session.remove()
+
+
 # GLOBAL VARIABLES
-DEFAULT_PASSWORD = generate_password_hash("mcmY_1946")
+DEFAULT_PASSWORD = "mcmY_1946"
 # Password regex
 HARD_PASS_RE = "^(?=.*[A-Z])(?=.*\d)(?=.*[\W_]).{8,}$"
 MID_PASS_RE = "^(?=.*[A-Z])(?=.*\d).{8,}$"
 UPLOAD_FOLDER = "uploads/lessons"
-# Daily Random Quotes
-last_checked_date = None
 
 
-@app.template_filter('datetimeformat')
+@template_filter('datetimeformat')
 def datetimeformat(value, format='%I:%M %p'):
     """
     Formats a datetime string or object into a given format.
@@ -68,194 +153,138 @@ def datetimeformat(value, format='%I:%M %p'):
     return value.strftime(format)
 
 # AJAX
-@app.route("/api/student-hierarchy")
-def student_hierarchy():
-    query_type = request.args.get("type")
-    level_id = request.args.get("education_level_id")
-    course_id = request.args.get("course_id")
-    year_id = request.args.get("year_id")
-
-    # Fetch courses
-    if query_type == "courses" and level_id:
-        result = db.session.execute(
-            text("SELECT id, name FROM Course WHERE education_level_id = :level_id AND status = 1"),
-            {"level_id": level_id}
-        ).mappings().all()
-        return jsonify([dict(r) for r in result])
-
-    # Fetch year levels
-    if query_type == "year_levels" and level_id:
-        result = db.session.execute(
-            text("SELECT id, name FROM YearLevel WHERE education_level_id = :level_id"),
-            {"level_id": level_id}
-        ).mappings().all()
-        return jsonify([dict(r) for r in result])
-
-    # Fetch sections — smart handling for diff levels
-    if query_type == "sections":
-        if course_id and year_id:
-            # College / Senior High
-            result = db.session.execute(
-                text("""
-                    SELECT id, name, academic_year 
-                    FROM Section 
-                    WHERE course_id = :course_id 
-                      AND year_id = :year_id 
-                      AND status = 1
-                """),
-                {"course_id": course_id, "year_id": year_id}
-            ).mappings().all()
-        elif level_id and year_id:
-            # Elementary / Junior High
-            result = db.session.execute(
-                text("""
-                    SELECT id, name, academic_year 
-                    FROM Section 
-                    WHERE education_lvl_id = :level_id 
-                      AND year_id = :year_id 
-                      AND status = 1
-                """),
-                {"level_id": level_id, "year_id": year_id}
-            ).mappings().all()
-        else:
-            result = []
-
-        return jsonify([dict(r) for r in result])
-
-    return jsonify([])
-
-@app.route("/api/teacher-hierarchy")
-def teacher_hierarchy():
-    """
-    AJAX endpoint for populating teacher-related dropdowns.
-    Example: Education Level -> Departments
-    """
-    query_type = request.args.get("type")
-    level_id = request.args.get("education_level_id")
-
-    if query_type == "departments" and level_id:
-        result = db.session.execute(
-            text("SELECT id, name FROM Department WHERE education_level_id = :level_id AND status = 1"),
-            {"level_id": level_id}
-        ).mappings().all()
-        return jsonify([dict(r) for r in result])
-
-    return jsonify([])
-
-@app.route("/api/class-hierarchy")
-def class_hierarchy():
+@route("/api/hierarchy")
+@login_required
+def hierarchy():
     """
-    AJAX endpoint for Class form:
-    - teacher -> subjects
-    - teacher -> education level -> sections
-    (Any section under the same education level as the teacher)
+    Education levels with their active courses, year levels, sections,
+    departments and subjects in one JSON tree for the cascading dropdowns
+    (static/js/hierarchy.js). Browsers revalidate it with its ETag and get
+    a 304 until reference data changes.
     """
-    query_type = request.args.get("type")
-    teacher_id = request.args.get("teacher_id")
-
-    if not teacher_id:
-        return jsonify([])
-
-    # Get teacher's education level
-    teacher_info = db.session.execute(
-        text("SELECT education_level_id FROM TeacherProfile WHERE id = :teacher_id"),
-        {"teacher_id": teacher_id}
-    ).mappings().first()
-
-    if not teacher_info:
-        return jsonify([])
-
-    education_level_id = teacher_info["education_level_id"]
-
-    if query_type == "subjects":
-        # Subjects the teacher can teach
-        result = db.session.execute(
-            text("""
-                SELECT s.id, s.name
-                FROM Subject s
-                WHERE s.education_level_id = :education_level_id
-                  AND s.status = 1
-            """),
-            {"education_level_id": education_level_id}
-        ).mappings().all()
-        return jsonify([dict(r) for r in result])
-
-    if query_type == "sections":
-        # Sections under the teacher's education level
-        result = db.session.execute(
-            text("""
-                SELECT sec.id, sec.name, sec.academic_year, yl.name AS year_name
-                FROM Section sec
-                LEFT JOIN Course co ON sec.course_id = co.id
-                LEFT JOIN YearLevel yl ON sec.year_id = yl.id
-                LEFT JOIN EducationLevel el_course ON co.education_level_id = el_course.id
-                LEFT JOIN EducationLevel el_year ON yl.education_level_id = el_year.id
-                WHERE (COALESCE(el_course.id, el_year.id) = :education_level_id)
-                  AND sec.status = 1
-            """),
-            {"education_level_id": education_level_id}
-        ).mappings().all()
-        return jsonify([dict(r) for r in result])
-
-    return jsonify([])
-
-@app.before_request
-def ensure_daily_inspiration():
-    global last_checked_date
-    today = date.today()
-
-    if last_checked_date != today:
-        last_checked_date = today
-
-        daily = db.session.execute(
-            text("SELECT * FROM daily_inspirations WHERE date = :today"),
-            {"today": today}
-        ).mappings().first()
-
-        if not daily:
-            quote_id = db.session.execute(text("SELECT id FROM motivational_quotes ORDER BY RAND() LIMIT 1")).scalar()
-            verse_id = db.session.execute(text("SELECT id FROM bible_verses ORDER BY RAND() LIMIT 1")).scalar()
-            message_id = db.session.execute(text("SELECT id FROM grateful_peace_messages ORDER BY RAND() LIMIT 1")).scalar()
+    etag, body = hierarchy_json(db)
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
 
-            db.session.execute(text("""
-                INSERT INTO daily_inspirations (quote_id, verse_id, message_id, date)
-                VALUES (:q, :v, :m, :d)
-            """), {"q": quote_id, "v": verse_id, "m": message_id, "d": today})
-            db.session.commit()
-
-@app.route('/uploads/<filename>')
+@route('/uploads/<filename>')
 def download_file(filename):
     return send_from_directory(UPLOAD_FOLDER, filename, as_attachment=True)
 
-@app.route('/uploads/activities/<int:activity_id>/<path:filename>')
+@route('/uploads/activities/<int:activity_id>/<path:filename>')
 def download_activity_file(activity_id, filename):
     folder = os.path.join("uploads", "activities", str(activity_id))
     return send_from_directory(folder, filename, as_attachment=True)
 
-@app.route('/uploads/activities/<int:activity_id>/quick/<path:filename>')
+@route('/uploads/activities/<int:activity_id>/quick/<path:filename>')
 def quick_preview_activity_file(activity_id, filename):
     folder = os.path.join("uploads", "activities", str(activity_id))
     return send_from_directory(folder, filename)
 
-@app.route('/uploads/activity/<int:activity_id>/<path:filename>')
+@route('/uploads/activity/<int:activity_id>/<path:filename>')
 def download_activity_file_general(activity_id, filename):
     folder = os.path.join("uploads", "activity", str(activity_id))
     return send_from_directory(folder, filename, as_attachment=True)
 
-
-
-# ==== BLUEPRINT =====
-app.register_blueprint(admin_bp)
-app.register_blueprint(teacher_bp)
-app.register_blueprint(student_bp)
+# LIVE EVENTS (server-sent events, see live_events.py)
+@route("/events")
+@login_required
+def live_events():
+    if not current_app.config["LIVE_EVENTS_ENABLED"]:
+        return "", 204  # tells EventSource not to reconnect
+    channels = user_channels(session.get("role"), current_profile_id())
+    body = open_stream(channels) if channels else None
+    if body is None:
+        return "", 204  # no channels, or this worker has no room for another stream
+    return Response(
+        body,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ==== CLI ====
+@commands.command("rebuild-gradebook")
+def rebuild_gradebook_command():
+    """Recompute GradeSummary from Activity and ActivitySubmission."""
+    count = rebuild_grade_summary(db)
+    print(f"Rebuilt {count} gradebook rows.")
+
+@commands.command("rebuild-lesson-manifest")
+def rebuild_lesson_manifest_command():
+    """Recompute LessonManifest from Lesson, LessonFile and Activity."""
+    count = rebuild_lesson_manifest(db)
+    print(f"Rebuilt {count} lesson manifest rows.")
+
+@commands.command("rebuild-progress-rollup")
+def rebuild_progress_rollup_command():
+    """Recompute ClassProgressRollup from Lesson and StudentLessonProgress."""
+    count = rebuild_progress_rollup(db)
+    print(f"Rebuilt {count} class progress rows.")
+
+@commands.command("prune-activity-feed")
+@click.option("--days", type=int, default=FEED_RETENTION_DAYS, help="Keep events newer than this.")
+def prune_activity_feed_command(days):
+    """Delete ActivityFeed events older than --days."""
+    count = prune_activity_feed(db, days)
+    print(f"Pruned {count} activity feed events.")
+
+@commands.command("reconcile-stats")
+def reconcile_stats_command():
+    """Recompute the admin dashboard StatsCounter rollup from source."""
+    reconcile_stats(db)
+    print("Dashboard stats reconciled.")
+
+@commands.command("db-migrate")
+def db_migrate_command():
+    """Apply pending migrations from migrations/."""
+    apply_migrations(db)
+
+@commands.command("check-query-plans")
+@click.option("--seed", type=int, default=0, help="Add N synthetic students first (removed afterwards).")
+@click.option("--verbose", is_flag=True, help="Print every EXPLAIN row.")
+def check_query_plans_command(seed, verbose):
+    """EXPLAIN the hot queries and fail on full scans of large tables."""
+    if seed:
+        seed_plan_data(db, seed)
+    try:
+        results = run_plan_checks(db)
+    finally:
+        if seed:
+            clear_plan_data(db)
+
+    failed = 0
+    for name, problems, rows in results:
+        print(f"{'FAIL' if problems else 'ok  '} {name}")
+        for problem in problems:
+            print(f"     {problem}")
+        if verbose:
+            for row in rows:
+                print(f"     {row['table']}: type={row['type']} key={row['key']} rows={row['rows']}")
+        failed += bool(problems)
+
+    if failed:
+        raise SystemExit(f"{failed} query plan check(s) failed.")
+
+@commands.command("check-school-ids")
+@click.option("--workers", type=int, default=8)
+@click.option("--ids", "ids_per_worker", type=int, default=500, help="Single IDs per worker.")
+@click.option("--block-size", type=int, default=20)
+def check_school_ids_command(workers, ids_per_worker, block_size):
+    """Allocate school IDs from parallel workers and fail on any duplicate."""
+    total, duplicates = stress_allocation(db, workers, ids_per_worker, block_size)
+    print(f"Allocated {total} IDs from {workers} workers, {len(duplicates)} duplicate(s).")
+    if duplicates:
+        raise SystemExit("Duplicate school IDs: " + ", ".join(duplicates[:20]))
 
 # ==== GENERAL PAGES ====
 # LANDING PAGE
-@app.route("/")
+@route("/")
 def index():
     return render_template("index.html")
 
-@app.route("/profile", methods=["GET", "POST"])
+@route("/profile", methods=["GET", "POST"])
 @login_required
 def profile():
     user_id = current_user.id
@@ -351,23 +380,21 @@ def profile():
 
         db.session.execute(update_query, params)
         db.session.commit()
+        invalidate_identity(user_id)
         flash("Profile updated successfully!", "success")
         return redirect(url_for("profile"))
 
     return render_template("profile.html", user=user, extra_profile=extra_profile, role=role)
 
 # LOGIN
-@app.route("/login", methods=["GET", "POST"])
+@route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         email = request.form.get("email").strip().title()
         password = request.form.get("password").strip()
 
-        # Query user by email
-        user = db.session.execute(
-            text("SELECT * FROM Users WHERE email = :email"),
-            {"email": email}
-        ).mappings().first()
+        # Query user (with profile id and suspension flag) by email
+        user = fetch_identity_row("u.email = :email", {"email": email})
 
         if user is None:
             flash("User doesn't exist.", "Error")
@@ -382,7 +409,7 @@ def login():
             return redirect(url_for("login"))
 
         # Create Flask-Login user object
-        user_obj = load_user(user["id"])
+        user_obj = User.from_identity(remember_identity(user))
 
         # Check if activation is required
         if not user["is_verified"]:
@@ -393,12 +420,7 @@ def login():
             })
             role = session.get("role")
             if role == "student":
-                # Execute the query
-                result = db.session.execute(
-                    text("SELECT is_suspended FROM StudentProfile WHERE user_id = :user_id"),
-                    {"user_id": user["id"]}
-                ).fetchone()  
-                if result[0]: 
+                if user_obj.is_suspended:
                     flash("You are currently suspended.", "warning")
                     logout_user()
                     return redirect(url_for("index"))
@@ -420,12 +442,7 @@ def login():
         elif role == "teacher":
             return redirect(url_for("teacher.dashboard"))
         else:
-            # Execute the query
-            result = db.session.execute(
-                text("SELECT is_suspended FROM StudentProfile WHERE user_id = :user_id"),
-                {"user_id": user["id"]}
-            ).fetchone()  
-            if result[0]: 
+            if user_obj.is_suspended:
                 flash("You are currently suspended.", "warning")
                 logout_user()
                 return redirect(url_for("index"))
@@ -434,7 +451,7 @@ def login():
     return render_template("auth/login.html")
 
 # ACCOUNT ACTIVATION ROUTE!
-@app.route("/login/account_activation/<string:school_id>", methods=["GET", "POST"])
+@route("/login/account_activation/<string:school_id>", methods=["GET", "POST"])
 @login_required
 def account_activation(school_id):
     if request.method == "POST":
@@ -487,6 +504,7 @@ def account_activation(school_id):
         )
         db.session.commit() 
 
+        invalidate_identity(user["id"])
         user_obj = load_user(user["id"])
 
         # Normal login
@@ -509,12 +527,12 @@ def account_activation(school_id):
         return render_template("auth/account_activation.html")
 
 # ABOUT
-@app.route("/about")
+@route("/about")
 def about():
     return render_template("about.html")
 
 # LOGOUT
-@app.route("/logout", methods=["POST"])
+@route("/logout", methods=["POST"])
 @login_required
 def logout():
     logout_user()
@@ -560,4 +578,4 @@ def unauthorized():
 
 
 if __name__ == "__main__": 
-    app.run(debug=True,host="0.0.0.0", port=5000)
+    create_app().run(debug=True,host="0.0.0.0", port=5000)
@@ -0,0 +1,69 @@
+import os
+
+# ==== App configuration ====
+# create_app() (app.py) takes one of these by name. Every value can be set
+# from the environment; the defaults suit docker-compose.
+#   development  `flask --app app --debug run`: template auto-reload and the
+#                per-request query stats on
+#   production   wsgi.py under gunicorn (gunicorn.conf.py): several workers,
+#                no debug behaviors, SECRET_KEY must come from the environment
+
+DEV_SECRET_KEY = "tmpsecretkey"
+
+
+def env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", DEV_SECRET_KEY)
+
+    # ==== DATABASE CONFIG ====
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "mysql+pymysql://cool:HardPass_1@db/lms_db")
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_recycle": 280,
+        "pool_pre_ping": True,
+        "pool_size": env_int("DB_POOL_SIZE", 5),
+        "max_overflow": env_int("DB_MAX_OVERFLOW", 10),
+    }
+
+    # With several workers, set EVENT_SPOOL_DIR so live events reach every worker
+    EVENT_SPOOL_DIR = os.environ.get("EVENT_SPOOL_DIR")
+    # LIVE_EVENTS=0 turns the live page updates off; LIVE_EVENTS_MAX_STREAMS
+    # caps the open streams per worker (set by gunicorn.conf.py for thread workers)
+    LIVE_EVENTS_ENABLED = env_flag("LIVE_EVENTS", True)
+    LIVE_EVENTS_MAX_STREAMS = int(os.environ["LIVE_EVENTS_MAX_STREAMS"]) if os.environ.get("LIVE_EVENTS_MAX_STREAMS") else None
+
+    QUERY_STATS_ENABLED = env_flag("QUERY_STATS_ENABLED", True)
+    TEMPLATES_AUTO_RELOAD = False
+
+    # Database connections opened per worker by warm_up()
+    WARM_UP_CONNECTIONS = env_int("WARM_UP_CONNECTIONS", 2)
+
+
+class DevelopmentConfig(Config):
+    TEMPLATES_AUTO_RELOAD = True
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+    # Workers always share live events through spool files
+    EVENT_SPOOL_DIR = os.environ.get("EVENT_SPOOL_DIR", "/tmp/pulse-events")
+    # Per-request SQL timings go out in response headers: opt in with QUERY_STATS_ENABLED=1
+    QUERY_STATS_ENABLED = env_flag("QUERY_STATS_ENABLED", False)
+    SESSION_COOKIE_HTTPONLY = True
+    SESSION_COOKIE_SECURE = env_flag("SESSION_COOKIE_SECURE", False)
+
+
+CONFIGS = {
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+}
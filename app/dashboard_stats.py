@@ -0,0 +1,180 @@
+import time
+from sqlalchemy import text
+
+# ==== Admin dashboard stats ====
+# Role/status counts and per-course / per-department counts kept in the
+# StatsCounter rollup table. Admin write paths bump them in their own
+# transaction; reconcile_stats() recomputes everything from source and runs
+# automatically once the snapshot is older than RECONCILE_INTERVAL seconds.
+#
+# metric               bucket_id
+# -------------------  -------------------------------
+# student_active       0
+# student_archived     0
+# teacher_active       0
+# teacher_archived     0
+# courses              0
+# departments          0
+# subjects             0
+# course_students      Course.id (0 = unassigned)
+# department_teachers  Department.id (0 = unassigned)
+# reconciled_at        0 (value = unix time of last reconcile)
+
+RECONCILE_INTERVAL = 3600
+TOP_COURSES = 5
+
+
+def bump(db, metric, delta=1, bucket_id=None):
+    """Atomically add delta to one counter (creating it at delta)."""
+    if not delta:
+        return
+    db.session.execute(text("""
+        INSERT INTO StatsCounter (metric, bucket_id, value)
+        VALUES (:metric, :bucket_id, :delta)
+        ON DUPLICATE KEY UPDATE value = value + :delta
+    """), {"metric": metric, "bucket_id": int(bucket_id or 0), "delta": delta})
+
+
+def user_status_metric(role, status):
+    return f"{role}_{'active' if int(status) == 1 else 'archived'}"
+
+
+def on_user_added(db, role):
+    if role in ("student", "teacher"):
+        bump(db, user_status_metric(role, 1))
+
+
+def on_user_status_changed(db, role, new_status):
+    """A user was archived or unarchived (status already toggled to new_status)."""
+    if role in ("student", "teacher"):
+        bump(db, user_status_metric(role, new_status), 1)
+        bump(db, user_status_metric(role, 1 - int(new_status)), -1)
+
+
+def on_user_deleted(db, role, status, course_id=None, department_id=None):
+    if role in ("student", "teacher"):
+        bump(db, user_status_metric(role, status), -1)
+    if role == "student":
+        bump(db, "course_students", -1, course_id)
+    elif role == "teacher":
+        bump(db, "department_teachers", -1, department_id)
+
+
+def on_student_course_changed(db, old_course_id, new_course_id):
+    if (old_course_id or 0) != (new_course_id or 0):
+        bump(db, "course_students", -1, old_course_id)
+        bump(db, "course_students", 1, new_course_id)
+
+
+def on_teacher_department_changed(db, old_department_id, new_department_id):
+    if (old_department_id or 0) != (new_department_id or 0):
+        bump(db, "department_teachers", -1, old_department_id)
+        bump(db, "department_teachers", 1, new_department_id)
+
+
+def on_bucket_deleted(db, metric, bucket_id):
+    """A Course or Department was deleted: its members fall back to unassigned (FK SET NULL)."""
+    moved = db.session.execute(
+        text("SELECT value FROM StatsCounter WHERE metric = :metric AND bucket_id = :bucket_id"),
+        {"metric": metric, "bucket_id": int(bucket_id)}
+    ).scalar() or 0
+    db.session.execute(
+        text("DELETE FROM StatsCounter WHERE metric = :metric AND bucket_id = :bucket_id"),
+        {"metric": metric, "bucket_id": int(bucket_id)}
+    )
+    bump(db, metric, moved, 0)
+
+
+def reconcile_stats(db):
+    """Recompute every counter from the source tables and commit."""
+    db.session.execute(text("DELETE FROM StatsCounter"))
+    db.session.execute(text("""
+        INSERT INTO StatsCounter (metric, bucket_id, value)
+        SELECT CONCAT(role, IF(status = 1, '_active', '_archived')), 0, COUNT(*)
+        FROM Users
+        WHERE role IN ('student', 'teacher')
+        GROUP BY role, status
+    """))
+    db.session.execute(text("""
+        INSERT INTO StatsCounter (metric, bucket_id, value)
+        SELECT 'courses', 0, COUNT(*) FROM Course
+        UNION ALL SELECT 'departments', 0, COUNT(*) FROM Department
+        UNION ALL SELECT 'subjects', 0, COUNT(*) FROM Subject
+    """))
+    db.session.execute(text("""
+        INSERT INTO StatsCounter (metric, bucket_id, value)
+        SELECT 'course_students', COALESCE(course_id, 0), COUNT(*)
+        FROM StudentProfile
+        GROUP BY COALESCE(course_id, 0)
+    """))
+    db.session.execute(text("""
+        INSERT INTO StatsCounter (metric, bucket_id, value)
+        SELECT 'department_teachers', COALESCE(department_id, 0), COUNT(*)
+        FROM TeacherProfile
+        GROUP BY COALESCE(department_id, 0)
+    """))
+    db.session.execute(
+        text("INSERT INTO StatsCounter (metric, bucket_id, value) VALUES ('reconciled_at', 0, :now)"),
+        {"now": int(time.time())}
+    )
+    db.session.commit()
+
+
+def _read_counters(db):
+    return db.session.execute(text("""
+        SELECT sc.metric, sc.bucket_id, sc.value,
+               c.name AS course_name, d.name AS department_name
+        FROM StatsCounter sc
+        LEFT JOIN Course c
+            ON sc.metric = 'course_students' AND c.id = sc.bucket_id
+        LEFT JOIN Department d
+            ON sc.metric = 'department_teachers' AND d.id = sc.bucket_id
+    """)).mappings().all()
+
+
+def get_dashboard_stats(db):
+    """Everything the admin dashboard shows, from one read of StatsCounter."""
+    rows = _read_counters(db)
+
+    reconciled_at = next((r["value"] for r in rows if r["metric"] == "reconciled_at"), 0)
+    if time.time() - reconciled_at > RECONCILE_INTERVAL:
+        reconcile_stats(db)
+        rows = _read_counters(db)
+
+    totals = {}
+    per_course = {}
+    per_department = {}
+    for r in rows:
+        if r["metric"] == "course_students":
+            name = r["course_name"] or "Unassigned"
+            per_course[name] = per_course.get(name, 0) + r["value"]
+        elif r["metric"] == "department_teachers":
+            name = r["department_name"] or "Unassigned"
+            per_department[name] = per_department.get(name, 0) + r["value"]
+        elif r["bucket_id"] == 0:
+            totals[r["metric"]] = r["value"]
+
+    students_per_course = sorted(
+        ({"course_name": name, "student_count": count} for name, count in per_course.items() if count > 0),
+        key=lambda r: r["student_count"], reverse=True
+    )
+    teachers_per_dept = sorted(
+        ({"department_name": name, "teacher_count": count} for name, count in per_department.items() if count > 0),
+        key=lambda r: r["teacher_count"], reverse=True
+    )
+
+    return {
+        "total_students": totals.get("student_active", 0),
+        "archived_students": totals.get("student_archived", 0),
+        "total_teachers": totals.get("teacher_active", 0),
+        "archived_teachers": totals.get("teacher_archived", 0),
+        "total_courses": totals.get("courses", 0),
+        "total_departments": totals.get("departments", 0),
+        "total_subjects": totals.get("subjects", 0),
+        "students_per_course": students_per_course,
+        "teachers_per_dept": teachers_per_dept,
+        "top_courses": [
+            {"course_name": r["course_name"], "total_students": r["student_count"]}
+            for r in students_per_course[:TOP_COURSES]
+        ],
+    }
@@ -0,0 +1,113 @@
+from sqlalchemy import text
+from gradebook import fill_missing_summary
+from progress_rollup import fill_missing_rollup
+
+# ==== Enrollment ====
+# Class rosters are filled with set-based INSERT IGNORE ... SELECT
+# statements: one statement per call whatever the number of students, and
+# the unique (class_id, student_id) key makes re-enrolling a no-op. Each
+# call reports {"added", "skipped"}, skipped being students that were
+# already enrolled; calls given explicit ids also report "missing", the ids
+# that match no student profile. Nothing here commits.
+
+
+def _existing_profiles(db, student_ids):
+    return db.session.execute(
+        text("SELECT COUNT(*) FROM StudentProfile WHERE id IN :student_ids"),
+        {"student_ids": student_ids}
+    ).scalar()
+
+
+def enroll_students(db, class_id, student_ids):
+    """Enroll the given student profile ids in one class."""
+    student_ids = tuple({int(s) for s in student_ids})
+    if not student_ids:
+        return {"added": 0, "skipped": 0, "missing": 0}
+
+    existing = _existing_profiles(db, student_ids)
+    added = db.session.execute(text("""
+        INSERT IGNORE INTO ClassStudent (class_id, student_id)
+        SELECT :class_id, sp.id
+        FROM StudentProfile sp
+        WHERE sp.id IN :student_ids
+    """), {"class_id": class_id, "student_ids": student_ids}).rowcount
+
+    if added:
+        fill_missing_summary(db, class_id)
+        fill_missing_rollup(db, class_id)
+    return {"added": added, "skipped": existing - added, "missing": len(student_ids) - existing}
+
+
+def enroll_section(db, class_id, year_id=None, course_id=None):
+    """
+    Enroll every active student of the class's section, optionally only
+    those of one year level and/or course.
+    """
+    filters = ""
+    params = {"class_id": class_id}
+    if year_id:
+        filters += " AND sp.year_id = :year_id"
+        params["year_id"] = year_id
+    if course_id:
+        filters += " AND sp.course_id = :course_id"
+        params["course_id"] = course_id
+
+    source = f"""
+        FROM Class c
+        JOIN StudentProfile sp ON sp.section_id = c.section_id
+        JOIN Users u ON u.id = sp.user_id AND u.status = 1
+        WHERE c.id = :class_id{filters}
+    """
+    candidates = db.session.execute(text(f"SELECT COUNT(*) {source}"), params).scalar()
+    added = db.session.execute(
+        text(f"INSERT IGNORE INTO ClassStudent (class_id, student_id) SELECT c.id, sp.id {source}"),
+        params
+    ).rowcount
+
+    if added:
+        fill_missing_summary(db, class_id)
+        fill_missing_rollup(db, class_id)
+    return {"added": added, "skipped": candidates - added}
+
+
+def sync_section_rosters(db, section_id, student_ids):
+    """
+    Enroll students who were just assigned to a section in every active
+    class of that section. Counts are enrollments (student x class).
+    """
+    student_ids = tuple({int(s) for s in student_ids})
+    class_ids = db.session.execute(
+        text("SELECT id FROM Class WHERE section_id = :section_id AND status = 'active'"),
+        {"section_id": section_id}
+    ).scalars().all()
+    if not student_ids or not class_ids:
+        return {"added": 0, "skipped": 0, "missing": 0, "classes": len(class_ids)}
+
+    existing = _existing_profiles(db, student_ids)
+    added = db.session.execute(text("""
+        INSERT IGNORE INTO ClassStudent (class_id, student_id)
+        SELECT c.id, sp.id
+        FROM Class c
+        JOIN StudentProfile sp ON sp.id IN :student_ids
+        WHERE c.id IN :class_ids
+    """), {"student_ids": student_ids, "class_ids": tuple(class_ids)}).rowcount
+
+    if added:
+        for class_id in class_ids:
+            fill_missing_summary(db, class_id)
+            fill_missing_rollup(db, class_id)
+    return {
+        "added": added,
+        "skipped": existing * len(class_ids) - added,
+        "missing": len(student_ids) - existing,
+        "classes": len(class_ids),
+    }
+
+
+def enrollment_message(result, what="student(s)"):
+    message = f"{result['added']} {what} enrolled"
+    if result["skipped"]:
+        message += f", {result['skipped']} already enrolled"
+    if result.get("missing"):
+        message += f", {result['missing']} student(s) not found"
+    return message + "."
@@ -0,0 +1,169 @@
+import bisect
+import threading
+import time
+from sqlalchemy import text
+from search import search_tokens
+
+# ==== Enrollment index ====
+# In-memory answer to "students of this education level (or section) that
+# are not yet in this class, matching a name prefix", for the teacher's add
+# students picker.
+#
+# Every student gets a bit position, assigned in (last_name, first_name)
+# order, and sets of students are Python ints used as bitmaps:
+#   level / section bitmaps   students per education level and section
+#   class bitmaps             students enrolled in a class (any status)
+#   prefix index              sorted distinct name / school ID / section
+#                             words, each with its students' positions
+# A picker query is a few ANDs / ORs on those ints, and because bit order
+# is name order, paging walks the result bits from the lowest.
+#
+# The student part is rebuilt every STUDENT_TTL seconds (or sooner after
+# students_changed()); a class bitmap is reloaded from its ClassStudent
+# rows after class_changed() or CLASS_TTL seconds, so other workers'
+# enrollments show up within that time. Call the hooks after commit.
+
+STUDENT_TTL = 300
+CLASS_TTL = 30
+
+STUDENTS_QUERY = """
+    SELECT sp.id AS student_id, sp.education_level_id, sp.section_id,
+           u.first_name, u.middle_name, u.last_name, u.school_id,
+           sec.name AS section_name, el.name AS education_level_name
+    FROM StudentProfile sp
+    JOIN Users u ON u.id = sp.user_id
+    LEFT JOIN Section sec ON sec.id = sp.section_id
+    LEFT JOIN EducationLevel el ON el.id = sp.education_level_id
+    ORDER BY u.last_name, u.first_name, sp.id
+"""
+
+
+def bitmap_from_positions(positions, size):
+    """Build a bitmap in one pass (setting bits one int at a time copies the whole int)."""
+    buffer = bytearray((size + 7) // 8)
+    for n in positions:
+        buffer[n >> 3] |= 1 << (n & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def iter_bits(bitmap):
+    """Positions of the set bits, lowest first."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class StudentBitmaps:
+    """One snapshot of the students: rows by position plus the bitmaps."""
+
+    def __init__(self, rows):
+        self.rows = [dict(r) for r in rows]
+        self.position = {r["student_id"]: n for n, r in enumerate(self.rows)}
+        self.by_level = {}
+        self.by_section = {}
+        levels, sections, words = {}, {}, {}
+        for n, r in enumerate(self.rows):
+            levels.setdefault(r["education_level_id"], []).append(n)
+            sections.setdefault(r["section_id"], []).append(n)
+            haystack = " ".join(str(r[c] or "") for c in (
+                "first_name", "middle_name", "last_name", "school_id", "section_name", "education_level_name"
+            ))
+            for word in set(search_tokens(haystack.lower())):
+                words.setdefault(word, []).append(n)
+
+        size = len(self.rows)
+        self.by_level = {key: bitmap_from_positions(p, size) for key, p in levels.items()}
+        self.by_section = {key: bitmap_from_positions(p, size) for key, p in sections.items()}
+        # Most words belong to a few students: keep positions, build bitmaps per query
+        self.words = sorted(words)
+        self.word_positions = [words[w] for w in self.words]
+        self.built_at = time.monotonic()
+
+    def bitmap_of(self, student_ids):
+        positions = (self.position.get(student_id) for student_id in student_ids)
+        return bitmap_from_positions([n for n in positions if n is not None], len(self.rows))
+
+    def prefix(self, word):
+        """Students having a word that starts with `word`."""
+        start = bisect.bisect_left(self.words, word)
+        end = bisect.bisect_left(self.words, word + "\uffff")
+        return bitmap_from_positions(
+            (n for positions in self.word_positions[start:end] for n in positions), len(self.rows)
+        )
+
+    def matching(self, search):
+        """AND of the prefix matches of every word in `search` (-1 = everyone)."""
+        bitmap = -1
+        for word in search_tokens((search or "").lower()):
+            bitmap &= self.prefix(word)
+            if not bitmap:
+                break
+        return bitmap
+
+
+class EnrollmentIndex:
+    def __init__(self, student_ttl=STUDENT_TTL, class_ttl=CLASS_TTL):
+        self.student_ttl = student_ttl
+        self.class_ttl = class_ttl
+        self.lock = threading.Lock()
+        self.students = None
+        self.classes = {}
+
+    def _students(self, db):
+        with self.lock:
+            students = self.students
+        if students is None or time.monotonic() - students.built_at > self.student_ttl:
+            students = StudentBitmaps(db.session.execute(text(STUDENTS_QUERY)).mappings().all())
+            with self.lock:
+                self.students = students
+                self.classes.clear()  # positions changed
+        return students
+
+    def _enrolled(self, db, students, class_id):
+        with self.lock:
+            cached = self.classes.get(class_id)
+        if cached and cached[0] is students and time.monotonic() - cached[1] <= self.class_ttl:
+            return cached[2]
+        ids = db.session.execute(
+            text("SELECT student_id FROM ClassStudent WHERE class_id = :class_id"), {"class_id": class_id}
+        ).scalars().all()
+        bitmap = students.bitmap_of(ids)
+        with self.lock:
+            self.classes[class_id] = (students, time.monotonic(), bitmap)
+        return bitmap
+
+    def candidates(self, db, class_id, education_level_id, search="", section_id=None,
+                   offset=0, limit=50):
+        """
+        Students of the level (and section, if given) not in the class and
+        matching `search`, in name order. Returns {"rows", "total", "offset", "limit"}.
+        """
+        students = self._students(db)
+        pool = students.by_level.get(education_level_id, 0)
+        if section_id is not None:
+            pool &= students.by_section.get(section_id, 0)
+        pool &= ~self._enrolled(db, students, class_id)
+        if pool and search and search.strip():
+            pool &= students.matching(search)
+
+        rows = []
+        for n, position in enumerate(iter_bits(pool)):
+            if n >= offset + limit:
+                break
+            if n >= offset:
+                rows.append(students.rows[position])
+        return {"rows": rows, "total": pool.bit_count(), "offset": offset, "limit": limit}
+
+    def class_changed(self, *class_ids):
+        with self.lock:
+            for class_id in class_ids:
+                self.classes.pop(class_id, None)
+
+    def students_changed(self):
+        with self.lock:
+            self.students = None
+            self.classes.clear()
+
+
+enrollment_index = EnrollmentIndex()
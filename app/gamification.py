@@ -0,0 +1,168 @@
+import bisect
+import threading
+import time
+from sqlalchemy import text
+
+# ==== Gamification ====
+# Trophies and leaderboards are served from this worker's memory.
+#
+# TrophyLevel is a handful of rows: it is loaded once as a list sorted by
+# required_points and a student's trophy is found by bisection, instead of
+# a correlated MAX() subquery per dashboard.
+#
+# Leaderboards are kept per section and per class as lists sorted by
+# (-points, student_id). A board is built from StudentProfile.points the
+# first time it is asked for and then updated in place when this worker
+# awards points (record_points). Points awarded by other workers reach a
+# board when it is rebuilt, at most LEADERBOARD_TTL seconds later.
+
+TROPHY_TTL = 600
+LEADERBOARD_TTL = 120
+LEADERBOARD_SIZE = 10
+
+SCOPE_QUERIES = {
+    "section": """
+        SELECT sp.id, sp.points, u.first_name, u.last_name
+        FROM StudentProfile sp
+        JOIN Users u ON u.id = sp.user_id
+        WHERE sp.section_id = :scope_id AND u.status = 1
+    """,
+    "class": """
+        SELECT sp.id, sp.points, u.first_name, u.last_name
+        FROM ClassStudent cs
+        JOIN StudentProfile sp ON sp.id = cs.student_id
+        JOIN Users u ON u.id = sp.user_id
+        WHERE cs.class_id = :scope_id AND cs.status = 'active'
+    """,
+}
+
+
+# ==== Trophies ====
+
+class TrophyLevels:
+    """TrophyLevel as parallel sorted lists, reloaded every TROPHY_TTL seconds."""
+
+    def __init__(self, ttl=TROPHY_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.required = []
+        self.names = []
+
+    def _levels(self, db):
+        with self.lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+                rows = db.session.execute(
+                    text("SELECT name, required_points FROM TrophyLevel ORDER BY required_points, id")
+                ).fetchall()
+                self.required = [r.required_points for r in rows]
+                self.names = [r.name for r in rows]
+                self.loaded_at = time.monotonic()
+            return self.required, self.names
+
+    def trophy_for(self, db, points):
+        """Name of the highest trophy `points` reaches, or None."""
+        required, names = self._levels(db)
+        index = bisect.bisect_right(required, points or 0) - 1
+        return names[index] if index >= 0 else None
+
+    def next_trophy(self, db, points):
+        """(name, required_points) of the next trophy to earn, or None at the top."""
+        required, names = self._levels(db)
+        index = bisect.bisect_right(required, points or 0)
+        return (names[index], required[index]) if index < len(required) else None
+
+    def clear(self):
+        with self.lock:
+            self.loaded_at = None
+
+
+# ==== Leaderboards ====
+
+class Leaderboard:
+    """Students of one section or class ordered by points (highest first)."""
+
+    def __init__(self, rows):
+        self.points = {r["id"]: r["points"] or 0 for r in rows}
+        self.names = {r["id"]: f"{r['first_name']} {r['last_name']}" for r in rows}
+        self.order = sorted((-points, student_id) for student_id, points in self.points.items())
+        self.built_at = time.monotonic()
+
+    def __contains__(self, student_id):
+        return student_id in self.points
+
+    def add_points(self, student_id, delta):
+        old = self.points[student_id]
+        self.order.pop(bisect.bisect_left(self.order, (-old, student_id)))
+        self.points[student_id] = old + delta
+        bisect.insort(self.order, (-(old + delta), student_id))
+
+    def rank(self, student_id):
+        """1-based rank; students with equal points share a rank."""
+        if student_id not in self.points:
+            return None
+        return bisect.bisect_left(self.order, (-self.points[student_id],)) + 1
+
+    def top(self, n=LEADERBOARD_SIZE):
+        return [
+            {"student_id": student_id, "name": self.names[student_id], "points": -neg_points,
+             "rank": self.rank(student_id)}
+            for neg_points, student_id in self.order[:n]
+        ]
+
+
+class Leaderboards:
+    """Lazily built boards keyed by (scope, scope_id)."""
+
+    def __init__(self, ttl=LEADERBOARD_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.boards = {}
+
+    def get(self, db, scope, scope_id):
+        if scope not in SCOPE_QUERIES:
+            raise ValueError(f"Unknown leaderboard scope: {scope}")
+        key = (scope, scope_id)
+        with self.lock:
+            board = self.boards.get(key)
+            if board is not None and time.monotonic() - board.built_at <= self.ttl:
+                return board
+
+        rows = db.session.execute(text(SCOPE_QUERIES[scope]), {"scope_id": scope_id}).mappings().all()
+        board = Leaderboard(rows)
+        with self.lock:
+            self.boards[key] = board
+        return board
+
+    def record_points(self, student_id, delta):
+        """Apply a committed award to every loaded board the student is on."""
+        with self.lock:
+            for board in self.boards.values():
+                if student_id in board:
+                    board.add_points(student_id, delta)
+
+    def clear(self):
+        with self.lock:
+            self.boards.clear()
+
+
+trophies = TrophyLevels()
+leaderboards = Leaderboards()
+
+
+def trophy_for(db, points):
+    return trophies.trophy_for(db, points)
+
+
+def leaderboard_summary(db, scope, scope_id, student_id, size=LEADERBOARD_SIZE):
+    """{"top": [...], "rank", "total"} for a dashboard panel, or None without a scope."""
+    if scope_id is None:
+        return None
+    board = leaderboards.get(db, scope, scope_id)
+    return {"top": board.top(size), "rank": board.rank(student_id), "total": len(board.points)}
+
+
+def record_points(student_id, delta):
+    """Call after the transaction that awarded the points has committed."""
+    if delta:
+        leaderboards.record_points(student_id, delta)
@@ -0,0 +1,233 @@
+from sqlalchemy import text
+
+# ==== Gradebook ====
+# Class x student grade totals live in GradeSummary, one row per enrollment.
+# Write paths keep it current inside their own transaction (none of the
+# functions below commit, except rebuild_grade_summary()), so every grade page
+# is a primary-key lookup whatever the number of activities. An enrollment
+# that has no row yet is computed from source on read and left for the next
+# write (fill_missing_summary) to store: a read never commits the caller's
+# pending work. rebuild_grade_summary() recomputes it from the source tables
+# for repair.
+
+SUMMARY_FROM_SOURCE = """
+    SELECT
+        cs.class_id,
+        cs.student_id,
+        COALESCE(SUM(asub.score), 0) AS total_score,
+        COALESCE(SUM(a.max_score), 0) AS total_possible,
+        COUNT(asub.score) AS graded_count,
+        COUNT(asub.id) AS submitted_count
+    FROM ClassStudent cs
+    LEFT JOIN Activity a
+        ON a.class_id = cs.class_id
+    LEFT JOIN ActivitySubmission asub
+        ON asub.activity_id = a.id
+        AND asub.student_id = cs.student_id
+    WHERE {where}
+    GROUP BY cs.class_id, cs.student_id
+"""
+
+UPSERT_SUMMARY = """
+    INSERT INTO GradeSummary
+        (class_id, student_id, total_score, total_possible, graded_count, submitted_count)
+    SELECT * FROM ({source}) AS src
+    ON DUPLICATE KEY UPDATE
+        total_score = src.total_score,
+        total_possible = src.total_possible,
+        graded_count = src.graded_count,
+        submitted_count = src.submitted_count
+"""
+
+CLASS_GRADES_QUERY = """
+    SELECT cs.student_id, gs.class_id AS summary_class_id,
+           gs.total_score, gs.total_possible, gs.graded_count, gs.submitted_count
+    FROM ClassStudent cs
+    LEFT JOIN GradeSummary gs
+        ON gs.class_id = cs.class_id
+        AND gs.student_id = cs.student_id
+    WHERE cs.class_id = :class_id
+"""
+
+STUDENT_GRADES_QUERY = """
+    SELECT cs.class_id, gs.class_id AS summary_class_id,
+           gs.total_score, gs.total_possible, gs.graded_count, gs.submitted_count
+    FROM ClassStudent cs
+    LEFT JOIN GradeSummary gs
+        ON gs.class_id = cs.class_id
+        AND gs.student_id = cs.student_id
+    WHERE cs.student_id = :student_id
+"""
+
+def grade_totals(total_score, max_score, graded_count=0, submitted_count=0):
+    """Build the grade dict the templates expect from raw sums."""
+    total_score = int(total_score or 0)
+    max_score = int(max_score or 0)
+    percentage = (total_score / max_score * 100) if max_score > 0 else None
+    return {
+        "total_score": total_score,
+        "max_score": max_score,
+        "graded_count": int(graded_count or 0),
+        "submitted_count": int(submitted_count or 0),
+        "overall_percentage": round(percentage, 1) if percentage is not None else None
+    }
+
+
+def _row_totals(row):
+    return grade_totals(row["total_score"], row["total_possible"], row["graded_count"], row["submitted_count"])
+
+
+# =======================
+# Maintenance (write paths)
+# =======================
+def refresh_grade_summary(db, class_id, student_ids=None):
+    """Recompute GradeSummary rows for a class (optionally only some students) from source."""
+    where = "cs.class_id = :class_id"
+    params = {"class_id": class_id}
+    if student_ids is not None:
+        if not student_ids:
+            return
+        where += " AND cs.student_id IN :student_ids"
+        params["student_ids"] = tuple(student_ids)
+
+    db.session.execute(text(UPSERT_SUMMARY.format(source=SUMMARY_FROM_SOURCE.format(where=where))), params)
+
+
+def adjust_class_possible(db, class_id, delta):
+    """
+    An activity was added (delta = max_score), re-scored (delta = new - old)
+    or removed (delta = -max_score): shift total_possible for the whole class.
+    """
+    if delta:
+        db.session.execute(text("""
+            UPDATE GradeSummary
+            SET total_possible = total_possible + :delta
+            WHERE class_id = :class_id
+        """), {"delta": delta, "class_id": class_id})
+
+    # Enrollments that have no summary row yet are computed from source
+    fill_missing_summary(db, class_id)
+
+
+def remove_activity_from_summary(db, activity_id):
+    """Subtract an activity and its submissions from the summary. Call before deleting it."""
+    _subtract_activities(db, "a.id = :activity_id", {"activity_id": activity_id})
+
+
+def remove_lesson_from_summary(db, lesson_id):
+    """Subtract every activity of a lesson. Call before deleting them."""
+    _subtract_activities(db, "a.lesson_id = :lesson_id", {"lesson_id": lesson_id})
+
+
+def _subtract_activities(db, activity_filter, params):
+    db.session.execute(text(f"""
+        UPDATE GradeSummary gs
+        JOIN (
+            SELECT a.class_id, SUM(a.max_score) AS possible
+            FROM Activity a
+            WHERE {activity_filter}
+            GROUP BY a.class_id
+        ) removed ON removed.class_id = gs.class_id
+        LEFT JOIN (
+            SELECT asub.student_id,
+                   COALESCE(SUM(asub.score), 0) AS score,
+                   COUNT(asub.score) AS graded,
+                   COUNT(*) AS submitted
+            FROM ActivitySubmission asub
+            JOIN Activity a ON a.id = asub.activity_id
+            WHERE {activity_filter}
+            GROUP BY asub.student_id
+        ) removed_sub ON removed_sub.student_id = gs.student_id
+        SET gs.total_possible = gs.total_possible - COALESCE(removed.possible, 0),
+            gs.total_score = gs.total_score - COALESCE(removed_sub.score, 0),
+            gs.graded_count = gs.graded_count - COALESCE(removed_sub.graded, 0),
+            gs.submitted_count = gs.submitted_count - COALESCE(removed_sub.submitted, 0)
+    """), params)
+
+
+def drop_grade_summary(db, class_id, student_id):
+    db.session.execute(
+        text("DELETE FROM GradeSummary WHERE class_id = :class_id AND student_id = :student_id"),
+        {"class_id": class_id, "student_id": student_id}
+    )
+
+
+def rebuild_grade_summary(db):
+    """Recompute the whole table from source. Returns the number of rows written."""
+    db.session.execute(text("DELETE FROM GradeSummary"))
+    db.session.execute(text(UPSERT_SUMMARY.format(source=SUMMARY_FROM_SOURCE.format(where="1=1"))))
+    count = db.session.execute(text("SELECT COUNT(*) FROM GradeSummary")).scalar()
+    db.session.commit()
+    return count
+
+
+def fill_missing_summary(db, class_id):
+    """Add GradeSummary rows for enrollments that have none yet (e.g. after a bulk enroll)."""
+    db.session.execute(text("""
+        INSERT IGNORE INTO GradeSummary
+            (class_id, student_id, total_score, total_possible, graded_count, submitted_count)
+    """ + SUMMARY_FROM_SOURCE.format(where="""
+        cs.class_id = :class_id
+        AND NOT EXISTS (
+            SELECT 1 FROM GradeSummary gs
+            WHERE gs.class_id = cs.class_id AND gs.student_id = cs.student_id
+        )
+    """)), {"class_id": class_id})
+
+
+# =======================
+# Reads
+# =======================
+def _summary_from_source(db, where, params):
+    """Summary rows computed from source, without storing them."""
+    return db.session.execute(text(SUMMARY_FROM_SOURCE.format(where=where)), params).mappings().all()
+
+
+def class_grades(db, class_id):
+    """Grade totals for every student enrolled in a class, keyed by StudentProfile.id."""
+    query = text(CLASS_GRADES_QUERY)
+    rows = db.session.execute(query, {"class_id": class_id}).mappings().all()
+    grades = {r["student_id"]: _row_totals(r) for r in rows if r["summary_class_id"] is not None}
+
+    missing = [r["student_id"] for r in rows if r["summary_class_id"] is None]
+    if missing:
+        source = _summary_from_source(
+            db, "cs.class_id = :class_id AND cs.student_id IN :student_ids",
+            {"class_id": class_id, "student_ids": tuple(missing)}
+        )
+        grades.update({r["student_id"]: _row_totals(r) for r in source})
+
+    return grades
+
+
+def student_grades(db, student_id, class_ids=None):
+    """
+    Grade totals for one student across the classes they are enrolled in, keyed
+    by class id. Defaults to every enrolled class.
+    """
+    query = STUDENT_GRADES_QUERY
+    params = {"student_id": student_id}
+
+    if class_ids is not None:
+        if not class_ids:
+            return {}
+        query += " AND cs.class_id IN :class_ids"
+        params["class_ids"] = tuple(class_ids)
+
+    rows = db.session.execute(text(query), params).mappings().all()
+    grades = {r["class_id"]: _row_totals(r) for r in rows if r["summary_class_id"] is not None}
+
+    missing = [r["class_id"] for r in rows if r["summary_class_id"] is None]
+    if missing:
+        source = _summary_from_source(
+            db, "cs.student_id = :student_id AND cs.class_id IN :class_ids",
+            {"student_id": student_id, "class_ids": tuple(missing)}
+        )
+        grades.update({r["class_id"]: _row_totals(r) for r in source})
+
+    return grades
+
+
+def student_grade(db, student_id, class_id):
+    """Grade totals for one student in one class."""
+    return student_grades(db, student_id, [class_id]).get(class_id, grade_totals(0, 0))
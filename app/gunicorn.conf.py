@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+
+# ==== Gunicorn (production) ====
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Every setting can be overridden from the environment:
+#   WEB_WORKERS         processes (default 2 x CPUs + 1)
+#   WEB_WORKER_CLASS    sync | gthread | gevent (default gevent with live
+#                       events on, else gthread)
+#   WEB_THREADS         threads per gthread worker (default 8)
+#   WEB_PRELOAD         1 to import the app once in the master and fork it
+#                       (not with gevent: it must patch before the app loads)
+#   WEB_TIMEOUT         seconds a silent worker lives before it is restarted
+#
+# Each open live events stream (GET /events) stays open for up to
+# live_events.STREAM_SECONDS. Under gevent that is one cheap greenlet. Under
+# gthread it is a whole thread, so a class with its lessons page open would
+# take every thread of a worker: LIVE_EVENTS_MAX_STREAMS (default half the
+# threads) caps the streams per worker and the rest of the pages stay
+# static. Sync workers get no streams at all. LIVE_EVENTS=0 turns live
+# updates off.
+#
+# Reload code without dropping requests:  kill -HUP <master pid>
+# (with WEB_PRELOAD=1 the code lives in the master: use USR2 then QUIT the old
+# master instead).
+
+live_events = os.environ.get("LIVE_EVENTS", "1").strip().lower() in ("1", "true", "yes", "on")
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gevent" if live_events else "gthread")
+threads = int(os.environ.get("WEB_THREADS", 8))
+worker_connections = int(os.environ.get("WEB_WORKER_CONNECTIONS", 500))  # gevent
+preload_app = os.environ.get("WEB_PRELOAD", "0") == "1" and worker_class != "gevent"
+
+# Read by config.py when the workers build the app
+if live_events and worker_class == "gthread":
+    os.environ.setdefault("LIVE_EVENTS_MAX_STREAMS", str(max(threads // 2, 1)))
+elif live_events and worker_class == "sync":
+    os.environ.setdefault("LIVE_EVENTS_MAX_STREAMS", "0")
+
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers now and then so slow leaks never add up
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", 200))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("WEB_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    """Warm the worker up before it accepts its first request."""
+    import wsgi
+    from app import warm_up
+
+    warm_up(wsgi.app)
+    worker.log.info("Worker %s warmed up", worker.pid)
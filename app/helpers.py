@@ -3,6 +3,8 @@ from werkzeug.security import check_password_hash, generate_password_hash
 from sqlalchemy import text
 from datetime import datetime
 from database import db
+from dashboard_stats import bump, on_user_added
+from reference_data import bump_ref_version
 
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'pptx', 'jpg', 'png', 'mp4', 'zip'}
 
@@ -32,6 +34,7 @@ def is_exist(db, find_value, table_value, table):
 def delete_table_row(db, table, row_id):
     query = text(f"DELETE FROM {table} WHERE id = :row_id")
     db.session.execute(query, {"row_id": row_id})
+    bump_ref_version(db, table)
     db.session.commit()
 
 def reset_table_row(db, table, row_id):
@@ -65,6 +68,7 @@ def add_user(db, f_name, s_name, l_name, email, school_id, gender, role):
             "role": role
         }
     )
+    on_user_added(db, role)
     db.session.commit()
 
     # Get last inserted id
@@ -82,6 +86,7 @@ def assign_student_profile(db, user_id, ed_lvl, course_id, section_id=None, year
         "section_id": section_id if section_id else None,
         "year_id": year_id
     })
+    bump(db, "course_students", 1, course_id)
     db.session.commit()
 
     return db.session.execute(
@@ -101,6 +106,7 @@ def assign_teacher_profile(db, user_id, department_id, lvl_id):
             "lvl_id" : lvl_id,
         }
     )
+    bump(db, "department_teachers", 1, department_id)
 
     db.session.commit()
     return db.session.execute(text("SELECT 8 FROM StudentProfile WHERE user_id = :user_id"), {"user_id": user_id}).mappings().first()
@@ -112,6 +118,8 @@ def add_course(db, name, lvl_id):
                             {"name": name, 
                             "lvl_id": lvl_id
                             })
+    bump(db, "courses")
+    bump_ref_version(db, "Course")
     db.session.commit()
     return db.session.execute(text("SELECT id FROM Course WHERE education_level_id = :id"), {"id": lvl_id}).mappings().first()
 
@@ -120,6 +128,8 @@ def add_department(db, name, lvl_id):
                             VALUES (:name, :lvl_id)"""),
                             {"name": name,
                             "lvl_id": lvl_id})
-    
+    bump(db, "departments")
+    bump_ref_version(db, "Department")
+
     db.session.commit()
     return db.session.execute(text("SELECT id FROM Department WHERE name = :name"), {"name": name}).mappings().first()
\ No newline at end of file
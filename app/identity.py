@@ -0,0 +1,140 @@
+import time
+from flask import g, session, has_request_context
+from sqlalchemy import text
+from database import db
+
+# ==== Identity cache ====
+# The logged-in user's row, role, profile id and suspension flag, resolved
+# with one join query and then kept in the session cookie (IDENTITY_TTL
+# seconds) and on flask.g for the rest of the request.
+# Admin writes call invalidate_identity(), which bumps Users.session_version.
+# A request that takes its identity from the session checks that counter
+# with one primary key read, so an edit, suspension or archive is seen by
+# every worker on the user's next request.
+
+IDENTITY_TTL = 300
+SESSION_KEY = "identity"
+USER_FIELDS = ("id", "email", "first_name", "middle_name", "last_name",
+               "role", "school_id", "is_verified", "status")
+
+IDENTITY_QUERY = """
+    SELECT
+        u.*,
+        sp.id AS student_profile_id,
+        sp.is_suspended,
+        tp.id AS teacher_profile_id
+    FROM Users u
+    LEFT JOIN StudentProfile sp ON sp.user_id = u.id
+    LEFT JOIN TeacherProfile tp ON tp.user_id = u.id
+    WHERE {where}
+    LIMIT 1
+"""
+SESSION_VERSION_QUERY = "SELECT session_version FROM Users WHERE id = :id"
+USER_BY_SCHOOL_ID_QUERY = "SELECT id FROM Users WHERE school_id = :school_id"
+
+def fetch_identity_row(where, params):
+    """Users row plus profile columns. Includes the password hash; never cache it."""
+    return db.session.execute(text(IDENTITY_QUERY.format(where=where)), params).mappings().first()
+
+
+def build_identity(row):
+    """Session-safe identity dict from a fetch_identity_row() result."""
+    identity = {field: row[field] for field in USER_FIELDS}
+    identity["is_verified"] = bool(identity["is_verified"])
+    identity["status"] = int(identity["status"])
+
+    if row["role"] == "student":
+        identity["profile_id"] = row["student_profile_id"]
+    elif row["role"] == "teacher":
+        identity["profile_id"] = row["teacher_profile_id"]
+    else:
+        identity["profile_id"] = None
+
+    identity["is_suspended"] = bool(row["is_suspended"])
+    identity["session_version"] = row["session_version"]
+    identity["cached_at"] = time.time()
+    return identity
+
+
+def remember_identity(row):
+    """Cache an identity built from an already-fetched row (login, activation)."""
+    identity = build_identity(row)
+    g.identity = identity
+    session[SESSION_KEY] = identity
+    return identity
+
+
+def _is_fresh(identity, user_id):
+    if not identity or str(identity.get("id")) != str(user_id):
+        return False
+    return time.time() - identity.get("cached_at", 0) <= IDENTITY_TTL
+
+
+def _is_current(identity):
+    version = db.session.execute(
+        text(SESSION_VERSION_QUERY), {"id": identity["id"]}
+    ).scalar()
+    return version is not None and version == identity.get("session_version")
+
+
+def load_identity(user_id):
+    """Identity for user_id: request cache, then session cache, then one query."""
+    if not has_request_context():
+        row = fetch_identity_row("u.id = :id", {"id": user_id})
+        return build_identity(row) if row else None
+
+    identity = g.get("identity")
+    if _is_fresh(identity, user_id):
+        return identity
+
+    identity = session.get(SESSION_KEY)
+    if _is_fresh(identity, user_id) and _is_current(identity):
+        g.identity = identity
+        return identity
+
+    row = fetch_identity_row("u.id = :id", {"id": user_id})
+    if not row:
+        session.pop(SESSION_KEY, None)
+        return None
+    return remember_identity(row)
+
+
+def current_identity():
+    """Identity of the logged-in user for this request, or None."""
+    from flask_login import current_user
+    if not current_user.is_authenticated:
+        return None
+    return load_identity(current_user.get_id())
+
+
+def current_profile_id():
+    """StudentProfile.id or TeacherProfile.id of the logged-in user."""
+    identity = current_identity()
+    return identity["profile_id"] if identity else None
+
+
+def invalidate_identity(user_id=None, school_id=None):
+    """
+    Drop cached identities after an admin edits, archives, suspends or resets
+    a user. Call after the change has committed; commits the version bump.
+    """
+    if user_id is None and school_id is not None:
+        user_id = db.session.execute(
+            text(USER_BY_SCHOOL_ID_QUERY),
+            {"school_id": school_id}
+        ).scalar()
+    if user_id is None:
+        return
+
+    db.session.execute(
+        text("UPDATE Users SET session_version = session_version + 1 WHERE id = :id"), {"id": user_id}
+    )
+    db.session.commit()
+
+    if has_request_context():
+        identity = g.get("identity")
+        if identity and str(identity.get("id")) == str(user_id):
+            g.pop("identity")
+        cached = session.get(SESSION_KEY)
+        if cached and str(cached.get("id")) == str(user_id):
+            session.pop(SESSION_KEY)
@@ -125,18 +125,5 @@ INSERT INTO LessonFile (lesson_id, file_name, file_path, file_type) VALUES
 (6, 'html_basics.zip', '/uploads/lessons/html_basics.zip', 'application/zip');
 
 
-INSERT INTO StudentLessonProgress (class_id, lesson_id, student_id, status, started_at, completed_at)
-SELECT 
-    cs.class_id,
-    l.id AS lesson_id,
-    cs.student_id,
-    'not_started' AS status,
-    NULL AS started_at,
-    NULL AS completed_at
-FROM ClassStudent cs
-JOIN Lesson l ON l.class_id = cs.class_id
-LEFT JOIN StudentLessonProgress slp 
-       ON slp.class_id = cs.class_id 
-      AND slp.lesson_id = l.id 
-      AND slp.student_id = cs.student_id
-WHERE slp.id IS NULL;  -- only insert if no progress exists
+-- StudentLessonProgress rows are created when a student starts a lesson;
+-- a lesson without a row is not started.
@@ -0,0 +1,93 @@
+import random
+import threading
+from datetime import date
+from sqlalchemy import text
+
+# ==== Daily inspiration ====
+# One quote / verse / message bundle per day. The row is created on first
+# use with an idempotent upsert on the unique date, and the resolved bundle
+# is cached in this worker until the date changes, so dashboards never hit
+# the DB for it after the first request of the day.
+
+CONTENT_TABLES = ("motivational_quotes", "bible_verses", "grateful_peace_messages")
+
+_cache = {"date": None, "bundle": None}
+_lock = threading.Lock()
+
+
+def random_id(db, table):
+    """
+    Random row id without ORDER BY RAND(): pick a number between MIN(id) and
+    MAX(id) (both read from the primary key) and seek to the first id >= it.
+    """
+    if table not in CONTENT_TABLES:
+        raise ValueError(f"Unknown inspiration table: {table}")
+
+    bounds = db.session.execute(text(f"SELECT MIN(id), MAX(id) FROM {table}")).fetchone()
+    if bounds is None or bounds[0] is None:
+        return None
+
+    pick = random.randint(bounds[0], bounds[1])
+    return db.session.execute(
+        text(f"SELECT id FROM {table} WHERE id >= :pick ORDER BY id LIMIT 1"),
+        {"pick": pick}
+    ).scalar()
+
+
+def _fetch_bundle(db, day):
+    row = db.session.execute(text("""
+        SELECT di.*,
+               q.quote, q.author,
+               v.verse_text, v.reference,
+               m.message, m.theme
+        FROM daily_inspirations di
+        LEFT JOIN motivational_quotes q ON di.quote_id = q.id
+        LEFT JOIN bible_verses v ON di.verse_id = v.id
+        LEFT JOIN grateful_peace_messages m ON di.message_id = m.id
+        WHERE di.date <= :day
+        ORDER BY di.date DESC
+        LIMIT 1
+    """), {"day": day}).mappings().first()
+    return dict(row) if row else None
+
+
+def ensure_daily_inspiration(db, day=None):
+    """Create the row for `day` if no worker has yet. Safe to race: the date is unique."""
+    day = day or date.today()
+    exists = db.session.execute(
+        text("SELECT 1 FROM daily_inspirations WHERE date = :day"), {"day": day}
+    ).first()
+    if exists:
+        return
+
+    db.session.execute(text("""
+        INSERT INTO daily_inspirations (quote_id, verse_id, message_id, date)
+        VALUES (:q, :v, :m, :d)
+        ON DUPLICATE KEY UPDATE id = id
+    """), {
+        "q": random_id(db, "motivational_quotes"),
+        "v": random_id(db, "bible_verses"),
+        "m": random_id(db, "grateful_peace_messages"),
+        "d": day
+    })
+    db.session.commit()
+
+
+def get_daily_inspiration(db):
+    """Today's bundle (quote, author, verse_text, reference, message, theme)."""
+    today = date.today()
+    if _cache["date"] == today:
+        return _cache["bundle"]
+
+    with _lock:
+        if _cache["date"] != today:
+            ensure_daily_inspiration(db, today)
+            _cache["bundle"] = _fetch_bundle(db, today)
+            _cache["date"] = today
+
+    return _cache["bundle"]
+
+
+def clear_inspiration_cache():
+    _cache["date"] = None
+    _cache["bundle"] = None
@@ -0,0 +1,68 @@
+from sqlalchemy import text
+
+# ==== Lesson manifest ====
+# One LessonManifest row per lesson with what the student lessons page
+# shows next to it: the primary (latest) file, how many files there are and
+# the lesson's assignment. Lesson, file and activity writes refresh the
+# row for their lesson inside their own transaction, so the lessons page is
+# one indexed join per class instead of GROUP BYs over LessonFile and
+# Activity. rebuild_lesson_manifest() recomputes it from source for repair.
+
+MANIFEST_FROM_SOURCE = """
+    SELECT
+        l.id AS lesson_id,
+        l.class_id,
+        lf.id AS file_id,
+        lf.file_name,
+        lf.file_path,
+        lf.file_type,
+        (SELECT COUNT(*) FROM LessonFile f WHERE f.lesson_id = l.id) AS file_count,
+        a.id AS activity_id,
+        a.title AS activity_title,
+        a.due_date AS activity_due
+    FROM Lesson l
+    LEFT JOIN LessonFile lf
+        ON lf.id = (SELECT MAX(f.id) FROM LessonFile f WHERE f.lesson_id = l.id)
+    LEFT JOIN Activity a
+        ON a.id = (
+            SELECT MAX(act.id) FROM Activity act
+            WHERE act.lesson_id = l.id AND act.type = 'assignment'
+        )
+    WHERE {where}
+"""
+
+UPSERT_MANIFEST = """
+    INSERT INTO LessonManifest
+        (lesson_id, class_id, file_id, file_name, file_path, file_type, file_count,
+         activity_id, activity_title, activity_due)
+    SELECT * FROM ({source}) AS src
+    ON DUPLICATE KEY UPDATE
+        class_id = src.class_id,
+        file_id = src.file_id,
+        file_name = src.file_name,
+        file_path = src.file_path,
+        file_type = src.file_type,
+        file_count = src.file_count,
+        activity_id = src.activity_id,
+        activity_title = src.activity_title,
+        activity_due = src.activity_due
+"""
+
+
+def refresh_lesson_manifest(db, lesson_id):
+    """Recompute the manifest row of one lesson. Does not commit."""
+    if lesson_id is None:
+        return
+    db.session.execute(
+        text(UPSERT_MANIFEST.format(source=MANIFEST_FROM_SOURCE.format(where="l.id = :lesson_id"))),
+        {"lesson_id": lesson_id}
+    )
+
+
+def rebuild_lesson_manifest(db):
+    """Recompute the whole table from source. Returns the number of rows written."""
+    db.session.execute(text("DELETE FROM LessonManifest"))
+    db.session.execute(text(UPSERT_MANIFEST.format(source=MANIFEST_FROM_SOURCE.format(where="1=1"))))
+    count = db.session.execute(text("SELECT COUNT(*) FROM LessonManifest")).scalar()
+    db.session.commit()
+    return count
@@ -0,0 +1,130 @@
+import bisect
+from sqlalchemy import text
+
+# ==== Lesson ordering ====
+# Lesson.lesson_number is a sparse sort key: lessons are spaced ORDER_GAP
+# apart, so a lesson moved between two others gets a key in the gap and is
+# the only row written. The number shown to users ("Lesson 3") is derived
+# when reading with LESSON_NUMBER (ROW_NUMBER over the key).
+#
+#   append:  the class row is locked (SELECT ... FOR UPDATE) while the next
+#            key is read and the lesson inserted, so concurrent adds to one
+#            class never get the same key
+#   reorder: the posted order is compared with the stored keys; lessons on
+#            the longest already-ordered run keep their keys and only the
+#            rest are rewritten, all in one UPDATE ... CASE statement (when
+#            a gap runs out the whole class is respaced in that statement)
+
+ORDER_GAP = 1024
+
+# Display number for lesson queries that read a single class
+LESSON_NUMBER = "ROW_NUMBER() OVER (ORDER BY l.lesson_number, l.id)"
+
+
+class LessonOrderError(ValueError):
+    """The posted order does not match the lessons of the class."""
+
+
+def insert_lesson(db, class_id, title, description):
+    """Insert a lesson at the end of the class and return its id. Does not commit."""
+    db.session.execute(
+        text("SELECT id FROM Class WHERE id = :class_id FOR UPDATE"), {"class_id": class_id}
+    )
+    db.session.execute(text("""
+        INSERT INTO Lesson (class_id, lesson_number, title, description, created_at, updated_at)
+        SELECT :class_id, COALESCE(MAX(lesson_number), 0) + :gap, :title, :description, NOW(), NOW()
+        FROM Lesson
+        WHERE class_id = :class_id
+    """), {"class_id": class_id, "gap": ORDER_GAP, "title": title, "description": description})
+    return db.session.execute(text("SELECT LAST_INSERT_ID()")).scalar()
+
+
+def _kept_indexes(keys):
+    """Indexes of a longest strictly increasing run of `keys` (patience sort)."""
+    tails, tail_index, previous = [], [], [None] * len(keys)
+    for i, key in enumerate(keys):
+        pos = bisect.bisect_left(tails, key)
+        if pos == len(tails):
+            tails.append(key)
+            tail_index.append(i)
+        else:
+            tails[pos] = key
+            tail_index[pos] = i
+        previous[i] = tail_index[pos - 1] if pos else None
+
+    kept = set()
+    i = tail_index[-1] if tail_index else None
+    while i is not None:
+        kept.add(i)
+        i = previous[i]
+    return kept
+
+
+def plan_order(ordered_ids, current, gap=ORDER_GAP):
+    """
+    New keys for the lessons that must move so `ordered_ids` reads in key
+    order. `current` maps lesson id -> stored key. Returns {id: key}; when a
+    gap is too small for the lessons placed in it, every lesson is respaced.
+    """
+    keys = [current[lesson_id] for lesson_id in ordered_ids]
+    kept = _kept_indexes(keys)
+    changes = {}
+
+    i = 0
+    while i < len(ordered_ids):
+        if i in kept:
+            i += 1
+            continue
+        start = i
+        while i < len(ordered_ids) and i not in kept:
+            i += 1
+        run = ordered_ids[start:i]
+        high = keys[i] if i < len(ordered_ids) else None
+        low = keys[start - 1] if start > 0 else None
+        if low is None and high is None:
+            low = 0
+        if high is None:
+            new_keys = [low + gap * (n + 1) for n in range(len(run))]
+        else:
+            if low is None:
+                low = high - gap * (len(run) + 1)
+            step = (high - low) // (len(run) + 1)
+            if step < 1:
+                return {lesson_id: gap * (n + 1) for n, lesson_id in enumerate(ordered_ids)}
+            new_keys = [low + step * (n + 1) for n in range(len(run))]
+        changes.update(zip(run, new_keys))
+
+    return changes
+
+
+def _write_keys(db, class_id, changes):
+    if not changes:
+        return 0
+    params = {"class_id": class_id}
+    cases = []
+    for n, (lesson_id, key) in enumerate(changes.items()):
+        params[f"id{n}"] = lesson_id
+        params[f"key{n}"] = key
+        cases.append(f"WHEN :id{n} THEN :key{n}")
+    ids = ", ".join(f":id{n}" for n in range(len(changes)))
+    db.session.execute(text(f"""
+        UPDATE Lesson
+        SET lesson_number = CASE id {' '.join(cases)} END
+        WHERE class_id = :class_id AND id IN ({ids})
+    """), params)
+    return len(changes)
+
+
+def apply_order(db, class_id, ordered_ids):
+    """
+    Store a full lesson order for a class with one UPDATE. Returns the number
+    of lessons whose key changed. Does not commit.
+    """
+    current = dict(db.session.execute(
+        text("SELECT id, lesson_number FROM Lesson WHERE class_id = :class_id FOR UPDATE"),
+        {"class_id": class_id}
+    ).fetchall())
+    if len(ordered_ids) != len(current) or set(ordered_ids) != set(current):
+        raise LessonOrderError("The lesson list has changed; reload the page and try again.")
+    return _write_keys(db, class_id, plan_order(ordered_ids, current))
+
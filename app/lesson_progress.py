@@ -0,0 +1,112 @@
+from sqlalchemy import text
+from progress_rollup import on_lesson_started, on_lesson_completed
+from activity_feed import log_lesson_event, EVENT_LESSON_STARTED, EVENT_LESSON_COMPLETED
+
+# ==== Lesson progress transitions ====
+# not started (no row) -> in_progress -> completed
+#
+# Each step is one guarded statement and a request only tries the step that
+# follows the status its page showed, so double clicks and parallel tabs
+# cannot skip or repeat a step: the loser of a race matches no row.
+#   start:    INSERT IGNORE ... SELECT (only for an active class the student
+#             is actively enrolled in; the unique key stops a second insert)
+#   complete: UPDATE ... WHERE status = 'in_progress'
+# Completing a lesson appends to PointsLedger (unique per student, reason
+# and lesson) and adds the points to StudentProfile.points in SQL. Each step
+# also bumps the student's ClassProgressRollup row and appends to the
+# ActivityFeed.
+# Nothing here commits.
+
+POINTS_PER_LESSON = 1
+LESSON_COMPLETED = "lesson_completed"
+
+
+def _start(db, student_id, lesson_id):
+    return db.session.execute(text("""
+        INSERT IGNORE INTO StudentLessonProgress (class_id, lesson_id, student_id, status, started_at)
+        SELECT l.class_id, l.id, cs.student_id, 'in_progress', NOW()
+        FROM Lesson l
+        JOIN Class c ON c.id = l.class_id AND c.status = 'active'
+        JOIN ClassStudent cs
+            ON cs.class_id = l.class_id AND cs.student_id = :student_id AND cs.status = 'active'
+        WHERE l.id = :lesson_id
+    """), {"student_id": student_id, "lesson_id": lesson_id}).rowcount == 1
+
+
+def _complete(db, student_id, lesson_id):
+    return db.session.execute(text("""
+        UPDATE StudentLessonProgress
+        SET completed_at = NOW(),
+            status = 'completed'
+        WHERE lesson_id = :lesson_id
+          AND student_id = :student_id
+          AND status = 'in_progress'
+          AND class_id IN (SELECT id FROM Class WHERE status = 'active')
+    """), {"student_id": student_id, "lesson_id": lesson_id}).rowcount == 1
+
+
+def award_points(db, student_id, points, reason, lesson_id=None):
+    """Append to the ledger and add to the total; no-op if already awarded. Returns points added."""
+    inserted = db.session.execute(text("""
+        INSERT IGNORE INTO PointsLedger (student_id, lesson_id, reason, points)
+        VALUES (:student_id, :lesson_id, :reason, :points)
+    """), {"student_id": student_id, "lesson_id": lesson_id, "reason": reason, "points": points}).rowcount
+    if not inserted:
+        return 0
+
+    db.session.execute(
+        text("UPDATE StudentProfile SET points = points + :points WHERE id = :student_id"),
+        {"student_id": student_id, "points": points}
+    )
+    return points
+
+
+def _current_state(db, student_id, lesson_id):
+    return db.session.execute(text("""
+        SELECT c.status AS class_status, cs.status AS enrollment_status,
+               COALESCE(slp.status, 'not_started') AS status
+        FROM Lesson l
+        JOIN Class c ON c.id = l.class_id
+        LEFT JOIN ClassStudent cs ON cs.class_id = l.class_id AND cs.student_id = :student_id
+        LEFT JOIN StudentLessonProgress slp ON slp.lesson_id = l.id AND slp.student_id = :student_id
+        WHERE l.id = :lesson_id
+    """), {"student_id": student_id, "lesson_id": lesson_id}).mappings().first()
+
+
+def advance_lesson_progress(db, student_id, lesson_id, current=None):
+    """
+    Move a lesson one step forward from `current`, the status the page
+    showed: "in_progress" completes it, anything else starts it. Only that
+    one transition is tried, so a double click or a stale tab never moves
+    the lesson two steps.
+    Returns {"status", "changed", "points_awarded", "blocked"} where blocked
+    is None, "not_found", "class_closed" or "not_enrolled"; when nothing
+    moved, status is the lesson's current state.
+    """
+    if current == "in_progress":
+        if _complete(db, student_id, lesson_id):
+            on_lesson_completed(db, student_id, lesson_id)
+            awarded = award_points(db, student_id, POINTS_PER_LESSON, LESSON_COMPLETED, lesson_id)
+            log_lesson_event(db, EVENT_LESSON_COMPLETED, student_id, lesson_id)
+            return {"status": "completed", "changed": True, "points_awarded": awarded, "blocked": None}
+    elif _start(db, student_id, lesson_id):
+        on_lesson_started(db, student_id, lesson_id)
+        log_lesson_event(db, EVENT_LESSON_STARTED, student_id, lesson_id)
+        return {"status": "in_progress", "changed": True, "points_awarded": 0, "blocked": None}
+
+    # Nothing moved: already past that step, or not allowed
+    state = _current_state(db, student_id, lesson_id)
+    if not state:
+        blocked = "not_found"
+    elif state["class_status"] != "active":
+        blocked = "class_closed"
+    elif state["enrollment_status"] != "active":
+        blocked = "not_enrolled"
+    else:
+        blocked = None
+    return {
+        "status": state["status"] if state else None,
+        "changed": False,
+        "points_awarded": 0,
+        "blocked": blocked,
+    }
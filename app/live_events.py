@@ -0,0 +1,339 @@
+import json
+import os
+import queue
+import threading
+import time
+from sqlalchemy import text
+
+# ==== Live events ====
+# Server-sent events (GET /events) for pages that patch themselves when a
+# submission, grade or lesson progress change is committed, instead of being
+# reloaded to re-run their queries.
+#
+#   publish()    called by the routes after commit with the recipient
+#                channels ("teacher:<TeacherProfile.id>" / "student:<StudentProfile.id>")
+#                and a compact event: ids plus the numbers pages display
+#   EventHub     per worker: channel -> subscriptions, one bounded queue per
+#                open stream; a stream that falls behind gets a "resync"
+#                event instead of the backlog
+#   brokers      how a published event reaches the hubs:
+#                  LocalBroker  straight to this worker's hub (one worker)
+#                  SpoolBroker  appended as a JSON line to a spool file in
+#                               EVENT_SPOOL_DIR that every worker on the host
+#                               tails, a local stand-in for a message broker
+#
+# An open stream holds a worker thread (gthread) or a greenlet (gevent) for
+# up to STREAM_SECONDS, then the browser reconnects; it holds no database
+# connection. gunicorn.conf.py runs gevent workers while live events are on.
+# Under thread workers LIVE_EVENTS_MAX_STREAMS caps the streams of a worker
+# so they can never take every thread: past the cap /events answers 204 and
+# the page simply stays static. Pages only open a stream while visible.
+
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 20
+STREAM_SECONDS = 300
+RETRY_MS = 3000
+
+SPOOL_POLL_SECONDS = 0.25
+SPOOL_SEGMENT_SECONDS = 60
+SPOOL_KEEP_SEGMENTS = 10
+
+RESYNC = "resync"
+
+
+def teacher_channel(teacher_id):
+    return f"teacher:{teacher_id}"
+
+
+def student_channel(student_id):
+    return f"student:{student_id}"
+
+
+def user_channels(role, profile_id):
+    """Channels the logged-in user may listen to."""
+    if profile_id is None:
+        return []
+    if role == "teacher":
+        return [teacher_channel(profile_id)]
+    if role == "student":
+        return [student_channel(profile_id)]
+    return []
+
+
+# =======================
+# Hub
+# =======================
+class Subscription:
+    """One open stream: the channels it listens to and its pending events."""
+
+    def __init__(self, channels, size=QUEUE_SIZE):
+        self.channels = frozenset(channels)
+        self.queue = queue.Queue(size)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, a resync event after an overflow, or None on timeout."""
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {"type": RESYNC}
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBroker:
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, channels, event):
+        self.hub.deliver(channels, event)
+
+    def listening(self):
+        pass
+
+
+class SpoolBroker:
+    """
+    Fan-out between the workers of one host through append-only spool files.
+    A new file is started every SPOOL_SEGMENT_SECONDS; each worker tails the
+    current one from the moment its first stream opens, and old files are
+    removed after SPOOL_KEEP_SEGMENTS segments.
+    """
+
+    def __init__(self, hub, directory):
+        self.hub = hub
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"events-{segment}.log")
+
+    def publish(self, channels, event):
+        line = json.dumps({"channels": channels, "event": event}, default=str, separators=(",", ":"))
+        segment = int(time.time() // SPOOL_SEGMENT_SECONDS)
+        # One write() on an O_APPEND file: lines from several workers never interleave
+        fd = os.open(self._segment_path(segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (line + "\n").encode())
+        finally:
+            os.close(fd)
+
+    def listening(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._tail, name="event-spool", daemon=True)
+                self.thread.start()
+
+    def _tail(self):
+        segment = int(time.time() // SPOOL_SEGMENT_SECONDS)
+        try:
+            offset = os.path.getsize(self._segment_path(segment))
+        except OSError:
+            offset = 0
+        pending = b""
+
+        while True:
+            try:
+                with open(self._segment_path(segment), "rb") as spool:
+                    spool.seek(offset)
+                    data = spool.read()
+            except OSError:
+                data = b""
+
+            if data:
+                offset += len(data)
+                *lines, pending = (pending + data).split(b"\n")
+                for line in lines:
+                    self._deliver(line)
+                continue
+
+            # Move on once the segment has ended (with a second's grace for late writers)
+            if time.time() > (segment + 1) * SPOOL_SEGMENT_SECONDS + 1:
+                segment += 1
+                offset = 0
+                pending = b""
+                self._remove_old(segment)
+                continue
+
+            time.sleep(SPOOL_POLL_SECONDS)
+
+    def _deliver(self, line):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+        self.hub.deliver(message["channels"], message["event"])
+
+    def _remove_old(self, segment):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not (name.startswith("events-") and name.endswith(".log")):
+                continue
+            try:
+                if int(name[7:-4]) < segment - SPOOL_KEEP_SEGMENTS:
+                    os.remove(os.path.join(self.directory, name))
+            except (ValueError, OSError):
+                pass
+
+
+class EventHub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.broker = LocalBroker(self)
+        self.max_streams = None
+        self.open_streams = 0
+
+    def use_broker(self, broker):
+        self.broker = broker
+
+    def subscribe(self, channels):
+        """A new subscription, or None when this worker is at max_streams."""
+        subscription = Subscription(channels)
+        with self.lock:
+            if self.max_streams is not None and self.open_streams >= self.max_streams:
+                return None
+            self.open_streams += 1
+            for channel in subscription.channels:
+                self.subscribers.setdefault(channel, set()).add(subscription)
+        self.broker.listening()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.open_streams -= 1
+            for channel in subscription.channels:
+                listeners = self.subscribers.get(channel)
+                if listeners is not None:
+                    listeners.discard(subscription)
+                    if not listeners:
+                        del self.subscribers[channel]
+
+    def deliver(self, channels, event):
+        """Hand an event to this worker's streams on any of `channels`."""
+        with self.lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self.subscribers.get(channel, ()))
+        for subscription in targets:
+            subscription.put(event)
+
+    def publish(self, channels, event):
+        if channels:
+            self.broker.publish(sorted(set(channels)), event)
+
+
+hub = EventHub()
+
+
+def init_live_events(app):
+    """
+    Fan out through spool files when EVENT_SPOOL_DIR is set (several workers)
+    and cap the open streams at LIVE_EVENTS_MAX_STREAMS when set.
+    """
+    directory = app.config.get("EVENT_SPOOL_DIR")
+    if directory:
+        hub.use_broker(SpoolBroker(hub, directory))
+    hub.max_streams = app.config.get("LIVE_EVENTS_MAX_STREAMS")
+
+
+def publish(channels, event_type, **data):
+    """Push an event to the given channels. Call after the change has committed."""
+    hub.publish(channels, {"type": event_type, **data})
+
+
+# =======================
+# Recipients
+# =======================
+AUDIENCE_QUERY = """
+    SELECT c.id AS class_id, c.teacher_id, sec.teacher_id AS adviser_id
+    FROM {source}
+    LEFT JOIN Section sec ON sec.id = c.section_id
+    WHERE {where}
+"""
+
+
+def _audience(row, student_id=None):
+    if not row:
+        return []
+    channels = [teacher_channel(row["teacher_id"])]
+    if row["adviser_id"] is not None:
+        channels.append(teacher_channel(row["adviser_id"]))
+    if student_id is not None:
+        channels.append(student_channel(student_id))
+    return channels
+
+
+def class_audience(db, class_id, student_id=None):
+    """The class teacher, the section adviser and (optionally) the student."""
+    row = db.session.execute(
+        text(AUDIENCE_QUERY.format(source="Class c", where="c.id = :class_id")), {"class_id": class_id}
+    ).mappings().first()
+    return _audience(row, student_id)
+
+
+def lesson_audience(db, lesson_id, student_id=None):
+    """(class_id, channels) for an event about a lesson."""
+    row = db.session.execute(
+        text(AUDIENCE_QUERY.format(source="Lesson l JOIN Class c ON c.id = l.class_id", where="l.id = :lesson_id")),
+        {"lesson_id": lesson_id}
+    ).mappings().first()
+    return (row["class_id"] if row else None), _audience(row, student_id)
+
+
+# =======================
+# Stream
+# =======================
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str, separators=(',', ':'))}\n\n"
+
+
+def open_stream(channels, lifetime=STREAM_SECONDS, heartbeat=HEARTBEAT_SECONDS):
+    """
+    text/event-stream body for one client (holds no request context), or
+    None when this worker has no room for another stream.
+    """
+    subscription = hub.subscribe(channels)
+    if subscription is None:
+        return None
+    return EventStream(subscription, lifetime, heartbeat)
+
+
+class EventStream:
+    """
+    Response body of one stream. The WSGI server calls close() when the
+    response ends or the client goes away, even if the body was never
+    iterated (a bare generator would then skip its cleanup and leak its slot).
+    """
+
+    def __init__(self, subscription, lifetime, heartbeat):
+        self.subscription = subscription
+        self.lifetime = lifetime
+        self.heartbeat = heartbeat
+        self.closed = False
+
+    def __iter__(self):
+        yield f"retry: {RETRY_MS}\n\n"
+        deadline = time.monotonic() + self.lifetime
+        while not self.closed and time.monotonic() < deadline:
+            event = self.subscription.get(timeout=self.heartbeat)
+            yield ": keep-alive\n\n" if event is None else format_event(event)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            hub.unsubscribe(self.subscription)
@@ -0,0 +1,95 @@
+import os
+import re
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# ==== Schema migrations ====
+# Versioned .sql files in migrations/, applied in file-name order and recorded
+# in schema_migrations. schema.sql always holds the full current schema, so a
+# fresh database may already contain what a migration creates; "already
+# exists" errors are therefore skipped, which also makes a half-applied
+# migration safe to re-run (MySQL DDL is not transactional).
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# 1050 table exists, 1060 duplicate column, 1061 duplicate key name,
+# 1826 duplicate foreign key constraint name
+IGNORABLE_ERRORS = {1050, 1060, 1061, 1826}
+
+
+def _ensure_migrations_table(db):
+    db.session.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(100) PRIMARY KEY,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    db.session.commit()
+
+
+def available_migrations():
+    """(version, path) for every migration file, in apply order."""
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return []
+    return [
+        (name.rsplit(".", 1)[0], os.path.join(MIGRATIONS_DIR, name))
+        for name in sorted(os.listdir(MIGRATIONS_DIR))
+        if name.endswith(".sql")
+    ]
+
+
+def applied_migrations(db):
+    _ensure_migrations_table(db)
+    return set(db.session.execute(text("SELECT version FROM schema_migrations")).scalars().all())
+
+
+def pending_migrations(db):
+    applied = applied_migrations(db)
+    return [(version, path) for version, path in available_migrations() if version not in applied]
+
+
+def split_statements(sql):
+    """Split a migration file on semicolons at line ends, dropping -- comments."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = re.split(r";\s*$", "\n".join(lines), flags=re.MULTILINE)
+    return [s.strip() for s in statements if s.strip()]
+
+
+def _error_code(error):
+    args = getattr(error.orig, "args", ())
+    return args[0] if args else None
+
+
+def apply_migration(db, version, path):
+    """Run one migration file and record it. Returns the number of statements skipped."""
+    with open(path, encoding="utf-8") as f:
+        statements = split_statements(f.read())
+
+    skipped = 0
+    for statement in statements:
+        try:
+            db.session.connection().exec_driver_sql(statement)
+        except DBAPIError as e:
+            db.session.rollback()
+            if _error_code(e) not in IGNORABLE_ERRORS:
+                raise
+            skipped += 1
+
+    db.session.execute(
+        text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+        {"version": version}
+    )
+    db.session.commit()
+    return skipped
+
+
+def apply_migrations(db, log=print):
+    """Apply every pending migration in order. Returns the versions applied."""
+    applied = []
+    for version, path in pending_migrations(db):
+        skipped = apply_migration(db, version, path)
+        log(f"Applied {version}" + (f" ({skipped} statement(s) already in place)" if skipped else ""))
+        applied.append(version)
+    if not applied:
+        log("Database is up to date.")
+    return applied
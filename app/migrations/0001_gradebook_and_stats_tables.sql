@@ -0,0 +1,23 @@
+-- Tables added after the original schema.sql: materialized gradebook and
+-- admin dashboard rollup. Safe on databases created from the newer schema.sql.
+
+CREATE TABLE IF NOT EXISTS GradeSummary (
+    class_id INT NOT NULL,
+    student_id INT NOT NULL,
+    total_score INT NOT NULL DEFAULT 0,
+    total_possible INT NOT NULL DEFAULT 0,
+    graded_count INT NOT NULL DEFAULT 0,
+    submitted_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (class_id, student_id),
+    FOREIGN KEY (class_id) REFERENCES Class(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES StudentProfile(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS StatsCounter (
+    metric VARCHAR(50) NOT NULL,
+    bucket_id INT NOT NULL DEFAULT 0,
+    value INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, bucket_id)
+);
@@ -0,0 +1,42 @@
+-- Composite indexes for the hot predicates of the admin lists, teacher and
+-- student pages. Single-column FK indexes (StudentProfile.user_id,
+-- ClassStudent.student_id, ...) already exist and are not repeated here.
+
+-- Admin student/teacher lists: role + status filter, ordered by name
+CREATE INDEX idx_users_role_status_name ON Users (role, status, last_name, first_name);
+-- Lookups by school ID (edit, archive, progress, activation)
+CREATE INDEX idx_users_school_id ON Users (school_id);
+
+-- Section lists / cascading dropdowns
+CREATE INDEX idx_section_level_year_status ON Section (education_lvl_id, year_id, status);
+CREATE INDEX idx_section_course_year_status ON Section (course_id, year_id, status);
+CREATE INDEX idx_section_teacher_status ON Section (teacher_id, status);
+
+-- Dropdowns filtered by level and status
+CREATE INDEX idx_course_level_status ON Course (education_level_id, status);
+CREATE INDEX idx_department_level_status ON Department (education_level_id, status);
+CREATE INDEX idx_subject_level_status ON Subject (education_level_id, status);
+
+-- Teacher class list, student dashboards
+CREATE INDEX idx_class_teacher_status ON Class (teacher_id, status);
+CREATE INDEX idx_class_section_status ON Class (section_id, status);
+
+-- Rosters and per-student enrollment
+CREATE INDEX idx_classstudent_student_status ON ClassStudent (student_id, status);
+
+-- Lessons in order
+CREATE INDEX idx_lesson_class_number ON Lesson (class_id, lesson_number);
+
+-- Progress per student / recent progress
+CREATE INDEX idx_progress_student_status ON StudentLessonProgress (student_id, status);
+CREATE INDEX idx_progress_status_completed ON StudentLessonProgress (status, completed_at);
+
+-- Activities by class and type, by lesson and type
+CREATE INDEX idx_activity_class_type ON Activity (class_id, type);
+CREATE INDEX idx_activity_lesson_type ON Activity (lesson_id, type);
+
+-- Submissions per student
+CREATE INDEX idx_submission_student_activity ON ActivitySubmission (student_id, activity_id);
+
+-- Trophy resolution
+CREATE INDEX idx_trophy_required_points ON TrophyLevel (required_points);
@@ -0,0 +1,8 @@
+-- FULLTEXT indexes used by search.py. Column lists must stay in sync with
+-- search.FULLTEXT_COLUMNS.
+
+CREATE FULLTEXT INDEX ft_users_people ON Users (first_name, middle_name, last_name, email, school_id);
+CREATE FULLTEXT INDEX ft_section_name ON Section (name, academic_year);
+CREATE FULLTEXT INDEX ft_course_name ON Course (name);
+CREATE FULLTEXT INDEX ft_department_name ON Department (name);
+CREATE FULLTEXT INDEX ft_subject_name ON Subject (name);
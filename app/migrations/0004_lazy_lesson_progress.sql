@@ -0,0 +1,6 @@
+-- Lesson progress is lazy: a StudentLessonProgress row is created on the
+-- first transition (start) and a missing row means "not_started". Drop the
+-- placeholder rows that viewing the lessons page used to insert.
+
+DELETE FROM StudentLessonProgress
+WHERE status = 'not_started' AND started_at IS NULL AND completed_at IS NULL;
@@ -0,0 +1,20 @@
+-- Append-only points ledger written by lesson_progress.award_points().
+-- Lessons completed before the ledger existed are recorded once so they
+-- cannot be awarded again; StudentProfile.points already includes them.
+
+CREATE TABLE IF NOT EXISTS PointsLedger (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    student_id INT NOT NULL,
+    lesson_id INT NULL,
+    reason VARCHAR(30) NOT NULL,
+    points INT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (student_id) REFERENCES StudentProfile(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (lesson_id) REFERENCES Lesson(id) ON UPDATE CASCADE ON DELETE SET NULL,
+    UNIQUE KEY unique_award(student_id, reason, lesson_id)
+);
+
+INSERT IGNORE INTO PointsLedger (student_id, lesson_id, reason, points, created_at)
+SELECT student_id, lesson_id, 'lesson_completed', 1, COALESCE(completed_at, NOW())
+FROM StudentLessonProgress
+WHERE status = 'completed';
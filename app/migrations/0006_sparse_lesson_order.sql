@@ -0,0 +1,12 @@
+-- Lesson.lesson_number becomes a sparse sort key (see lesson_order.py).
+-- Respace existing lessons 1024 apart, keeping their order; duplicate
+-- numbers left by concurrent adds are broken by id.
+
+ALTER TABLE Lesson MODIFY lesson_number INT NOT NULL COMMENT 'Sparse sort key within the class (see lesson_order.py)';
+
+UPDATE Lesson l
+JOIN (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY class_id ORDER BY lesson_number, id) AS n
+    FROM Lesson
+) ordered ON ordered.id = l.id
+SET l.lesson_number = ordered.n * 1024;
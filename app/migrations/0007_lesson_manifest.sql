@@ -0,0 +1,42 @@
+-- Per-lesson file / assignment summary for the student lessons page,
+-- maintained by lesson_manifest.refresh_lesson_manifest(). Filled here for
+-- existing lessons.
+
+CREATE TABLE IF NOT EXISTS LessonManifest (
+    lesson_id INT PRIMARY KEY,
+    class_id INT NOT NULL,
+    file_id INT NULL COMMENT 'Latest LessonFile of the lesson',
+    file_name VARCHAR(255) NULL,
+    file_path VARCHAR(255) NULL,
+    file_type VARCHAR(100) NULL,
+    file_count INT NOT NULL DEFAULT 0,
+    activity_id INT NULL COMMENT 'Latest assignment of the lesson',
+    activity_title VARCHAR(255) NULL,
+    activity_due DATETIME NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (lesson_id) REFERENCES Lesson(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    INDEX idx_manifest_class (class_id)
+);
+
+INSERT IGNORE INTO LessonManifest
+    (lesson_id, class_id, file_id, file_name, file_path, file_type, file_count,
+     activity_id, activity_title, activity_due)
+SELECT
+    l.id,
+    l.class_id,
+    lf.id,
+    lf.file_name,
+    lf.file_path,
+    lf.file_type,
+    (SELECT COUNT(*) FROM LessonFile f WHERE f.lesson_id = l.id),
+    a.id,
+    a.title,
+    a.due_date
+FROM Lesson l
+LEFT JOIN LessonFile lf
+    ON lf.id = (SELECT MAX(f.id) FROM LessonFile f WHERE f.lesson_id = l.id)
+LEFT JOIN Activity a
+    ON a.id = (
+        SELECT MAX(act.id) FROM Activity act
+        WHERE act.lesson_id = l.id AND act.type = 'assignment'
+    );
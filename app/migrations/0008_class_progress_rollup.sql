@@ -0,0 +1,32 @@
+-- Class x student lesson progress counts for the student classes, history
+-- and dashboard pages (see progress_rollup.py). Filled here for existing
+-- enrollments.
+
+CREATE TABLE IF NOT EXISTS ClassProgressRollup (
+    class_id INT NOT NULL,
+    student_id INT NOT NULL,
+    total_lessons INT NOT NULL DEFAULT 0,
+    completed_lessons INT NOT NULL DEFAULT 0,
+    in_progress_lessons INT NOT NULL DEFAULT 0,
+    last_activity_at DATETIME NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (class_id, student_id),
+    FOREIGN KEY (class_id) REFERENCES Class(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES StudentProfile(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    INDEX idx_rollup_student (student_id)
+);
+
+INSERT IGNORE INTO ClassProgressRollup
+    (class_id, student_id, total_lessons, completed_lessons, in_progress_lessons, last_activity_at)
+SELECT
+    cs.class_id,
+    cs.student_id,
+    (SELECT COUNT(*) FROM Lesson l WHERE l.class_id = cs.class_id),
+    COUNT(CASE WHEN slp.status = 'completed' THEN 1 END),
+    COUNT(CASE WHEN slp.status = 'in_progress' THEN 1 END),
+    MAX(COALESCE(slp.completed_at, slp.started_at))
+FROM ClassStudent cs
+LEFT JOIN StudentLessonProgress slp
+    ON slp.class_id = cs.class_id
+    AND slp.student_id = cs.student_id
+GROUP BY cs.class_id, cs.student_id;
@@ -0,0 +1,50 @@
+-- Append-only activity feed read by the teacher dashboard (see
+-- activity_feed.py). Recent lesson progress and submissions are copied in,
+-- oldest first so ids follow time; grades have no timestamp to copy.
+
+CREATE TABLE IF NOT EXISTS ActivityFeed (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    event_type VARCHAR(30) NOT NULL,
+    teacher_id INT NULL COMMENT 'Section adviser when the event happened',
+    section_id INT NOT NULL,
+    class_id INT NOT NULL,
+    student_id INT NOT NULL,
+    lesson_id INT NULL,
+    activity_id INT NULL,
+    score INT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_feed_teacher (teacher_id, id),
+    INDEX idx_feed_section (section_id, id),
+    INDEX idx_feed_class (class_id, id),
+    INDEX idx_feed_created (created_at)
+);
+
+INSERT INTO ActivityFeed
+    (event_type, teacher_id, section_id, class_id, student_id, lesson_id, activity_id, created_at)
+SELECT event_type, teacher_id, section_id, class_id, student_id, lesson_id, activity_id, created_at
+FROM (
+    SELECT 'lesson_started' AS event_type, sec.teacher_id, c.section_id, c.id AS class_id,
+           slp.student_id, slp.lesson_id, NULL AS activity_id, slp.started_at AS created_at
+    FROM StudentLessonProgress slp
+    JOIN Class c ON c.id = slp.class_id
+    JOIN Section sec ON sec.id = c.section_id
+    WHERE slp.started_at >= NOW() - INTERVAL 180 DAY
+    UNION ALL
+    SELECT 'lesson_completed', sec.teacher_id, c.section_id, c.id,
+           slp.student_id, slp.lesson_id, NULL, slp.completed_at
+    FROM StudentLessonProgress slp
+    JOIN Class c ON c.id = slp.class_id
+    JOIN Section sec ON sec.id = c.section_id
+    WHERE slp.status = 'completed' AND slp.completed_at >= NOW() - INTERVAL 180 DAY
+    UNION ALL
+    SELECT 'activity_submitted', sec.teacher_id, c.section_id, c.id,
+           s.student_id, a.lesson_id, a.id, s.submitted_at
+    FROM ActivitySubmission s
+    JOIN Activity a ON a.id = s.activity_id
+    JOIN Class c ON c.id = a.class_id
+    JOIN Section sec ON sec.id = c.section_id
+    WHERE s.submitted_at >= NOW() - INTERVAL 180 DAY
+) events
+-- Only into an empty feed, so a re-run does not duplicate the history
+WHERE NOT EXISTS (SELECT 1 FROM ActivityFeed)
+ORDER BY created_at;
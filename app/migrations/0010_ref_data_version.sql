@@ -0,0 +1,8 @@
+-- Change counters for the per-worker reference data cache (see
+-- reference_data.py). Tables without a row are at version 0.
+
+CREATE TABLE IF NOT EXISTS RefDataVersion (
+    name VARCHAR(30) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,4 @@
+-- Shared invalidation of the cached login identity (see identity.py): every
+-- worker compares the session's copy against this counter.
+
+ALTER TABLE Users ADD COLUMN session_version INT NOT NULL DEFAULT 0 COMMENT 'Bumped by invalidate_identity() (see identity.py)';
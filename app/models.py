@@ -1,11 +1,11 @@
 from flask_login import UserMixin
-from sqlalchemy import text
-from database import db
+from identity import load_identity
 
 # ==== User Model ====
 
 class User(UserMixin):
-    def __init__(self, id, email, first_name, middle_name, last_name, role, school_id, is_verified):
+    def __init__(self, id, email, first_name, middle_name, last_name, role, school_id, is_verified,
+                 profile_id=None, is_suspended=False, status=1):
         self.id = id
         self.email = email
         self.first_name = first_name
@@ -14,6 +14,9 @@ class User(UserMixin):
         self.role = role
         self.school_id = school_id
         self.is_verified = is_verified
+        self.profile_id = profile_id
+        self.is_suspended = is_suspended
+        self.status = status
 
     @property
     def activated(self):
@@ -22,18 +25,19 @@ class User(UserMixin):
     def get_id(self):
         return str(self.id)
 
+    @classmethod
+    def from_identity(cls, identity):
+        return cls(
+            identity["id"], identity["email"], identity["first_name"],
+            identity["middle_name"], identity["last_name"],
+            identity["role"], identity["school_id"], identity["is_verified"],
+            identity["profile_id"], identity["is_suspended"], identity["status"]
+        )
+
 
 # ==== Flask-Login user loader ====
 def load_user(user_id):
-    user = db.session.execute(
-        text("SELECT * FROM Users WHERE id = :id"),
-        {"id": user_id}
-    ).mappings().first()
-
-    if user:
-        return User(
-            user["id"], user["email"], user["first_name"],
-            user["middle_name"], user["last_name"],
-            user["role"], user["school_id"], user["is_verified"]
-        )
+    identity = load_identity(user_id)
+    if identity:
+        return User.from_identity(identity)
     return None
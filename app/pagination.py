@@ -0,0 +1,120 @@
+import base64
+import json
+from flask import request
+from sqlalchemy import text
+
+# ==== Keyset pagination ====
+# Admin lists are read one page at a time, seeking past the last row shown
+# instead of using OFFSET, so page 500 costs the same as page 1.
+#
+# Each list declares its sort options as
+#     {"name": [(sql_expr, row_key), ..., (unique_id_expr, id_key)]}
+# The last column must be unique so the order is total and no row is
+# skipped or repeated between pages. Nullable columns are wrapped in
+# COALESCE(expr, '') so the seek comparison stays well defined.
+#
+# The cursor ("after") is an opaque token holding the sort, direction and
+# the last row's sort values; it is ignored if it does not match the
+# requested sort, which simply restarts at the first page.
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort, direction, values):
+    raw = json.dumps([sort, direction, values], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort, direction, values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return sort, direction, values
+
+
+def seek_condition(columns, direction):
+    """(a > :k0) OR (a = :k0 AND b > :k1) OR ... for the given sort columns."""
+    op = ">" if direction == "asc" else "<"
+    clauses = []
+    for i, (expr, _) in enumerate(columns):
+        equal = [f"{columns[j][0]} = :k{j}" for j in range(i)]
+        clauses.append("(" + " AND ".join(equal + [f"{expr} {op} :k{i}"]) + ")")
+    return "(" + " OR ".join(clauses) + ")"
+
+
+def _cursor_value(value):
+    # COALESCE(expr, '') in the sort expression, '' in the cursor
+    return "" if value is None else value
+
+
+def page_sql(sql, columns, direction, limit, seek=False):
+    """`sql` with the seek condition (if `seek`), the sort order and LIMIT limit + 1."""
+    if seek:
+        sql += " AND " + seek_condition(columns, direction)
+    order = ", ".join(f"{expr} {direction.upper()}" for expr, _ in columns)
+    return sql + f" ORDER BY {order} LIMIT {limit + 1}"
+
+
+def paginate(db, sql, params, sorts, default_sort):
+    """
+    Run `sql` (a SELECT ending in its WHERE clause) for one page, using
+    sort/dir/after/limit from the query string.
+    Returns {"rows", "sort", "dir", "next", "is_first", "limit"}.
+    """
+    sort = request.args.get("sort", default_sort)
+    if sort not in sorts:
+        sort = default_sort
+    direction = "desc" if request.args.get("dir") == "desc" else "asc"
+    limit = request.args.get("limit", PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    columns = sorts[sort]
+
+    params = dict(params)
+    cursor = decode_cursor(request.args.get("after"))
+    if cursor is not None and (cursor[0], cursor[1], len(cursor[2])) != (sort, direction, len(columns)):
+        cursor = None
+    if cursor:
+        params.update({f"k{i}": value for i, value in enumerate(cursor[2])})
+
+    sql = page_sql(sql, columns, direction, limit, seek=bool(cursor))
+    rows = db.session.execute(text(sql), params).mappings().all()
+    # The cursor is read back from the selected columns: fail on the first
+    # page rather than only when a second page exists
+    missing = [key for _, key in columns if rows and key not in rows[0]]
+    if missing:
+        raise KeyError(f"Sort keys {missing} for sort '{sort}' are not in the select list")
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, direction, [_cursor_value(rows[-1][key]) for _, key in columns])
+
+    return {
+        "rows": rows,
+        "sort": sort,
+        "dir": direction,
+        "next": next_cursor,
+        "is_first": cursor is None,
+        "limit": limit,
+    }
+
+
+def wants_json():
+    return request.args.get("format") == "json"
+
+
+def page_json(page):
+    """JSON body for tables that load page by page (?format=json)."""
+    return {
+        "rows": [dict(row) for row in page["rows"]],
+        "sort": page["sort"],
+        "dir": page["dir"],
+        "next": page["next"],
+        "limit": page["limit"],
+    }
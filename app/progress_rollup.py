@@ -0,0 +1,214 @@
+from sqlalchemy import text
+
+# ==== Class progress rollup ====
+# Per enrollment (class x student) lesson counts live in ClassProgressRollup:
+# lessons in the class, completed, in progress and the last start/finish.
+# Lesson progress transitions and lesson add / delete keep it current inside
+# their own transaction (none of the functions below commit, except
+# rebuild_progress_rollup()), so the classes, history and dashboard pages
+# read one row per class instead of grouping Lesson x progress rows. An
+# enrollment that has no row yet is computed from source on read, without
+# storing it: a read never commits the caller's pending work.
+# rebuild_progress_rollup() recomputes it from the source tables for repair.
+
+ROLLUP_FROM_SOURCE = """
+    SELECT
+        cs.class_id,
+        cs.student_id,
+        (SELECT COUNT(*) FROM Lesson l WHERE l.class_id = cs.class_id) AS total_lessons,
+        COUNT(CASE WHEN slp.status = 'completed' THEN 1 END) AS completed_lessons,
+        COUNT(CASE WHEN slp.status = 'in_progress' THEN 1 END) AS in_progress_lessons,
+        MAX(COALESCE(slp.completed_at, slp.started_at)) AS last_activity_at
+    FROM ClassStudent cs
+    LEFT JOIN StudentLessonProgress slp
+        ON slp.class_id = cs.class_id
+        AND slp.student_id = cs.student_id
+    WHERE {where}
+    GROUP BY cs.class_id, cs.student_id
+"""
+
+UPSERT_ROLLUP = """
+    INSERT INTO ClassProgressRollup
+        (class_id, student_id, total_lessons, completed_lessons, in_progress_lessons, last_activity_at)
+    SELECT * FROM ({source}) AS src
+    ON DUPLICATE KEY UPDATE
+        total_lessons = src.total_lessons,
+        completed_lessons = src.completed_lessons,
+        in_progress_lessons = src.in_progress_lessons,
+        last_activity_at = src.last_activity_at
+"""
+
+STUDENT_PROGRESS_QUERY = """
+    SELECT cs.class_id, r.class_id AS rollup_class_id,
+           r.total_lessons, r.completed_lessons, r.in_progress_lessons, r.last_activity_at
+    FROM ClassStudent cs
+    LEFT JOIN ClassProgressRollup r
+        ON r.class_id = cs.class_id
+        AND r.student_id = cs.student_id
+    WHERE cs.student_id = :student_id
+"""
+
+LESSON_PROGRESS_QUERY = """
+    SELECT l.class_id,
+           COALESCE(slp.status, 'not_started') AS status, slp.started_at, slp.completed_at,
+           r.class_id AS rollup_class_id,
+           r.total_lessons, r.completed_lessons, r.in_progress_lessons, r.last_activity_at
+    FROM Lesson l
+    LEFT JOIN StudentLessonProgress slp
+        ON slp.class_id = l.class_id
+        AND slp.lesson_id = l.id
+        AND slp.student_id = :student_id
+    LEFT JOIN ClassProgressRollup r
+        ON r.class_id = l.class_id
+        AND r.student_id = :student_id
+    WHERE l.id = :lesson_id
+"""
+
+
+def progress_totals(total, completed, in_progress=0, last_activity_at=None):
+    return {
+        "total_lessons": total or 0,
+        "completed_lessons": completed or 0,
+        "in_progress_lessons": in_progress or 0,
+        "last_activity_at": last_activity_at,
+        "progress_percentage": round(completed / total * 100) if total and completed else 0,
+    }
+
+
+def _row_totals(row):
+    return progress_totals(row["total_lessons"], row["completed_lessons"],
+                           row["in_progress_lessons"], row["last_activity_at"])
+
+
+# =======================
+# Writes
+# =======================
+def refresh_progress_rollup(db, class_id, student_ids=None):
+    """Recompute ClassProgressRollup rows for a class (optionally only some students) from source."""
+    where = "cs.class_id = :class_id"
+    params = {"class_id": class_id}
+    if student_ids is not None:
+        if not student_ids:
+            return
+        where += " AND cs.student_id IN :student_ids"
+        params["student_ids"] = tuple(student_ids)
+
+    db.session.execute(text(UPSERT_ROLLUP.format(source=ROLLUP_FROM_SOURCE.format(where=where))), params)
+
+
+def on_lesson_started(db, student_id, lesson_id):
+    db.session.execute(text("""
+        UPDATE ClassProgressRollup r
+        JOIN Lesson l ON l.class_id = r.class_id
+        SET r.in_progress_lessons = r.in_progress_lessons + 1,
+            r.last_activity_at = NOW()
+        WHERE l.id = :lesson_id AND r.student_id = :student_id
+    """), {"student_id": student_id, "lesson_id": lesson_id})
+
+
+def on_lesson_completed(db, student_id, lesson_id):
+    db.session.execute(text("""
+        UPDATE ClassProgressRollup r
+        JOIN Lesson l ON l.class_id = r.class_id
+        SET r.in_progress_lessons = GREATEST(r.in_progress_lessons - 1, 0),
+            r.completed_lessons = r.completed_lessons + 1,
+            r.last_activity_at = NOW()
+        WHERE l.id = :lesson_id AND r.student_id = :student_id
+    """), {"student_id": student_id, "lesson_id": lesson_id})
+
+
+def on_lesson_added(db, class_id):
+    db.session.execute(
+        text("UPDATE ClassProgressRollup SET total_lessons = total_lessons + 1 WHERE class_id = :class_id"),
+        {"class_id": class_id}
+    )
+
+
+def on_lesson_deleted(db, class_id):
+    """Call after deleting the lesson; its progress rows are gone by then."""
+    refresh_progress_rollup(db, class_id)
+
+
+def drop_progress_rollup(db, class_id, student_id):
+    db.session.execute(
+        text("DELETE FROM ClassProgressRollup WHERE class_id = :class_id AND student_id = :student_id"),
+        {"class_id": class_id, "student_id": student_id}
+    )
+
+
+def fill_missing_rollup(db, class_id):
+    """Add rollup rows for enrollments that have none yet (e.g. after a bulk enroll)."""
+    db.session.execute(text("""
+        INSERT IGNORE INTO ClassProgressRollup
+            (class_id, student_id, total_lessons, completed_lessons, in_progress_lessons, last_activity_at)
+    """ + ROLLUP_FROM_SOURCE.format(where="""
+        cs.class_id = :class_id
+        AND NOT EXISTS (
+            SELECT 1 FROM ClassProgressRollup r
+            WHERE r.class_id = cs.class_id AND r.student_id = cs.student_id
+        )
+    """)), {"class_id": class_id})
+
+
+def rebuild_progress_rollup(db):
+    """Recompute the whole table from source. Returns the number of rows written."""
+    db.session.execute(text("DELETE FROM ClassProgressRollup"))
+    db.session.execute(text(UPSERT_ROLLUP.format(source=ROLLUP_FROM_SOURCE.format(where="1=1"))))
+    count = db.session.execute(text("SELECT COUNT(*) FROM ClassProgressRollup")).scalar()
+    db.session.commit()
+    return count
+
+
+# =======================
+# Reads
+# =======================
+def _rollup_from_source(db, where, params):
+    """Rollup rows computed from source, without storing them."""
+    return db.session.execute(text(ROLLUP_FROM_SOURCE.format(where=where)), params).mappings().all()
+
+
+def student_progress(db, student_id):
+    """Progress totals for every class a student is enrolled in, keyed by class id."""
+    query = text(STUDENT_PROGRESS_QUERY)
+    rows = db.session.execute(query, {"student_id": student_id}).mappings().all()
+    progress = {r["class_id"]: _row_totals(r) for r in rows if r["rollup_class_id"] is not None}
+
+    missing = [r["class_id"] for r in rows if r["rollup_class_id"] is None]
+    if missing:
+        source = _rollup_from_source(
+            db, "cs.student_id = :student_id AND cs.class_id IN :class_ids",
+            {"student_id": student_id, "class_ids": tuple(missing)}
+        )
+        progress.update({r["class_id"]: _row_totals(r) for r in source})
+
+    return progress
+
+
+def lesson_progress_state(db, student_id, lesson_id):
+    """
+    A student's progress on one lesson plus the totals of its class, so the
+    lessons page can patch itself after a progress click. None if there is
+    no such lesson.
+    """
+    query = text(LESSON_PROGRESS_QUERY)
+    params = {"student_id": student_id, "lesson_id": lesson_id}
+    row = db.session.execute(query, params).mappings().first()
+    if not row:
+        return None
+
+    if row["rollup_class_id"] is not None:
+        summary = _row_totals(row)
+    else:
+        source = _rollup_from_source(
+            db, "cs.class_id = :class_id AND cs.student_id = :student_id",
+            {"class_id": row["class_id"], "student_id": student_id}
+        )
+        summary = _row_totals(source[0]) if source else progress_totals(0, 0)
+
+    return {
+        "class_id": row["class_id"],
+        "status": row["status"],
+        "started_at": row["started_at"],
+        "completed_at": row["completed_at"],
+        "summary": summary,
+    }
@@ -0,0 +1,249 @@
+from sqlalchemy import text
+from identity import IDENTITY_QUERY, SESSION_VERSION_QUERY, USER_BY_SCHOOL_ID_QUERY
+from pagination import page_sql, PAGE_SIZE
+from search import search_filter, search_order
+from admin_routes import STUDENT_LIST_QUERY, TEACHER_LIST_QUERY, STUDENT_SORTS, TEACHER_SORTS
+from teacher_routes import (
+    ADVISORY_SECTIONS_QUERY, TEACHER_CLASSES_QUERY, TEACHER_CLASSES_SEARCH, TEACHER_CLASSES_ORDER,
+    CLASS_LESSONS_QUERY, CLASS_ROSTER_QUERY, CLASS_ACTIVITIES_QUERY
+)
+from student_routes import (
+    STUDENT_CLASSES_QUERY, RECENT_PROGRESS_QUERY, STUDENT_LESSONS_QUERY, GRADE_OVERVIEW_QUERY
+)
+from activity_feed import RECENT_EVENTS_QUERY, FEED_SIZE
+from gradebook import CLASS_GRADES_QUERY, STUDENT_GRADES_QUERY
+from progress_rollup import STUDENT_PROGRESS_QUERY, LESSON_PROGRESS_QUERY
+
+# ==== Query plan checks ====
+# EXPLAIN for the hot queries of each role. A check fails when MySQL plans a
+# full table scan (type = ALL) on a table that grows with the school;
+# reference tables that stay a few dozen rows are allowed to be scanned.
+# Run with `flask check-query-plans` after schema or query changes.
+#
+# Every check is built from the SQL constant its route or helper runs, with
+# the same pagination and search clauses added, so a query change is checked
+# as it ships.
+
+SMALL_TABLES = {
+    "EducationLevel", "YearLevel", "TrophyLevel", "IdCounter",
+    "schema_migrations", "StatsCounter", "RefDataVersion",
+}
+
+SEED_PREFIX = "PLANCHK-"
+
+SAMPLE_SEARCH = "juan cruz"
+
+
+def _people_search():
+    condition, params, _ = search_filter(SAMPLE_SEARCH, [("people", "Users")])
+    return " AND " + condition, params
+
+
+def _teacher_classes_search():
+    condition, params, relevance = search_filter(SAMPLE_SEARCH, TEACHER_CLASSES_SEARCH)
+    sql = (TEACHER_CLASSES_QUERY + " AND c.status = :status AND " + condition
+           + " ORDER BY " + search_order(relevance, TEACHER_CLASSES_ORDER))
+    return sql, {"teacher_id": 1, "status": "active", **params}
+
+
+def _plan_checks():
+    people_search, people_params = _people_search()
+    classes_search, classes_params = _teacher_classes_search()
+    name_sort = STUDENT_SORTS["name"]
+    seek_params = {"k0": "Cruz", "k1": "Juan", "k2": 1}
+
+    return [
+        (
+            "login by email",
+            IDENTITY_QUERY.format(where="u.email = :email"),
+            {"email": "someone@example.com"},
+        ),
+        (
+            "identity by id",
+            IDENTITY_QUERY.format(where="u.id = :id"),
+            {"id": 1},
+        ),
+        (
+            "session version",
+            SESSION_VERSION_QUERY,
+            {"id": 1},
+        ),
+        (
+            "user by school id",
+            USER_BY_SCHOOL_ID_QUERY,
+            {"school_id": "2025-0001"},
+        ),
+        (
+            "admin student list",
+            page_sql(STUDENT_LIST_QUERY, name_sort, "asc", PAGE_SIZE),
+            {"status": 1},
+        ),
+        (
+            "admin student list, next page",
+            page_sql(STUDENT_LIST_QUERY, name_sort, "asc", PAGE_SIZE, seek=True),
+            {"status": 1, **seek_params},
+        ),
+        (
+            "admin student list, by course",
+            page_sql(STUDENT_LIST_QUERY, STUDENT_SORTS["course"], "asc", PAGE_SIZE),
+            {"status": 1},
+        ),
+        (
+            "admin student search",
+            page_sql(STUDENT_LIST_QUERY + people_search, name_sort, "asc", PAGE_SIZE),
+            {"status": 1, **people_params},
+        ),
+        (
+            "admin teacher list",
+            page_sql(TEACHER_LIST_QUERY, TEACHER_SORTS["name"], "asc", PAGE_SIZE),
+            {"status": 1},
+        ),
+        (
+            "admin teacher search",
+            page_sql(TEACHER_LIST_QUERY + people_search, TEACHER_SORTS["name"], "asc", PAGE_SIZE),
+            {"status": 1, **people_params},
+        ),
+        (
+            "teacher advisory sections",
+            ADVISORY_SECTIONS_QUERY,
+            {"teacher_id": 1},
+        ),
+        (
+            "teacher activity feed",
+            RECENT_EVENTS_QUERY.format(column="teacher_id"),
+            {"scope_id": 1, "after_id": 0, "limit": FEED_SIZE},
+        ),
+        (
+            "teacher classes",
+            TEACHER_CLASSES_QUERY + " AND c.status = :status ORDER BY " + TEACHER_CLASSES_ORDER,
+            {"teacher_id": 1, "status": "active"},
+        ),
+        (
+            "teacher classes search",
+            classes_search,
+            classes_params,
+        ),
+        (
+            "class lessons in order",
+            CLASS_LESSONS_QUERY,
+            {"class_id": 1},
+        ),
+        (
+            "class roster",
+            CLASS_ROSTER_QUERY,
+            {"class_id": 1},
+        ),
+        (
+            "class grades",
+            CLASS_GRADES_QUERY,
+            {"class_id": 1},
+        ),
+        (
+            "class activities",
+            CLASS_ACTIVITIES_QUERY,
+            {"class_id": 1},
+        ),
+        (
+            "student classes",
+            STUDENT_CLASSES_QUERY,
+            {"student_id": 1},
+        ),
+        (
+            "student class progress",
+            STUDENT_PROGRESS_QUERY,
+            {"student_id": 1},
+        ),
+        (
+            "student recent progress",
+            RECENT_PROGRESS_QUERY,
+            {"user_id": 1},
+        ),
+        (
+            "student lessons page",
+            STUDENT_LESSONS_QUERY,
+            {"student_id": 1, "class_id": 1},
+        ),
+        (
+            "lesson progress click (JSON)",
+            LESSON_PROGRESS_QUERY,
+            {"student_id": 1, "lesson_id": 1},
+        ),
+        (
+            "student grade overview",
+            GRADE_OVERVIEW_QUERY,
+            {"student_profile_id": 1},
+        ),
+        (
+            "student grades",
+            STUDENT_GRADES_QUERY,
+            {"student_id": 1},
+        ),
+    ]
+
+
+PLAN_CHECKS = _plan_checks()
+
+
+def explain(db, sql, params=None):
+    return db.session.execute(text("EXPLAIN " + sql), params or {}).mappings().all()
+
+
+def _is_small(table):
+    # derived tables / unions show up as <derived2>, <union1,2>
+    return table is None or table.startswith("<") or table in SMALL_TABLES
+
+
+def check_plan(rows):
+    """Problems found in one EXPLAIN result (empty list = good plan)."""
+    problems = []
+    for row in rows:
+        table = row.get("table")
+        if row.get("type") == "ALL" and not _is_small(table):
+            problems.append(f"full scan of {table} (~{row.get('rows')} rows)")
+    return problems
+
+
+def run_plan_checks(db, checks=None):
+    """EXPLAIN every check. Returns [(name, problems, plan_rows)]."""
+    results = []
+    for name, sql, params in checks or PLAN_CHECKS:
+        rows = explain(db, sql, params)
+        results.append((name, check_plan(rows), rows))
+    return results
+
+
+# ==== Synthetic volume ====
+# On a freshly seeded database every table is tiny and MySQL happily scans;
+# seed_plan_data() adds enough students for the plans to be representative.
+# All seeded users share SEED_PREFIX in school_id and are removed (with their
+# profiles, by FK cascade) by clear_plan_data().
+
+def seed_plan_data(db, students=2000):
+    db.session.execute(text("SET SESSION cte_max_recursion_depth = :depth"), {"depth": students + 1})
+    db.session.execute(text("""
+        INSERT INTO Users (first_name, last_name, email, school_id, role, status, is_verified)
+        WITH RECURSIVE seq (n) AS (
+            SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :students
+        )
+        SELECT CONCAT('Plan', n), CONCAT('Check', n),
+               CONCAT('plancheck', n, '@example.invalid'),
+               CONCAT(:prefix, n), 'student', n % 10 > 0, 1
+        FROM seq
+    """), {"students": students, "prefix": SEED_PREFIX})
+    db.session.execute(text("""
+        INSERT INTO StudentProfile (user_id)
+        SELECT id FROM Users WHERE school_id LIKE :prefix
+    """), {"prefix": f"{SEED_PREFIX}%"})
+    db.session.commit()
+
+    for table in ("Users", "StudentProfile"):
+        db.session.execute(text(f"ANALYZE TABLE {table}"))
+    db.session.commit()
+
+
+def clear_plan_data(db):
+    db.session.execute(
+        text("DELETE FROM Users WHERE school_id LIKE :prefix"),
+        {"prefix": f"{SEED_PREFIX}%"}
+    )
+    db.session.commit()
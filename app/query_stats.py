@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import Counter, deque
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from database import db
+
+# ==== GLOBAL VARIABLES ====
+SLOWEST_KEPT = 5            # slowest statements kept per request
+N_PLUS_ONE_THRESHOLD = 5    # identical statements in one request before flagging
+RECENT_REQUESTS_KEPT = 200  # request records kept for the admin page
+
+# Shared by every request thread of the worker: read and write under _lock
+recent_requests = deque(maxlen=RECENT_REQUESTS_KEPT)
+endpoint_totals = {}
+_lock = threading.Lock()
+
+
+class RequestQueryStats:
+    """Statement count, DB time and per-statement timings for one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = Counter()
+        self.timings = []
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] += 1
+        self.timings.append((elapsed_ms, statement))
+
+    def slowest(self, limit=SLOWEST_KEPT):
+        return sorted(self.timings, key=lambda t: t[0], reverse=True)[:limit]
+
+    def n_plus_one(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Statements repeated verbatim (same SQL, different binds) inside one request."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+def _compact(statement):
+    return " ".join(statement.split())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts or not has_request_context():
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+
+    stats = g.get("query_stats")
+    if stats is None:
+        stats = g.query_stats = RequestQueryStats()
+    stats.record(_compact(statement), elapsed_ms)
+
+
+def _handle_error(context):
+    # A failed statement never reaches _after_cursor_execute: drop its start
+    # time so the list does not grow on the pooled connection
+    conn = context.connection
+    if conn is None or conn.invalidated:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        starts.pop()
+
+
+def _start_request():
+    g.query_stats = RequestQueryStats()
+
+
+def _finish_request(response):
+    stats = g.pop("query_stats", None)
+    if stats is None:
+        return response
+
+    repeated = stats.n_plus_one()
+    response.headers["X-DB-Stats"] = (
+        f"count={stats.count}; time={stats.total_ms:.1f}ms; n_plus_one={len(repeated)}"
+    )
+    response.headers.add("Server-Timing", f"db;dur={stats.total_ms:.1f}")
+
+    endpoint = request.endpoint or request.path
+    record = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": endpoint,
+        "status": response.status_code,
+        "count": stats.count,
+        "total_ms": round(stats.total_ms, 1),
+        "slowest": [(round(ms, 1), sql) for ms, sql in stats.slowest()],
+        "n_plus_one": repeated,
+        "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+    with _lock:
+        recent_requests.appendleft(record)
+        totals = endpoint_totals.setdefault(endpoint, {
+            "endpoint": endpoint, "requests": 0, "statements": 0,
+            "total_ms": 0.0, "max_statements": 0, "n_plus_one_hits": 0
+        })
+        totals["requests"] += 1
+        totals["statements"] += stats.count
+        totals["total_ms"] += stats.total_ms
+        totals["max_statements"] = max(totals["max_statements"], stats.count)
+        if repeated:
+            totals["n_plus_one_hits"] += 1
+
+    return response
+
+
+def init_query_stats(app):
+    """
+    Hook the SQLAlchemy engine behind database.db and record every statement
+    executed while a request is being handled.
+    Disable with QUERY_STATS_ENABLED = False.
+    """
+    if not app.config.get("QUERY_STATS_ENABLED", True):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def endpoint_summary():
+    """Per-endpoint totals, heaviest (most statements per request) first."""
+    with _lock:
+        snapshot = [dict(t) for t in endpoint_totals.values()]
+
+    rows = []
+    for t in snapshot:
+        avg = t["statements"] / t["requests"] if t["requests"] else 0
+        rows.append({
+            **t,
+            "avg_statements": round(avg, 1),
+            "avg_ms": round(t["total_ms"] / t["requests"], 1) if t["requests"] else 0,
+        })
+    return sorted(rows, key=lambda r: r["avg_statements"], reverse=True)
+
+
+def recent_request_list():
+    """Snapshot of the recent request records, newest first."""
+    with _lock:
+        return list(recent_requests)
+
+
+def reset_query_stats():
+    with _lock:
+        recent_requests.clear()
+        endpoint_totals.clear()
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import threading
+import time
+from sqlalchemy import text
+
+# ==== Reference data ====
+# EducationLevel, Course, YearLevel, Section, Subject and Department fill the
+# dropdowns of nearly every admin form and list, and rarely change. Each
+# worker keeps them in memory, every table tagged with the version it was
+# loaded at.
+#
+# RefDataVersion holds one counter per table. Every write to one of these
+# tables calls bump_ref_version() in its transaction (helpers.delete_table_row
+# included). A worker reads all counters with one query at most every
+# VERSION_CHECK_SECONDS and reloads only the tables whose counter moved, so
+# in the steady state a dropdown costs no query at all. A bump also makes
+# this worker revalidate on its next read, so the admin who made a change
+# sees it on the very next page; other workers see it within
+# VERSION_CHECK_SECONDS.
+#
+# The same tables are served to the browser as one tree (GET /api/hierarchy,
+# read by static/js/hierarchy.js): serialized once per version and sent with
+# an ETag, so the cascading dropdowns filter it client-side and a repeat
+# visit costs a 304.
+
+REF_TABLES = ("EducationLevel", "Course", "YearLevel", "Section", "Subject", "Department")
+
+VERSION_CHECK_SECONDS = 5
+
+
+def bump_ref_version(db, *tables):
+    """Mark reference tables as changed. Call in the transaction that changed them."""
+    for table in tables:
+        if table not in REF_TABLES:
+            continue
+        db.session.execute(text("""
+            INSERT INTO RefDataVersion (name, version)
+            VALUES (:name, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+        """), {"name": table})
+    reference_data.revalidate()
+
+
+class ReferenceData:
+    def __init__(self, check_seconds=VERSION_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self.lock = threading.Lock()
+        self.tables = {}  # name -> (version, rows)
+        self.versions = {}
+        self.checked_at = None
+        self.tree = None  # (versions, etag, body)
+
+    def _current_versions(self, db):
+        with self.lock:
+            fresh = self.checked_at is not None and time.monotonic() - self.checked_at <= self.check_seconds
+            if fresh:
+                return self.versions
+
+        # Versions are read before any data, so a change committed in between
+        # only causes one extra reload later, never a stale table
+        versions = dict(db.session.execute(text("SELECT name, version FROM RefDataVersion")).fetchall())
+        with self.lock:
+            self.versions = versions
+            self.checked_at = time.monotonic()
+        return versions
+
+    def table(self, db, table):
+        """(version, rows) of a reference table."""
+        if table not in REF_TABLES:
+            raise ValueError(f"Not a reference table: {table}")
+        version = self._current_versions(db).get(table, 0)
+        with self.lock:
+            cached = self.tables.get(table)
+        if cached is not None and cached[0] == version:
+            return cached
+
+        rows = [dict(r) for r in db.session.execute(text(f"SELECT * FROM {table} ORDER BY id")).mappings().all()]
+        with self.lock:
+            self.tables[table] = (version, rows)
+        return version, rows
+
+    def rows(self, db, table):
+        return self.table(db, table)[1]
+
+    def hierarchy(self, db):
+        """(etag, JSON body) of the dropdown tree, rebuilt only when a table moved."""
+        loaded = {table: self.table(db, table) for table in REF_TABLES}
+        versions = tuple(loaded[table][0] for table in REF_TABLES)
+        with self.lock:
+            cached = self.tree
+        if cached is not None and cached[0] == versions:
+            return cached[1], cached[2]
+
+        tree = build_hierarchy({table: rows for table, (_, rows) in loaded.items()})
+        body = json.dumps(tree, default=str, separators=(",", ":"))
+        # Hash of the content rather than the counters: a rebuilt database
+        # starts its counters over but must not match an old browser copy
+        etag = hashlib.sha1(body.encode()).hexdigest()[:20]
+        with self.lock:
+            self.tree = (versions, etag, body)
+        return etag, body
+
+    def revalidate(self):
+        with self.lock:
+            self.checked_at = None
+
+    def clear(self):
+        with self.lock:
+            self.tables.clear()
+            self.versions = {}
+            self.checked_at = None
+            self.tree = None
+
+
+reference_data = ReferenceData()
+
+
+def ref_rows(db, table, **where):
+    """
+    Rows of a reference table as dicts in id order (shared: do not modify),
+    optionally filtered on column equality, e.g. ref_rows(db, "Subject", status=1).
+    """
+    rows = reference_data.rows(db, table)
+    if not where:
+        return rows
+    return [r for r in rows if all(r.get(column) == value for column, value in where.items())]
+
+
+# =======================
+# Hierarchy tree
+# =======================
+def _options(rows, level_id):
+    return [
+        {"id": r["id"], "name": r["name"]}
+        for r in rows
+        if r["education_level_id"] == level_id and r["status"]
+    ]
+
+
+def build_hierarchy(tables):
+    """
+    EducationLevel -> active courses, year levels, departments, subjects and
+    sections. A section sits under the level of its course, else of its year
+    level, else its own education_lvl_id (what the old per-type endpoints
+    resolved with joins).
+    """
+    course_levels = {r["id"]: r["education_level_id"] for r in tables["Course"]}
+    year_levels = {r["id"]: r["education_level_id"] for r in tables["YearLevel"]}
+    year_names = {r["id"]: r["name"] for r in tables["YearLevel"]}
+
+    sections = {}
+    for r in tables["Section"]:
+        if not r["status"]:
+            continue
+        level_id = course_levels.get(r["course_id"]) or year_levels.get(r["year_id"]) or r["education_lvl_id"]
+        sections.setdefault(level_id, []).append({
+            "id": r["id"],
+            "name": r["name"],
+            "academic_year": r["academic_year"],
+            "course_id": r["course_id"],
+            "year_id": r["year_id"],
+            "year_name": year_names.get(r["year_id"]),
+        })
+
+    return {
+        "levels": [
+            {
+                "id": level["id"],
+                "name": level["name"],
+                "courses": _options(tables["Course"], level["id"]),
+                "years": [
+                    {"id": r["id"], "name": r["name"]}
+                    for r in tables["YearLevel"] if r["education_level_id"] == level["id"]
+                ],
+                "sections": sections.get(level["id"], []),
+                "departments": _options(tables["Department"], level["id"]),
+                "subjects": _options(tables["Subject"], level["id"]),
+            }
+            for level in tables["EducationLevel"]
+        ]
+    }
+
+
+def hierarchy_json(db):
+    """(etag, body) for GET /api/hierarchy."""
+    return reference_data.hierarchy(db)
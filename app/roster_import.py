@@ -0,0 +1,362 @@
+import csv
+import io
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from dashboard_stats import bump, user_status_metric
+from school_ids import allocate_school_ids, in_allocator_range
+
+try:
+    import openpyxl
+except ImportError:  # .xlsx import is optional
+    openpyxl = None
+
+# ==== Roster import ====
+# Bulk add students or teachers from a CSV / XLSX upload.
+#   1. rows are streamed from the file and validated against lookup maps
+#      (levels, years, courses, sections, departments) loaded once
+#   2. duplicates are caught in memory against the existing names / school
+#      IDs and against earlier rows of the same file
+#   3. valid rows are inserted IMPORT_CHUNK at a time: one school ID block,
+#      one multi-row INSERT for Users and one for the profiles, one commit
+# Every rejected row is reported with its line number and reasons.
+
+IMPORT_CHUNK = 500
+MAX_IMPORT_ROWS = 20000
+GENDERS = ("Male", "Female", "Other")
+EMAIL_DOMAIN = "holycross.edu.ph"
+
+COLUMNS = {
+    "student": ("first_name", "middle_name", "last_name", "gender", "school_id",
+                "education_level", "year", "course", "section"),
+    "teacher": ("first_name", "middle_name", "last_name", "gender", "school_id",
+                "education_level", "department"),
+}
+REQUIRED = {
+    "student": ("first_name", "last_name", "gender", "education_level", "year"),
+    "teacher": ("first_name", "last_name", "gender"),
+}
+# Senior High and College students need a course (same rule as student_add)
+COURSE_REQUIRED_LEVELS = (3, 4)
+
+
+class ImportFileError(ValueError):
+    """The upload cannot be read at all (wrong type, no header, missing columns)."""
+
+
+def _header_key(value):
+    return str(value or "").strip().lower().replace(" ", "_")
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_rows(file, role):
+    """
+    Yield (line_number, {column: value}) from an uploaded .csv or .xlsx.
+    The header row is checked for the role's required columns before any
+    row is read; a short row simply lacks its trailing columns.
+    """
+    filename = (file.filename or "").lower()
+
+    if filename.endswith(".csv"):
+        stream = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        rows = reader
+        first_line = 2
+    elif filename.endswith(".xlsx"):
+        if openpyxl is None:
+            raise ImportFileError("XLSX import needs openpyxl installed; upload a CSV instead.")
+        workbook = openpyxl.load_workbook(file.stream, read_only=True, data_only=True)
+        sheet_rows = workbook.active.iter_rows(values_only=True)
+        header = next(sheet_rows, None)
+        rows = sheet_rows
+        first_line = 2
+    else:
+        raise ImportFileError("Upload a .csv or .xlsx file.")
+
+    if not header:
+        raise ImportFileError("The file is empty.")
+    keys = [_header_key(h) for h in header]
+    check_header(keys, role)
+
+    for line, values in enumerate(rows, start=first_line):
+        record = {key: _cell(value) for key, value in zip(keys, values) if key}
+        if any(record.values()):
+            yield line, record
+
+
+def check_header(keys, role):
+    missing = [c for c in REQUIRED[role] if c not in keys]
+    if missing:
+        raise ImportFileError("Missing column(s): " + ", ".join(missing))
+
+
+# ==== Lookup maps ====
+
+def _by_id_and_name(rows, scope=None):
+    """{str(id): id, name.lower(): id}, optionally keyed by a scope column too."""
+    lookup = {}
+    for r in rows:
+        prefix = (r[scope],) if scope else ()
+        lookup[prefix + (str(r["id"]),)] = r["id"]
+        lookup[prefix + (r["name"].strip().lower(),)] = r["id"]
+    return lookup
+
+
+def load_lookups(db):
+    def rows(sql):
+        return db.session.execute(text(sql)).mappings().all()
+
+    return {
+        "level": _by_id_and_name(rows("SELECT id, name FROM EducationLevel")),
+        "year": _by_id_and_name(rows("SELECT id, name, education_level_id FROM YearLevel"), "education_level_id"),
+        "course": _by_id_and_name(rows("SELECT id, name, education_level_id FROM Course WHERE status = 1"), "education_level_id"),
+        "section": _by_id_and_name(rows("SELECT id, name, education_lvl_id FROM Section WHERE status = 1"), "education_lvl_id"),
+        "department": _by_id_and_name(rows("SELECT id, name FROM Department WHERE status = 1")),
+    }
+
+
+def load_existing(db, role):
+    """Existing school IDs (all users) and full names (same role), for dedupe."""
+    school_ids = set(db.session.execute(
+        text("SELECT school_id FROM Users WHERE school_id IS NOT NULL")
+    ).scalars().all())
+    names = {
+        name_key(r["first_name"], r["middle_name"], r["last_name"])
+        for r in db.session.execute(
+            text("SELECT first_name, middle_name, last_name FROM Users WHERE role = :role"),
+            {"role": role}
+        ).mappings().all()
+    }
+    return school_ids, names
+
+
+def name_key(first, middle, last):
+    return ((first or "").lower(), (middle or "").lower(), (last or "").lower())
+
+
+# ==== Validation ====
+
+def _format_name(value):
+    # Same casing as the single-add forms (student_add / teacher_add)
+    return (value or "").strip().title()
+
+
+def validate_row(record, role, lookups, school_ids, names):
+    """(row_for_insert, errors). Adds accepted school IDs / names to the seen sets."""
+    errors = []
+
+    for column in REQUIRED[role]:
+        if not record.get(column):
+            errors.append(f"{column} is required")
+
+    first = _format_name(record.get("first_name"))
+    middle = _format_name(record.get("middle_name")) or None
+    last = _format_name(record.get("last_name"))
+
+    gender = (record.get("gender") or "").capitalize()
+    if gender and gender not in GENDERS:
+        errors.append(f"gender must be one of {', '.join(GENDERS)}")
+
+    school_id = record.get("school_id") or None
+    if school_id:
+        if len(school_id) != 8 or not school_id.isdigit():
+            errors.append("school_id must be 8 digits")
+        elif school_id in school_ids:
+            errors.append(f"school_id {school_id} already exists")
+        elif in_allocator_range(school_id):
+            errors.append(f"school_id {school_id} is in the range assigned automatically; leave it empty")
+
+    key = name_key(first, middle, last)
+    if first and last and key in names:
+        errors.append("a user with this name already exists")
+
+    row = {
+        "first_name": first, "middle_name": middle, "last_name": last,
+        "gender": gender or None, "school_id": school_id, "role": role,
+    }
+
+    level_id = None
+    if record.get("education_level"):
+        level_id = lookups["level"].get((record["education_level"].lower(),))
+        if level_id is None:
+            errors.append(f"unknown education_level '{record['education_level']}'")
+    row["education_level_id"] = level_id
+
+    if role == "student":
+        row["year_id"] = _scoped(record, "year", level_id, lookups, errors)
+        row["course_id"] = _scoped(record, "course", level_id, lookups, errors)
+        row["section_id"] = _scoped(record, "section", level_id, lookups, errors)
+        if level_id in COURSE_REQUIRED_LEVELS and not record.get("course"):
+            errors.append("Senior High and College need a course")
+    else:
+        row["department_id"] = None
+        if record.get("department"):
+            row["department_id"] = lookups["department"].get((record["department"].lower(),))
+            if row["department_id"] is None:
+                errors.append(f"unknown department '{record['department']}'")
+
+    if not errors:
+        names.add(key)
+        if school_id:
+            school_ids.add(school_id)
+    return row, errors
+
+
+def _scoped(record, column, level_id, lookups, errors):
+    """Resolve a year/course/section name or id within the row's education level."""
+    value = record.get(column)
+    if not value or level_id is None:
+        return None
+    found = lookups[column].get((level_id, value.lower()))
+    if found is None:
+        errors.append(f"unknown {column} '{value}' for this education level")
+    return found
+
+
+# ==== Insert ====
+
+def _taken_school_ids(db, school_ids):
+    if not school_ids:
+        return set()
+    return set(db.session.execute(
+        text("SELECT school_id FROM Users WHERE school_id IN :school_ids"),
+        {"school_ids": tuple(school_ids)}
+    ).scalars().all())
+
+
+def _insert_chunk(db, role, chunk):
+    """
+    Insert one chunk of validated rows in a single transaction. Rows whose
+    school ID was taken since the file was validated are left out and
+    returned.
+    """
+    taken = _taken_school_ids(db, [r["school_id"] for r in chunk if r["school_id"]])
+    rejected = [r for r in chunk if r["school_id"] in taken]
+    chunk = [r for r in chunk if r["school_id"] not in taken]
+
+    # A new ID can still clash with one typed in by hand before the range
+    # check existed: skip those counters and draw again
+    pending = [r for r in chunk if not r["school_id"]]
+    while pending:
+        new_ids = allocate_school_ids(db, len(pending))
+        taken = _taken_school_ids(db, new_ids)
+        for row, school_id in zip(pending, new_ids):
+            if school_id not in taken:
+                row["school_id"] = school_id
+        pending = [r for r in pending if not r["school_id"]]
+
+    if not chunk:
+        return rejected
+    for row in chunk:
+        row["email"] = f"{row['school_id']}@{EMAIL_DOMAIN}"
+
+    db.session.execute(text("""
+        INSERT INTO Users (first_name, middle_name, last_name, email, school_id, gender, role)
+        VALUES (:first_name, :middle_name, :last_name, :email, :school_id, :gender, :role)
+    """), chunk)
+
+    user_ids = dict(db.session.execute(
+        text("SELECT school_id, id FROM Users WHERE school_id IN :school_ids"),
+        {"school_ids": tuple(r["school_id"] for r in chunk)}
+    ).fetchall())
+    for row in chunk:
+        row["user_id"] = user_ids[row["school_id"]]
+
+    if role == "student":
+        db.session.execute(text("""
+            INSERT INTO StudentProfile (user_id, education_level_id, course_id, year_id, section_id)
+            VALUES (:user_id, :education_level_id, :course_id, :year_id, :section_id)
+        """), chunk)
+        bucket_column, metric = "course_id", "course_students"
+    else:
+        db.session.execute(text("""
+            INSERT INTO TeacherProfile (user_id, department_id, education_level_id)
+            VALUES (:user_id, :department_id, :education_level_id)
+        """), chunk)
+        bucket_column, metric = "department_id", "department_teachers"
+
+    bump(db, user_status_metric(role, 1), len(chunk))
+    per_bucket = {}
+    for row in chunk:
+        per_bucket[row[bucket_column]] = per_bucket.get(row[bucket_column], 0) + 1
+    for bucket_id, count in per_bucket.items():
+        bump(db, metric, count, bucket_id)
+
+    db.session.commit()
+    return rejected
+
+
+def import_roster(db, file, role):
+    """
+    Import a roster upload. Returns {"imported", "errors": [{"line", "name", "errors"}]}.
+    Raises ImportFileError if the file itself cannot be used.
+    """
+    if role not in COLUMNS:
+        raise ValueError(f"Unknown role: {role}")
+
+    lookups = load_lookups(db)
+    school_ids, names = load_existing(db, role)
+    report = {"imported": 0, "errors": []}
+    chunk = []
+
+    def flush():
+        if not chunk:
+            return
+        try:
+            rejected = _insert_chunk(db, role, chunk)
+            report["imported"] += len(chunk) - len(rejected)
+            for row in rejected:
+                report["errors"].append({
+                    "line": row["line"], "name": f"{row['first_name']} {row['last_name']}",
+                    "errors": [f"school_id {row['school_id']} already exists"]
+                })
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for row in chunk:
+                report["errors"].append({
+                    "line": row["line"], "name": f"{row['first_name']} {row['last_name']}",
+                    "errors": [f"not saved, database error in this batch: {e.__class__.__name__}"]
+                })
+        chunk.clear()
+
+    count = 0
+    for count, (line, record) in enumerate(read_rows(file, role), start=1):
+        if count > MAX_IMPORT_ROWS:
+            report["errors"].append({
+                "line": line, "name": "",
+                "errors": [f"row limit of {MAX_IMPORT_ROWS} reached; this and later rows were not imported"]
+            })
+            break
+
+        row, errors = validate_row(record, role, lookups, school_ids, names)
+        if errors:
+            report["errors"].append({
+                "line": line, "name": f"{row['first_name']} {row['last_name']}".strip(), "errors": errors
+            })
+            continue
+
+        row["line"] = line
+        chunk.append(row)
+        if len(chunk) >= IMPORT_CHUNK:
+            flush()
+
+    flush()
+    if not count:
+        raise ImportFileError("The file has no rows below the header.")
+    return report
+
+
+def error_report_csv(report):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["line", "name", "errors"])
+    for e in report["errors"]:
+        writer.writerow([e["line"], e["name"], "; ".join(e["errors"])])
+    return out.getvalue()
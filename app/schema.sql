@@ -17,7 +17,9 @@ CREATE TABLE IF NOT EXISTS Course (
     education_level_id INT,
     status BOOLEAN NOT NULL DEFAULT TRUE,
     FOREIGN KEY (education_level_id) REFERENCES EducationLevel(id)
-        ON UPDATE CASCADE ON DELETE SET NULL
+        ON UPDATE CASCADE ON DELETE SET NULL,
+    INDEX idx_course_level_status (education_level_id, status),
+    FULLTEXT KEY ft_course_name (name)
 );
 
 -- YearLevel table
@@ -36,7 +38,9 @@ CREATE TABLE IF NOT EXISTS Department (
     name VARCHAR(100) NOT NULL,
     education_level_id INT NULL,
     status BOOLEAN NOT NULL DEFAULT TRUE,
-    FOREIGN KEY (education_level_id) REFERENCES EducationLevel(id)
+    FOREIGN KEY (education_level_id) REFERENCES EducationLevel(id),
+    INDEX idx_department_level_status (education_level_id, status),
+    FULLTEXT KEY ft_department_name (name)
 );
 
 -- Users table
@@ -51,7 +55,11 @@ CREATE TABLE IF NOT EXISTS Users (
     gender ENUM('Male','Female','Other'),
     is_verified BOOLEAN NOT NULL DEFAULT FALSE,
     password VARCHAR(255) NOT NULL DEFAULT 'scrypt:32768:8:1$zQ90TifUV57h28Bl$f4b4c07b635d072c608d5191a3cabf224f5aaae76c8ef657712ee5263305a4e550a857aeb682d3ba6f619c8793c1cd16edfad820900bf93a532d59259d5b8664',
-    role ENUM('admin','teacher','student') NOT NULL
+    role ENUM('admin','teacher','student') NOT NULL,
+    session_version INT NOT NULL DEFAULT 0 COMMENT 'Bumped by invalidate_identity() (see identity.py)',
+    INDEX idx_users_role_status_name (role, status, last_name, first_name),
+    INDEX idx_users_school_id (school_id),
+    FULLTEXT KEY ft_users_people (first_name, middle_name, last_name, email, school_id)
 );
 
 
@@ -87,7 +95,11 @@ CREATE TABLE IF NOT EXISTS Section (
     FOREIGN KEY (course_id) REFERENCES Course(id)
         ON UPDATE CASCADE ON DELETE SET NULL,
     FOREIGN KEY (teacher_id) REFERENCES TeacherProfile(id)
-        ON DELETE SET NULL ON UPDATE CASCADE
+        ON DELETE SET NULL ON UPDATE CASCADE,
+    INDEX idx_section_level_year_status (education_lvl_id, year_id, status),
+    INDEX idx_section_course_year_status (course_id, year_id, status),
+    INDEX idx_section_teacher_status (teacher_id, status),
+    FULLTEXT KEY ft_section_name (name, academic_year)
 );
 
 -- Subject table
@@ -97,7 +109,9 @@ CREATE TABLE IF NOT EXISTS Subject (
     name VARCHAR(100) NOT NULL,
     education_level_id INT,
     FOREIGN KEY (education_level_id) REFERENCES EducationLevel(id)
-        ON UPDATE CASCADE ON DELETE SET NULL
+        ON UPDATE CASCADE ON DELETE SET NULL,
+    INDEX idx_subject_level_status (education_level_id, status),
+    FULLTEXT KEY ft_subject_name (name)
 );
 
 -- StudentProfile table
@@ -138,7 +152,9 @@ CREATE TABLE IF NOT EXISTS Class (
         ON DELETE RESTRICT ON UPDATE CASCADE,
     FOREIGN KEY (section_id) REFERENCES Section(id)
         ON DELETE RESTRICT ON UPDATE CASCADE,
-    UNIQUE KEY unique_class(subject_id, teacher_id, section_id)
+    UNIQUE KEY unique_class(subject_id, teacher_id, section_id),
+    INDEX idx_class_teacher_status (teacher_id, status),
+    INDEX idx_class_section_status (section_id, status)
 );
 
 
@@ -153,21 +169,23 @@ CREATE TABLE IF NOT EXISTS ClassStudent (
         ON UPDATE CASCADE ON DELETE CASCADE,
     FOREIGN KEY (student_id) REFERENCES StudentProfile(id)
         ON UPDATE CASCADE ON DELETE CASCADE,
-    UNIQUE KEY unique_enrollment(class_id, student_id) 
+    UNIQUE KEY unique_enrollment(class_id, student_id),
+    INDEX idx_classstudent_student_status (student_id, status)
 );
 
 -- Lesson table
 CREATE TABLE IF NOT EXISTS Lesson (
     id INT AUTO_INCREMENT PRIMARY KEY,
     class_id INT NOT NULL COMMENT 'Class this lesson belongs to',
-    lesson_number INT NOT NULL COMMENT 'Order of lesson in the class',
+    lesson_number INT NOT NULL COMMENT 'Sparse sort key within the class (see lesson_order.py)',
     title VARCHAR(255) NOT NULL COMMENT 'Lesson title',
     description TEXT COMMENT 'Optional lesson details',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (class_id) REFERENCES Class(id)
-        ON UPDATE CASCADE ON DELETE CASCADE
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    INDEX idx_lesson_class_number (class_id, lesson_number)
 );
 
 CREATE TABLE IF NOT EXISTS LessonFile (
@@ -196,7 +214,9 @@ CREATE TABLE IF NOT EXISTS StudentLessonProgress (
         ON UPDATE CASCADE ON DELETE CASCADE,
     FOREIGN KEY (student_id) REFERENCES StudentProfile(id)
         ON UPDATE CASCADE ON DELETE CASCADE,
-    UNIQUE KEY unique_progress(class_id, lesson_id, student_id)
+    UNIQUE KEY unique_progress(class_id, lesson_id, student_id),
+    INDEX idx_progress_student_status (student_id, status),
+    INDEX idx_progress_status_completed (status, completed_at)
 );
 
 CREATE TABLE IF NOT EXISTS IdCounter (
@@ -207,7 +227,8 @@ CREATE TABLE IF NOT EXISTS IdCounter (
 CREATE TABLE IF NOT EXISTS TrophyLevel (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(50) NOT NULL,
-    required_points INT NOT NULL
+    required_points INT NOT NULL,
+    INDEX idx_trophy_required_points (required_points)
 );
 
 CREATE TABLE IF NOT EXISTS Activity (
@@ -222,7 +243,9 @@ CREATE TABLE IF NOT EXISTS Activity (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (class_id) REFERENCES Class(id) ON UPDATE CASCADE ON DELETE CASCADE,
-    FOREIGN KEY (lesson_id) REFERENCES Lesson(id) ON UPDATE CASCADE ON DELETE SET NULL
+    FOREIGN KEY (lesson_id) REFERENCES Lesson(id) ON UPDATE CASCADE ON DELETE SET NULL,
+    INDEX idx_activity_class_type (class_id, type),
+    INDEX idx_activity_lesson_type (lesson_id, type)
 );
 
 CREATE TABLE IF NOT EXISTS ActivityFile (
@@ -247,7 +270,103 @@ CREATE TABLE IF NOT EXISTS ActivitySubmission (
     graded_at DATETIME NULL,
     FOREIGN KEY (activity_id) REFERENCES Activity(id) ON UPDATE CASCADE ON DELETE CASCADE,
     FOREIGN KEY (student_id) REFERENCES StudentProfile(id) ON UPDATE CASCADE ON DELETE CASCADE,
-    UNIQUE KEY unique_submission(activity_id, student_id)
+    UNIQUE KEY unique_submission(activity_id, student_id),
+    INDEX idx_submission_student_activity (student_id, activity_id)
+);
+
+-- Materialized class x student grade totals (see gradebook.py)
+CREATE TABLE IF NOT EXISTS GradeSummary (
+    class_id INT NOT NULL,
+    student_id INT NOT NULL,
+    total_score INT NOT NULL DEFAULT 0,
+    total_possible INT NOT NULL DEFAULT 0,
+    graded_count INT NOT NULL DEFAULT 0,
+    submitted_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (class_id, student_id),
+    FOREIGN KEY (class_id) REFERENCES Class(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES StudentProfile(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+-- Materialized class x student lesson progress counts (see progress_rollup.py)
+CREATE TABLE IF NOT EXISTS ClassProgressRollup (
+    class_id INT NOT NULL,
+    student_id INT NOT NULL,
+    total_lessons INT NOT NULL DEFAULT 0,
+    completed_lessons INT NOT NULL DEFAULT 0,
+    in_progress_lessons INT NOT NULL DEFAULT 0,
+    last_activity_at DATETIME NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (class_id, student_id),
+    FOREIGN KEY (class_id) REFERENCES Class(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES StudentProfile(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    INDEX idx_rollup_student (student_id)
+);
+
+-- Per-lesson file / assignment summary for the lessons page (see lesson_manifest.py)
+CREATE TABLE IF NOT EXISTS LessonManifest (
+    lesson_id INT PRIMARY KEY,
+    class_id INT NOT NULL,
+    file_id INT NULL COMMENT 'Latest LessonFile of the lesson',
+    file_name VARCHAR(255) NULL,
+    file_path VARCHAR(255) NULL,
+    file_type VARCHAR(100) NULL,
+    file_count INT NOT NULL DEFAULT 0,
+    activity_id INT NULL COMMENT 'Latest assignment of the lesson',
+    activity_title VARCHAR(255) NULL,
+    activity_due DATETIME NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (lesson_id) REFERENCES Lesson(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    INDEX idx_manifest_class (class_id)
+);
+
+-- Append-only record of every points award (see lesson_progress.py);
+-- StudentProfile.points is the running total
+CREATE TABLE IF NOT EXISTS PointsLedger (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    student_id INT NOT NULL,
+    lesson_id INT NULL,
+    reason VARCHAR(30) NOT NULL,
+    points INT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (student_id) REFERENCES StudentProfile(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (lesson_id) REFERENCES Lesson(id) ON UPDATE CASCADE ON DELETE SET NULL,
+    UNIQUE KEY unique_award(student_id, reason, lesson_id)
+);
+
+-- Append-only student activity events for teacher dashboards (see
+-- activity_feed.py); no foreign keys, pruned by age
+CREATE TABLE IF NOT EXISTS ActivityFeed (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    event_type VARCHAR(30) NOT NULL,
+    teacher_id INT NULL COMMENT 'Section adviser when the event happened',
+    section_id INT NOT NULL,
+    class_id INT NOT NULL,
+    student_id INT NOT NULL,
+    lesson_id INT NULL,
+    activity_id INT NULL,
+    score INT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_feed_teacher (teacher_id, id),
+    INDEX idx_feed_section (section_id, id),
+    INDEX idx_feed_class (class_id, id),
+    INDEX idx_feed_created (created_at)
+);
+
+-- Admin dashboard rollup counters (see dashboard_stats.py)
+CREATE TABLE IF NOT EXISTS StatsCounter (
+    metric VARCHAR(50) NOT NULL,
+    bucket_id INT NOT NULL DEFAULT 0,
+    value INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, bucket_id)
+);
+
+-- Change counters of the cached reference tables (see reference_data.py)
+CREATE TABLE IF NOT EXISTS RefDataVersion (
+    name VARCHAR(30) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 INSERT INTO TrophyLevel (name, required_points) VALUES
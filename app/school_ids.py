@@ -0,0 +1,157 @@
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import text
+
+# ==== School ID allocation ====
+# School IDs are the 4-digit yearly counter followed by the year
+# (e.g. 10012025). IdCounter.counter holds the last counter handed out.
+#
+# Counters are reserved with one atomic upsert that both bumps the counter
+# and reads the new value through LAST_INSERT_ID(), in its own short
+# transaction, so parallel callers always get disjoint ranges and nobody
+# waits on the IdCounter row lock for longer than that one statement.
+#
+# The yearly space is only 9000 IDs, so single IDs (the add forms) reserve
+# one counter each: caching a block per worker would throw away the rest of
+# it on every worker restart. Blocks are for bulk import only
+# (allocate_school_ids reserves a whole chunk with the same statement).
+
+START_COUNTER = 1000
+SINGLE_BLOCK_SIZE = 1
+BLOCK_SIZE = 20  # default for `flask check-school-ids`
+
+
+def format_school_id(counter, year):
+    return f"{str(counter).zfill(4)}{year}"
+
+
+def reserve_counters(db, count, year=None):
+    """Reserve `count` consecutive counters for `year` and return the first."""
+    year = year or datetime.now().year
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO IdCounter (year, counter)
+            VALUES (:year, LAST_INSERT_ID(:start + :count - 1))
+            ON DUPLICATE KEY UPDATE counter = LAST_INSERT_ID(counter + :count)
+        """), {"year": year, "start": START_COUNTER, "count": count})
+        last = conn.execute(text("SELECT LAST_INSERT_ID()")).scalar()
+    return last - count + 1
+
+
+def in_allocator_range(school_id, year=None):
+    """
+    True when the allocator may hand out `school_id` itself (a counter of
+    START_COUNTER or more, for this year or a later one), so it must not be
+    given by hand.
+    """
+    year = year or datetime.now().year
+    if len(school_id) != 8 or not school_id.isdigit():
+        return False
+    return int(school_id[:4]) >= START_COUNTER and int(school_id[4:]) >= year
+
+
+def allocate_school_ids(db, count, year=None):
+    """`count` new, contiguous school IDs for this year (bulk import)."""
+    if count <= 0:
+        return []
+    year = year or datetime.now().year
+    first = reserve_counters(db, count, year)
+    return [format_school_id(first + i, year) for i in range(count)]
+
+
+class SchoolIdAllocator:
+    """Hands out single school IDs from a block reserved by this worker."""
+
+    def __init__(self, block_size=SINGLE_BLOCK_SIZE):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.year = None
+        self.next = 0
+        self.end = 0
+
+    def _has_block(self, year):
+        return self.year == year and self.next < self.end
+
+    def next_id(self, db, year=None):
+        year = year or datetime.now().year
+        with self.lock:
+            if not self._has_block(year):
+                self.next = reserve_counters(db, self.block_size, year)
+                self.end = self.next + self.block_size
+                self.year = year
+            counter = self.next
+            self.next += 1
+        return format_school_id(counter, year)
+
+    def preview(self, db, year=None):
+        """The ID next_id() would most likely return; reserves nothing."""
+        year = year or datetime.now().year
+        with self.lock:
+            if self._has_block(year):
+                return format_school_id(self.next, year)
+        counter = db.session.execute(
+            text("SELECT counter FROM IdCounter WHERE year = :year"), {"year": year}
+        ).scalar()
+        return format_school_id(START_COUNTER if counter is None else counter + 1, year)
+
+
+_allocator = SchoolIdAllocator()
+
+
+def next_school_id(db):
+    """A new school ID for one user (student_add / teacher_add)."""
+    return _allocator.next_id(db)
+
+
+def preview_school_id(db):
+    """School ID shown on the add forms, for display only."""
+    return _allocator.preview(db)
+
+
+# ==== Stress check ====
+# `flask check-school-ids` runs many allocators in parallel threads (each
+# standing in for a worker with its own block cache) against a scratch year
+# and verifies that no ID was handed out twice.
+
+STRESS_YEAR = 9999
+
+
+def stress_allocation(db, workers=8, ids_per_worker=500, block_size=BLOCK_SIZE, bulk_every=50):
+    """Returns (total_ids, duplicate_ids). Removes the scratch counter row afterwards."""
+    app = current_app._get_current_object()
+    results = [[] for _ in range(workers)]
+    errors = []
+
+    def work(index):
+        allocator = SchoolIdAllocator(block_size)
+        with app.app_context():
+            try:
+                for n in range(ids_per_worker):
+                    if bulk_every and n % bulk_every == 0:
+                        results[index].extend(allocate_school_ids(db, 5, STRESS_YEAR))
+                    results[index].append(allocator.next_id(db, STRESS_YEAR))
+            except Exception as e:  # reported by the caller
+                errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        with db.engine.begin() as conn:
+            conn.execute(text("DELETE FROM IdCounter WHERE year = :year"), {"year": STRESS_YEAR})
+
+    if errors:
+        raise errors[0]
+
+    seen = set()
+    duplicates = set()
+    for ids in results:
+        for school_id in ids:
+            if school_id in seen:
+                duplicates.add(school_id)
+            seen.add(school_id)
+    return sum(len(ids) for ids in results), sorted(duplicates)
@@ -0,0 +1,89 @@
+import re
+
+# ==== Search ====
+# Shared search for the admin lists, pickers and teacher rosters.
+# Names, emails, school IDs and section/course/department/subject names are
+# matched through their FULLTEXT indexes (migrations/0003) in BOOLEAN MODE
+# with prefix terms, so "jua del" finds "Juan Dela Cruz" and results can be
+# ranked by relevance. Small lookup tables (EducationLevel, YearLevel) are
+# matched with a plain prefix LIKE.
+#
+# InnoDB does not index words shorter than innodb_ft_min_token_size (3 by
+# default); a search made only of such words falls back to prefix LIKE.
+
+MIN_TOKEN_SIZE = 3
+SEARCH_LIMIT = 50
+
+# Must match the FULLTEXT index columns exactly (MATCH() requires it)
+FULLTEXT_COLUMNS = {
+    "people": ("first_name", "middle_name", "last_name", "email", "school_id"),
+    "section": ("name", "academic_year"),
+    "course": ("name",),
+    "department": ("name",),
+    "subject": ("name",),
+}
+
+
+def search_tokens(search):
+    """Words as the InnoDB full-text parser splits them."""
+    return re.findall(r"\w+", search or "")
+
+
+def boolean_query(search):
+    """'+word1* +word2*' for BOOLEAN MODE, or None if no word is indexable."""
+    words = [w for w in search_tokens(search) if len(w) >= MIN_TOKEN_SIZE]
+    if not words:
+        return None
+    return " ".join(f"+{w}*" for w in words)
+
+
+def like_prefix(search):
+    escaped = search.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def _match(kind, alias, param):
+    columns = ", ".join(f"{alias}.{c}" for c in FULLTEXT_COLUMNS[kind])
+    return f"MATCH({columns}) AGAINST (:{param} IN BOOLEAN MODE)"
+
+
+def search_filter(search, targets, param="search"):
+    """
+    Build the search part of a WHERE clause.
+
+    targets mixes ("people", "u") pairs, meaning the FULLTEXT index of that
+    kind on the table aliased u, and plain "alias.column" lookup columns.
+    Returns (condition, params, relevance); relevance is an ORDER BY
+    expression (None when not ranked). Empty search returns (None, {}, None).
+    """
+    if not search or not search.strip():
+        return None, {}, None
+
+    terms = boolean_query(search)
+    params = {f"{param}_prefix": like_prefix(search)}
+    conditions = []
+    matches = []
+
+    for target in targets:
+        if isinstance(target, tuple):
+            kind, alias = target
+            if terms:
+                matches.append(_match(kind, alias, f"{param}_ft"))
+            else:
+                conditions.extend(f"{alias}.{c} LIKE :{param}_prefix" for c in FULLTEXT_COLUMNS[kind])
+        else:
+            conditions.append(f"{target} LIKE :{param}_prefix")
+
+    if matches:
+        params[f"{param}_ft"] = terms
+
+    condition = "(" + " OR ".join(matches + conditions) + ")"
+    relevance = " + ".join(matches) if matches else None
+    return condition, params, relevance
+
+
+def search_order(relevance, default_order):
+    """ORDER BY body: most relevant first when ranked, then the list's usual order."""
+    if relevance:
+        return f"({relevance}) DESC, {default_order}"
+    return default_order
@@ -0,0 +1,51 @@
+// Reference data for the cascading dropdowns (GET /api/hierarchy).
+//
+// The tree is fetched once per page, on first use; the browser revalidates
+// it with its ETag, so it is downloaded again only after an admin changes
+// a course, section, subject, ... Every dropdown is then filled from here
+// with no further requests. All lookups return promises of [{id, name, ...}].
+//   Hierarchy.courses(levelId)
+//   Hierarchy.years(levelId)
+//   Hierarchy.departments(levelId)
+//   Hierarchy.subjects(levelId)
+//   Hierarchy.sections(levelId, {courseId, yearId})   either filter optional
+window.Hierarchy = (() => {
+    const script = document.currentScript;
+    let tree = null;
+
+    function load() {
+        if (!tree) {
+            tree = fetch(script.dataset.url, { credentials: "same-origin" })
+                .then(res => {
+                    if (!res.ok) throw new Error(`hierarchy: ${res.status}`);
+                    return res.json();
+                })
+                .catch(err => {
+                    tree = null; // try again on the next lookup
+                    throw err;
+                });
+        }
+        return tree;
+    }
+
+    function level(levelId) {
+        return load().then(data => data.levels.find(l => String(l.id) === String(levelId)));
+    }
+
+    const list = key => levelId => level(levelId).then(l => (l ? l[key] : []));
+
+    function sections(levelId, { courseId, yearId } = {}) {
+        return list("sections")(levelId).then(rows => rows.filter(s =>
+            (!courseId || String(s.course_id) === String(courseId)) &&
+            (!yearId || String(s.year_id) === String(yearId))));
+    }
+
+    return {
+        load,
+        courses: list("courses"),
+        years: list("years"),
+        departments: list("departments"),
+        subjects: list("subjects"),
+        sections,
+    };
+})();
@@ -0,0 +1,108 @@
+// Live page updates over server-sent events (see live_events.py).
+//
+// Elements opt in with data attributes; the stream is only opened on pages
+// that have at least one [data-live] element.
+//   data-live="type ..."               event types the element reacts to
+//   data-live-match="key:value ..."    only events whose fields all match
+//   data-live-format="Score: {score}"  replace the text, filling in {field}s
+//   data-live-add="1"                  add to the number shown in the element
+//   data-live-feed="url"               fetch the rows newer than the first
+//                                      [data-event-id] child from url?after_id=
+//                                      and prepend them (keeps data-live-limit rows)
+// Every event is also dispatched on document as "live:<type>" for page scripts.
+// The stream is closed after the tab has been hidden for a minute; coming
+// back to it reloads the page.
+(() => {
+    const script = document.currentScript;
+    const HIDDEN_CLOSE_MS = 60000;
+    const feeds = new Map(); // list -> "loading" | "again"
+
+    function matches(el, event) {
+        const rule = el.dataset.liveMatch;
+        if (!rule) return true;
+        return rule.split(/\s+/).filter(Boolean).every(pair => {
+            const [key, value] = pair.split(":");
+            return String(event[key]) === value;
+        });
+    }
+
+    function fill(format, event) {
+        return format.replace(/\{(\w+)\}/g, (_, key) =>
+            event[key] === null || event[key] === undefined ? "N/A" : event[key]);
+    }
+
+    function refreshFeed(list) {
+        if (feeds.has(list)) {
+            feeds.set(list, "again"); // fetch once more when the current request ends
+            return;
+        }
+        feeds.set(list, "loading");
+
+        const first = list.querySelector(":scope > [data-event-id]");
+        const after = first ? first.dataset.eventId : 0;
+        fetch(`${list.dataset.liveFeed}?after_id=${after}`)
+            .then(res => (res.ok ? res.text() : ""))
+            .then(html => {
+                if (!html.trim()) return;
+                list.insertAdjacentHTML("afterbegin", html);
+                const limit = parseInt(list.dataset.liveLimit || "0", 10);
+                const rows = list.querySelectorAll(":scope > [data-event-id]");
+                for (let i = limit; limit && i < rows.length; i++) rows[i].remove();
+                document.querySelectorAll("[data-live-empty]").forEach(el => el.remove());
+            })
+            .catch(() => {})
+            .finally(() => {
+                const again = feeds.get(list) === "again";
+                feeds.delete(list);
+                if (again) refreshFeed(list);
+            });
+    }
+
+    function apply(event) {
+        document.querySelectorAll("[data-live]").forEach(el => {
+            if (!el.dataset.live.split(/\s+/).includes(event.type) || !matches(el, event)) return;
+
+            if (el.dataset.liveFeed !== undefined) {
+                refreshFeed(el);
+            } else if (el.dataset.liveAdd !== undefined) {
+                el.textContent = (parseFloat(el.textContent) || 0) + parseFloat(el.dataset.liveAdd);
+            } else if (el.dataset.liveFormat !== undefined) {
+                el.textContent = fill(el.dataset.liveFormat, event);
+            }
+        });
+        document.dispatchEvent(new CustomEvent(`live:${event.type}`, { detail: event }));
+    }
+
+    document.addEventListener("DOMContentLoaded", () => {
+        const elements = document.querySelectorAll("[data-live]");
+        if (!script || !window.EventSource || !elements.length) return;
+
+        const types = new Set();
+        elements.forEach(el => el.dataset.live.split(/\s+/).forEach(type => type && types.add(type)));
+
+        let source = null;
+        let idle = null;
+        function connect() {
+            source = new EventSource(script.dataset.url);
+            types.forEach(type => source.addEventListener(type, e => apply(JSON.parse(e.data))));
+            // The stream fell behind and dropped events: show the page as it is now
+            source.addEventListener("resync", () => window.location.reload());
+        }
+
+        // A stream holds a server worker slot: give it back when the tab has
+        // been in the background for a while, and catch up on return
+        document.addEventListener("visibilitychange", () => {
+            if (document.hidden) {
+                idle = setTimeout(() => {
+                    source.close();
+                    source = null;
+                }, HIDDEN_CLOSE_MS);
+            } else if (source) {
+                clearTimeout(idle);
+            } else {
+                window.location.reload();
+            }
+        });
+        connect();
+    });
+})();
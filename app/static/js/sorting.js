@@ -10,36 +10,42 @@ document.addEventListener("DOMContentLoaded", () => {
         searchField: ["text"],
         create: false,
         placeholder: "Search and select a section...",
-        load: function(query, callback) {
-            const education_level_id = educationSelect.value;
-            if (!education_level_id) return callback();
-
-            fetch(`/admin/api/sections/search?education_level_id=${education_level_id}&q=${encodeURIComponent(query)}`)
-                .then(res => res.json())
-                .then(data => callback(data))
-                .catch(() => callback());
-        }
     });
 
+    // All sections of the level come from the hierarchy tree; TomSelect
+    // filters them as the user types
+    function loadSections() {
+        const education_level_id = educationSelect.value;
+        if (!education_level_id) return Promise.resolve();
+
+        return Promise.all([
+            Hierarchy.sections(education_level_id),
+            Hierarchy.courses(education_level_id),
+        ]).then(([sections, courses]) => {
+            const courseNames = new Map(courses.map(c => [c.id, c.name]));
+            sections.forEach(s => sectionSelect.addOption({
+                id: s.id,
+                text: [courseNames.get(s.course_id), s.year_name, s.name].filter(Boolean).join(" - "),
+            }));
+        });
+    }
+
     // Refresh sections when education level changes
     educationSelect.addEventListener("change", () => {
         sectionSelect.clearOptions();
         sectionSelect.clear(true);
+        loadSections();
     });
 
-    // Preselect section in Edit form
+    // Preselect section in Edit form. An archived section is not in the
+    // hierarchy tree: data-selected-label keeps it selectable
     const preselectedSection = sectionSelectElement.dataset.selected;
-
-    if (preselectedSection) {
-        const education_level_id = educationSelect.value;
-        if (education_level_id) {
-            // Fetch all sections for this education level to populate dropdown
-            fetch(`/admin/api/sections/search?education_level_id=${education_level_id}&q=`)
-                .then(res => res.json())
-                .then(data => {
-                    data.forEach(option => sectionSelect.addOption(option));
-                    sectionSelect.addItem(preselectedSection); // preselect now
-                });
+    const preselectedLabel = sectionSelectElement.dataset.selectedLabel;
+    loadSections().then(() => {
+        if (!preselectedSection) return;
+        if (!sectionSelect.options[preselectedSection] && preselectedLabel) {
+            sectionSelect.addOption({ id: preselectedSection, text: preselectedLabel });
         }
-    }
+        sectionSelect.addItem(preselectedSection);
+    });
 });
@@ -1,14 +1,154 @@
-from flask import render_template, session, Blueprint, flash, request, url_for, redirect
+from flask import render_template, session, Blueprint, flash, request, url_for, redirect, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy import text
 from helpers import *
 from database import db
 from datetime import datetime
 from decorators import role_required
+from identity import current_profile_id
+from inspiration import get_daily_inspiration
+from gradebook import student_grades, student_grade, grade_totals, refresh_grade_summary
+from lesson_progress import advance_lesson_progress
+from activity_feed import (
+    log_activity_event, EVENT_ACTIVITY_SUBMITTED, EVENT_LESSON_STARTED, EVENT_LESSON_COMPLETED
+)
+from live_events import publish, class_audience, lesson_audience
+from lesson_order import LESSON_NUMBER
+from progress_rollup import student_progress, progress_totals, lesson_progress_state
+from pagination import wants_json
+from search import search_filter, search_order
+from gamification import trophy_for, leaderboard_summary, record_points
 from werkzeug.utils import secure_filename
 import os
 student_bp = Blueprint('student', __name__, url_prefix='/student')
 
+PROGRESS_BLOCKED = {
+    "class_closed": ("You cannot update progress for a completed or cancelled class.", "warning"),
+    "not_found": ("Lesson not found.", "error"),
+    "not_enrolled": ("You are not enrolled in this class.", "warning"),
+}
+
+def get_student_id():
+    return current_profile_id()
+
+
+# ==============================
+# Hot queries
+# ==============================
+# Shared with query_plans.py, which EXPLAINs exactly this SQL
+STUDENT_CLASSES_QUERY = """
+    SELECT
+        c.id,
+        s.name AS subject_name,
+        sec.name AS section_name,
+        cs.status AS enrollment_status,
+        c.status AS class_status,
+        c.color,
+        t.user_id AS teacher_user_id,
+        CONCAT(u.first_name, ' ', u.last_name) AS teacher_name
+    FROM ClassStudent cs
+    JOIN Class c ON cs.class_id = c.id
+    JOIN Subject s ON c.subject_id = s.id
+    JOIN Section sec ON c.section_id = sec.id
+    JOIN TeacherProfile t ON c.teacher_id = t.id
+    JOIN Users u ON t.user_id = u.id
+    WHERE cs.student_id = :student_id
+"""
+
+# Most recent 5 lessons by started_at or completed_at (dashboard)
+RECENT_PROGRESS_QUERY = """
+    SELECT
+        l.id AS lesson_id,
+        l.title AS lesson_title,
+        c.id AS class_id,
+        s.name AS subject_name,
+        slp.status,
+        slp.started_at,
+        slp.completed_at
+    FROM StudentLessonProgress slp
+    JOIN Lesson l ON l.id = slp.lesson_id
+    JOIN Class c ON c.id = slp.class_id
+    JOIN Subject s ON s.id = c.subject_id
+    JOIN StudentProfile sp ON sp.id = slp.student_id
+    WHERE sp.user_id = :user_id
+    ORDER BY GREATEST(
+        IFNULL(slp.completed_at, '1970-01-01'),
+        IFNULL(slp.started_at, '1970-01-01')
+    ) DESC
+    LIMIT 5
+"""
+
+# Lessons with progress, file and assignment info: one row per lesson.
+# Progress rows only exist once a lesson is started: no row = not started.
+# Files and assignments come from LessonManifest (see lesson_manifest.py).
+STUDENT_LESSONS_QUERY = f"""
+    SELECT
+        l.id AS lesson_id,
+        {LESSON_NUMBER} AS lesson_number,
+        l.title,
+        l.description,
+
+        COALESCE(slp.status, 'not_started') AS progress_status,
+        slp.completed_at,
+        slp.started_at,
+
+        -- Primary file and how many the lesson has
+        m.file_id,
+        m.file_name,
+        m.file_path,
+        m.file_type,
+        COALESCE(m.file_count, 0) AS file_count,
+
+        -- Assignment
+        m.activity_id,
+        m.activity_title,
+        m.activity_due,
+
+        -- Submission info (unique per activity/student)
+        s.score AS activity_score,
+        s.submitted_at AS activity_submitted_at,
+
+        -- Final unified submission status
+        CASE
+            WHEN s.submitted_at IS NULL THEN 'not_submitted'
+            WHEN s.score IS NULL THEN 'submitted_not_graded'
+            WHEN s.score >= 1 THEN 'passed'
+            ELSE 'failed'
+        END AS submission_status
+
+    FROM Lesson l
+    LEFT JOIN LessonManifest m ON m.lesson_id = l.id
+    LEFT JOIN StudentLessonProgress slp
+        ON l.id = slp.lesson_id
+        AND slp.student_id = :student_id
+    LEFT JOIN ActivitySubmission s
+        ON s.activity_id = m.activity_id
+        AND s.student_id = :student_id
+    WHERE l.class_id = :class_id
+    ORDER BY l.lesson_number ASC
+"""
+
+# Active classes on the grade overview
+GRADE_OVERVIEW_QUERY = """
+    SELECT
+        c.id AS class_id,
+        s.name AS subject_name,
+        sec.name AS section_name,
+        co.name AS course_name,
+        COALESCE(el_from_course.name, el_from_year.name) AS education_level
+    FROM ClassStudent cs
+    JOIN Class c ON cs.class_id = c.id
+    JOIN Subject s ON c.subject_id = s.id
+    JOIN Section sec ON c.section_id = sec.id
+    LEFT JOIN Course co ON sec.course_id = co.id
+    LEFT JOIN EducationLevel el_from_course ON co.education_level_id = el_from_course.id
+    LEFT JOIN YearLevel yl ON sec.year_id = yl.id
+    LEFT JOIN EducationLevel el_from_year ON yl.education_level_id = el_from_year.id
+    WHERE cs.student_id = :student_profile_id
+      AND c.status = 'active'
+    ORDER BY s.name
+"""
+
 # ==============================
 # Dashboard
 # ==============================
@@ -16,98 +156,48 @@ student_bp = Blueprint('student', __name__, url_prefix='/student')
 @login_required
 @role_required("student")
 def dashboard():
-    # Main summary counts
-    summary_query = text("""
-        SELECT 
-            COUNT(DISTINCT cs.id) AS total_classes,
-            COUNT(DISTINCT CASE WHEN c.status = 'completed' THEN cs.id END) AS total_classes_completed,
-            COUNT(DISTINCT CASE WHEN c.status = 'active' THEN cs.id END) AS total_classes_active,
-            COUNT(DISTINCT CASE WHEN sl.status = 'completed' THEN sl.id END) AS total_lessons_completed,
-            COUNT(DISTINCT CASE WHEN sl.status = 'in_progress' THEN sl.id END) AS lessons_in_progress
-        FROM StudentProfile sp
-        LEFT JOIN ClassStudent cs 
-            ON cs.student_id = sp.id
-        LEFT JOIN Class c 
-            ON c.id = cs.class_id
-            AND c.status = 'active'        
-        LEFT JOIN StudentLessonProgress sl 
-            ON sl.student_id = sp.id
-            AND sl.class_id = c.id        
-        WHERE sp.user_id = :user_id
-    """)
-
-    result = db.session.execute(summary_query, {'user_id': current_user.id}).fetchone()
+    # Main summary counts: enrollments by class status, lesson counts from the
+    # progress rollup of the active classes
+    student_id = get_student_id()
+    enrollments = db.session.execute(text("""
+        SELECT cs.class_id, c.status
+        FROM ClassStudent cs
+        JOIN Class c ON c.id = cs.class_id
+        WHERE cs.student_id = :student_id
+    """), {"student_id": student_id}).mappings().all()
+    progress = student_progress(db, student_id) if student_id else {}
+    active_ids = [e["class_id"] for e in enrollments if e["status"] == "active"]
 
     # Recent progress (most recent 5 lessons by started_at or completed_at)
-    recent_progress_query = text("""
-        SELECT 
-            l.id AS lesson_id,
-            l.title AS lesson_title,
-            c.id AS class_id,
-            s.name AS subject_name,
-            slp.status,
-            slp.started_at,
-            slp.completed_at
-        FROM StudentLessonProgress slp
-        JOIN Lesson l ON l.id = slp.lesson_id
-        JOIN Class c ON c.id = slp.class_id
-        JOIN Subject s ON s.id = c.subject_id
-        JOIN StudentProfile sp ON sp.id = slp.student_id
-        WHERE sp.user_id = :user_id
-        ORDER BY GREATEST(
-            IFNULL(slp.completed_at, '1970-01-01'),
-            IFNULL(slp.started_at, '1970-01-01')
-        ) DESC
-        LIMIT 5
-    """)
+    recent_progress = db.session.execute(text(RECENT_PROGRESS_QUERY), {'user_id': current_user.id}).mappings().all()
 
-    recent_progress = db.session.execute(recent_progress_query, {'user_id': current_user.id}).mappings().all()
-
-    points_query = text("""
-    SELECT 
-        sp.points,
-        tl.name AS trophy_name
-    FROM StudentProfile sp
-    LEFT JOIN TrophyLevel tl 
-        ON tl.required_points = (
-            SELECT MAX(required_points)
-            FROM TrophyLevel
-            WHERE required_points <= sp.points
-        )
-    WHERE sp.user_id = :user_id
-""")
-
-    result_trophy = db.session.execute(points_query, {"user_id": current_user.id}).fetchone()
-    points = result_trophy.points if result_trophy else 0
-    trophy_name = result_trophy.trophy_name if result_trophy else None
+    # Trophy and section leaderboard come from the in-memory gamification cache
+    profile = db.session.execute(
+        text("SELECT id, points, section_id FROM StudentProfile WHERE user_id = :user_id"),
+        {"user_id": current_user.id}
+    ).fetchone()
+    points = profile.points if profile else 0
+    trophy_name = trophy_for(db, points) if profile else None
+    section_board = leaderboard_summary(db, "section", profile.section_id, profile.id) if profile else None
 
 
     # Daily inspiration
-    daily = db.session.execute(text("""
-        SELECT di.*, 
-               q.quote, q.author, 
-               v.verse_text, v.reference, 
-               m.message, m.theme
-        FROM daily_inspirations di
-        LEFT JOIN motivational_quotes q ON di.quote_id = q.id
-        LEFT JOIN bible_verses v ON di.verse_id = v.id
-        LEFT JOIN grateful_peace_messages m ON di.message_id = m.id
-        ORDER BY di.date DESC
-        LIMIT 1
-    """)).mappings().first()
+    daily = get_daily_inspiration(db)
 
     return render_template(
         "student/dashboard.html",
         name=session.get("first_name"),
-        total_classes=result.total_classes or 0,
-        total_classes_completed=result.total_classes_completed or 0,
-        total_classes_active=result.total_classes_active or 0,
-        total_lessons_completed=result.total_lessons_completed or 0,
-        lessons_in_progress=result.lessons_in_progress or 0,
+        total_classes=len(enrollments),
+        total_classes_completed=sum(1 for e in enrollments if e["status"] == "completed"),
+        total_classes_active=len(active_ids),
+        total_lessons_completed=sum(progress[c]["completed_lessons"] for c in active_ids if c in progress),
+        lessons_in_progress=sum(progress[c]["in_progress_lessons"] for c in active_ids if c in progress),
         recent_progress=recent_progress,
         daily=daily,
         points=points,
-        trophy_name=trophy_name
+        trophy_name=trophy_name,
+        section_board=section_board,
+        student_id=profile.id if profile else None
     )
 
 
@@ -118,45 +208,14 @@ def dashboard():
 @login_required
 @role_required("student")
 def view_classes():
-    query = text("""
-        SELECT 
-            c.id,
-            s.name AS subject_name,
-            sec.name AS section_name,
-            cs.status AS enrollment_status,
-            c.status AS class_status,
-            c.color,
-            t.user_id AS teacher_user_id,
-            CONCAT(u.first_name, ' ', u.last_name) AS teacher_name,
-            COUNT(l.id) AS total_lessons,
-            SUM(CASE WHEN slp.status = 'completed' THEN 1 ELSE 0 END) AS completed_lessons
-        FROM ClassStudent cs
-        JOIN Class c ON cs.class_id = c.id
-        JOIN Subject s ON c.subject_id = s.id
-        JOIN Section sec ON c.section_id = sec.id
-        JOIN TeacherProfile t ON c.teacher_id = t.id
-        JOIN Users u ON t.user_id = u.id
-        JOIN StudentProfile sp ON cs.student_id = sp.id
-        LEFT JOIN Lesson l ON l.class_id = c.id
-        LEFT JOIN StudentLessonProgress slp 
-            ON slp.lesson_id = l.id AND slp.student_id = sp.id
-        WHERE sp.user_id = :user_id
-        GROUP BY c.id, s.name, sec.name, cs.status, c.status, c.color, t.user_id, u.first_name, u.last_name
-    """)
-    
-    all_classes = db.session.execute(query, {'user_id': current_user.id}).fetchall()
-
-    # Add progress percentage
-    classes_with_progress = []
-    for c in all_classes:
-        total = c.total_lessons or 0
-        completed = c.completed_lessons or 0
-        progress = (completed / total * 100) if total > 0 else 0
-        # Use c._mapping to convert Row to dict
-        classes_with_progress.append({
-            **c._mapping,
-            'progress_percentage': round(progress)
-        })
+    student_id = get_student_id()
+    all_classes = db.session.execute(text(STUDENT_CLASSES_QUERY), {'student_id': student_id}).mappings().all()
+
+    # Lesson counts and percentage from the progress rollup
+    progress = student_progress(db, student_id)
+    classes_with_progress = [
+        {**c, **progress.get(c['id'], progress_totals(0, 0))} for c in all_classes
+    ]
 
     # Separate active vs history
     active_classes = [c for c in classes_with_progress if c['class_status'] == 'active']
@@ -176,6 +235,8 @@ def view_classes():
 @login_required
 @role_required("student")
 def view_lessons(class_id):
+    student_profile_id = get_student_id()
+
     # Get class status
     class_status = db.session.execute(
         text("SELECT status FROM Class WHERE id = :class_id"),
@@ -204,148 +265,18 @@ def view_lessons(class_id):
             LEFT JOIN Section sec ON c.section_id = sec.id
             LEFT JOIN ClassStudent cs 
                 ON cs.class_id = c.id 
-                AND cs.student_id = (SELECT id FROM StudentProfile WHERE user_id = :user_id)
+                AND cs.student_id = :student_id
             WHERE c.id = :class_id
-        """), {'class_id': class_id, 'user_id': current_user.id}
+        """), {'class_id': class_id, 'student_id': student_profile_id}
     ).mappings().first()
 
-    # Get student profile ID
-    student_profile_id = db.session.execute(
-        text("SELECT id FROM StudentProfile WHERE user_id = :user_id"),
-        {'user_id': current_user.id}
-    ).scalar()
     if not student_profile_id:
         flash("Student profile not found.", "danger")
         return redirect(url_for("student_bp.dashboard"))
-    # Ensure StudentLessonProgress entries exist for any new lessons
-    lesson_rows = db.session.execute(
-        text("SELECT id FROM Lesson WHERE class_id = :class_id"),
-        {'class_id': class_id}
-    ).mappings().all()
-
-    lesson_ids = [row['id'] for row in lesson_rows]
-
-    if not lesson_ids:
-        return render_template(
-            "student/lessons.html",
-            lessons=[],                # no lessons
-            class_id=class_id,
-            class_status=class_status,
-            class_info=class_info,
-            progress_summary={
-                'total': 0,
-                'completed': 0,
-                'in_progress': 0,
-                'not_started': 0
-            },
-            activities_summary={
-                'total': 0,
-                'passed': 0,
-                'not_passed': 0
-            },
-            overall_score=0,
-            total_possible=0
-        )
-
 
-    lesson_ids = [row['id'] for row in lesson_rows]
-
-    if lesson_ids:
-        # Existing progress for this student
-        existing_progress_rows = db.session.execute(
-            text("""
-                SELECT lesson_id FROM StudentLessonProgress
-                WHERE class_id = :class_id AND student_id = :student_id
-            """),
-            {'class_id': class_id, 'student_id': student_profile_id}
-        ).mappings().all()
-
-        existing_progress = {row['lesson_id'] for row in existing_progress_rows}
-
-        # Only insert missing progress for new lessons
-        missing_lessons = set(lesson_ids) - existing_progress
-        if missing_lessons:
-            for lid in missing_lessons:
-                db.session.execute(
-                    text("""
-                        INSERT INTO StudentLessonProgress (class_id, lesson_id, student_id, status)
-                        VALUES (:class_id, :lesson_id, :student_id, 'not_started')
-                    """),
-                    {'class_id': class_id, 'lesson_id': lid, 'student_id': student_profile_id}
-                )
-            db.session.commit()
-
-        # Fetch lessons with progress and activity info (duplicate-free)
-        lessons = db.session.execute(
-        text("""
-            SELECT 
-                l.id AS lesson_id, 
-                l.lesson_number, 
-                l.title, 
-                l.description,
-
-                slp.status AS progress_status, 
-                slp.completed_at, 
-                slp.started_at,
-
-                -- Single file per lesson
-                lf.file_id,
-                lf.file_name,
-                lf.file_path,
-                lf.file_type,
-
-                -- Single activity per lesson
-                a.activity_id,
-                a.activity_title,
-                a.activity_due,
-
-                -- Submission info
-                s.score AS activity_score,
-                s.submitted_at AS activity_submitted_at,
-
-                -- Final unified submission status
-                CASE 
-                    WHEN s.submitted_at IS NULL THEN 'not_submitted'
-                    WHEN s.score IS NULL THEN 'submitted_not_graded'
-                    WHEN s.score >= 1 THEN 'passed'
-                    ELSE 'failed'
-                END AS submission_status
-
-            FROM Lesson l
-
-            LEFT JOIN StudentLessonProgress slp 
-                ON l.id = slp.lesson_id 
-                AND slp.student_id = :student_id
-
-            -- Aggregate files to return only one per lesson
-            LEFT JOIN (
-                SELECT lesson_id, MAX(id) AS file_id, MAX(file_name) AS file_name,
-                    MAX(file_path) AS file_path, MAX(file_type) AS file_type
-                FROM LessonFile
-                GROUP BY lesson_id
-            ) lf ON l.id = lf.lesson_id
-
-            -- Aggregate assignments to return only one per lesson
-            LEFT JOIN (
-                SELECT lesson_id, MAX(id) AS activity_id, MAX(title) AS activity_title,
-                    MAX(due_date) AS activity_due
-                FROM Activity
-                WHERE type = 'assignment'
-                GROUP BY lesson_id
-            ) a ON l.id = a.lesson_id
-
-            -- Get submission info (only 1 row per activity/student)
-            LEFT JOIN (
-                SELECT activity_id, student_id, MAX(score) AS score, MAX(submitted_at) AS submitted_at
-                FROM ActivitySubmission
-                WHERE student_id = :student_id
-                GROUP BY activity_id, student_id
-            ) s ON a.activity_id = s.activity_id
-
-            WHERE l.class_id = :class_id
-            ORDER BY l.lesson_number ASC
-        """),
-        {'student_id': student_profile_id, 'class_id': class_id}
+    # Lessons with progress, file and assignment info (one row per lesson)
+    lessons = db.session.execute(
+        text(STUDENT_LESSONS_QUERY), {'student_id': student_profile_id, 'class_id': class_id}
     ).mappings().all()
 
 
@@ -371,16 +302,9 @@ def view_lessons(class_id):
     }
 
     # Overall score
-    overall = db.session.execute(
-        text("""
-            SELECT SUM(s.score) AS total_score, SUM(a.max_score) AS total_possible
-            FROM Activity a
-            LEFT JOIN ActivitySubmission s ON a.id = s.activity_id AND s.student_id = :student_id
-            WHERE a.class_id = :class_id
-        """), {'student_id': student_profile_id, 'class_id': class_id}
-    ).mappings().first()
-    overall_score = overall['total_score'] or 0
-    total_possible = overall['total_possible'] or 0
+    overall = student_grade(db, student_profile_id, class_id)
+    overall_score = overall['total_score']
+    total_possible = overall['max_score']
 
     # Flash info
     if class_status in ('completed', 'cancelled'):
@@ -399,7 +323,9 @@ def view_lessons(class_id):
         progress_summary=progress_summary,
         activities_summary=activities_summary,
         overall_score=overall_score,
-        total_possible=total_possible
+        total_possible=total_possible,
+        class_board=leaderboard_summary(db, "class", class_id, student_profile_id),
+        student_id=student_profile_id
     )
 
 # ==============================
@@ -409,99 +335,87 @@ def view_lessons(class_id):
 @login_required
 @role_required("student")
 def update_lesson_progress(lesson_id):
-    student_query = text("SELECT id FROM StudentProfile WHERE user_id = :user_id")
-    student = db.session.execute(student_query, {'user_id': current_user.id}).fetchone()
-    class_id_query = text("SELECT class_id FROM Lesson WHERE id = :lesson_id")
-    class_id = db.session.execute(class_id_query, {'lesson_id': lesson_id}).scalar()
-
-    # Check class status
-    class_status_query = text("SELECT status FROM Class WHERE id = :class_id")
-    class_status = db.session.execute(class_status_query, {'class_id': class_id}).scalar()
-
-    if class_status in ('completed', 'cancelled'):
-        flash("You cannot update progress for a completed or cancelled class.", "warning")
-        return redirect(url_for("student.view_classes"))
-
-    if not student:
+    """
+    Start or complete a lesson. With ?format=json (the lessons page script)
+    the answer is the new lesson state and class counts instead of a redirect.
+    """
+    student_id = get_student_id()
+    if not student_id:
+        if wants_json():
+            return jsonify({"blocked": "no_profile", "message": "Student profile not found."}), 404
         flash("Student profile not found.", "error")
         return redirect(url_for("student.dashboard"))
 
-    progress_query = text("""
-        SELECT id, status, started_at, completed_at 
-        FROM StudentLessonProgress
-        WHERE lesson_id = :lesson_id AND student_id = :student_id
-    """)
-    progress = db.session.execute(progress_query, {
-        'lesson_id': lesson_id,
-        'student_id': student.id
-    }).fetchone()
-
-    next_status = 'not_started'
-    now = datetime.now()
-
-    if progress:
-        if progress.status == 'not_started':
-            next_status = 'in_progress'
-            update = text("""
-                UPDATE StudentLessonProgress
-                SET status = :status,
-                    started_at = NOW()
-                WHERE id = :id
-            """)
-            db.session.execute(update, {'id': progress.id, 'status': next_status})
-
-        elif progress.status == 'in_progress':
-            next_status = 'completed'
-            update = text("""
-                UPDATE StudentLessonProgress
-                SET status = :status,
-                    completed_at = NOW()
-                WHERE id = :id
-            """)
-            # Update lesson progress
-            db.session.execute(update, {'id': progress.id, 'status': next_status})
-
-            # POINT SYSTEM
-            result = db.session.execute(
-                text("SELECT points FROM StudentProfile WHERE id = :student_id"),
-                {"student_id": student.id}
-            )
-            current_point = result.scalar() or 0  # get the integer value safely
-
-            # increment points
-            new_points = current_point + 1
-
-            db.session.execute(
-                text("UPDATE StudentProfile SET points = :points WHERE id = :student_id"),
-                {"student_id": student.id, "points": new_points}
-            )
+    # Only the step after the status the page showed is tried
+    result = advance_lesson_progress(db, student_id, lesson_id, request.form.get("status"))
+    db.session.commit()
+    record_points(student_id, result["points_awarded"])
+    if result["changed"]:
+        class_id, channels = lesson_audience(db, lesson_id, student_id)
+        publish(
+            channels,
+            EVENT_LESSON_COMPLETED if result["status"] == "completed" else EVENT_LESSON_STARTED,
+            class_id=class_id, lesson_id=lesson_id, student_id=student_id,
+            status=result["status"], points_awarded=result["points_awarded"]
+        )
 
+    if result["blocked"]:
+        message, category = PROGRESS_BLOCKED[result["blocked"]]
+        if wants_json():
+            status = 404 if result["blocked"] == "not_found" else 409
+            return jsonify({"blocked": result["blocked"], "message": message}), status
+        flash(message, category)
+        return redirect(url_for("student.view_classes"))
 
+    if result["changed"]:
+        label = result["status"].replace("_", " ")
+        message, category = f"Lesson progress updated to {label}!", "success"
+    elif result["status"] == "completed":
+        message, category = "This lesson is already completed.", "info"
     else:
-        # First time clicking → move from not_started → in_progress
-        insert = text("""
-            INSERT INTO StudentLessonProgress (class_id, lesson_id, student_id, status, started_at)
-            SELECT l.class_id, :lesson_id, :student_id, 'in_progress', NOW()
-            FROM Lesson l WHERE l.id = :lesson_id
-        """)
-        db.session.execute(insert, {
-            'lesson_id': lesson_id,
-            'student_id': student.id
+        message, category = "This lesson is already in progress.", "info"
+
+    if wants_json():
+        state = lesson_progress_state(db, student_id, lesson_id)
+        summary = state["summary"]
+        return jsonify({
+            "lesson_id": lesson_id,
+            "status": state["status"],
+            "changed": result["changed"],
+            "points_awarded": result["points_awarded"],
+            "message": message,
+            "started_at": _progress_time(state["started_at"]),
+            "completed_at": _progress_time(state["completed_at"]),
+            "summary": {
+                "total": summary["total_lessons"],
+                "completed": summary["completed_lessons"],
+                "in_progress": summary["in_progress_lessons"],
+                "not_started": max(summary["total_lessons"] - summary["completed_lessons"]
+                                   - summary["in_progress_lessons"], 0),
+                "percentage": summary["progress_percentage"],
+            },
         })
 
-    db.session.commit()
-    flash(f"Lesson progress updated to {next_status.replace("_", " ")}!", "success")
+    flash(message, category)
     return redirect(request.referrer or url_for("student.dashboard"))
 
 
+def _progress_time(value):
+    # Same format as the lessons page's "Started at" / "Completed at" lines
+    return value.strftime("%B %d, %Y - %I:%M %p") if value else None
+
+
 @student_bp.route("/history")
 @login_required
 @role_required("student")
 def history():
-    search = request.args.get("search", "").strip().lower()
-    
-    # Base query
-    query = text("""
+    search = request.args.get("search", "").strip()
+    condition, search_params, relevance = search_filter(
+        search, [("subject", "s"), ("section", "sec"), ("people", "u")]
+    )
+
+    student_id = get_student_id()
+    classes = db.session.execute(text(f"""
         SELECT 
             c.id,
             s.name AS subject_name,
@@ -509,45 +423,24 @@ def history():
             CONCAT(u.first_name, ' ', u.last_name) AS teacher_name,
             c.status AS class_status,
             cs.status AS enrollment_status,
-            c.color,
-            COUNT(l.id) AS total_lessons,
-            SUM(CASE WHEN slp.status = 'completed' THEN 1 ELSE 0 END) AS completed_lessons
+            c.color
         FROM ClassStudent cs
         JOIN Class c ON cs.class_id = c.id
         JOIN Subject s ON c.subject_id = s.id
         JOIN Section sec ON c.section_id = sec.id
         JOIN TeacherProfile tp ON c.teacher_id = tp.id
         JOIN Users u ON tp.user_id = u.id
-        JOIN StudentProfile sp ON cs.student_id = sp.id
-        LEFT JOIN Lesson l ON l.class_id = c.id
-        LEFT JOIN StudentLessonProgress slp 
-            ON slp.lesson_id = l.id AND slp.student_id = sp.id
-        WHERE sp.user_id = :user_id
+        WHERE cs.student_id = :student_id
           AND c.status IN ('completed', 'cancelled')
-        GROUP BY c.id, s.name, sec.name, u.first_name, u.last_name, c.status, cs.status, c.color
-    """)
+          {f"AND {condition}" if condition else ""}
+        ORDER BY {search_order(relevance, "c.updated_at DESC")}
+    """), {"student_id": student_id, **search_params}).mappings().all()
 
-    classes = db.session.execute(query, {"user_id": current_user.id}).mappings().all()
-
-    # Filter search after fetching
-    if search:
-        classes = [
-            c for c in classes 
-            if search in c['subject_name'].lower() 
-               or search in c['section_name'].lower()
-               or search in c['teacher_name'].lower()
-        ]
-
-    # Add progress percentage
-    classes_with_progress = []
-    for c in classes:
-        total = c['total_lessons'] or 0
-        completed = c['completed_lessons'] or 0
-        progress = (completed / total * 100) if total > 0 else 0
-        classes_with_progress.append({
-            **c,
-            "progress_percentage": round(progress)
-        })
+    # Lesson counts and percentage from the progress rollup
+    progress = student_progress(db, student_id)
+    classes_with_progress = [
+        {**c, **progress.get(c['id'], progress_totals(0, 0))} for c in classes
+    ]
 
     return render_template("student/history.html", history_classes=classes_with_progress)
 
@@ -560,8 +453,7 @@ def history():
 @role_required("student")
 def view_activity(activity_id):
     # Get student profile ID
-    student_profile_query = text("SELECT id FROM StudentProfile WHERE user_id = :user_id")
-    student_profile_id = db.session.execute(student_profile_query, {"user_id": current_user.id}).scalar()
+    student_profile_id = get_student_id()
     if not student_profile_id:
         flash("Student profile not found.", "danger")
         return redirect(url_for("student_bp.dashboard"))
@@ -619,8 +511,7 @@ def view_activity(activity_id):
 @role_required("student")
 def submit_activity(activity_id):
     # Get student profile ID
-    student_profile_query = text("SELECT id FROM StudentProfile WHERE user_id = :user_id")
-    student_profile_id = db.session.execute(student_profile_query, {"user_id": current_user.id}).scalar()
+    student_profile_id = get_student_id()
     if not student_profile_id:
         flash("Student profile not found.", "danger")
         return redirect(url_for("student_bp.dashboard"))
@@ -696,7 +587,14 @@ def submit_activity(activity_id):
         })
         flash("Assignment submitted successfully.", "success")
 
+    refresh_grade_summary(db, activity["class_id"], [student_profile_id])
+    log_activity_event(db, EVENT_ACTIVITY_SUBMITTED, student_profile_id, activity_id)
     db.session.commit()
+    publish(
+        class_audience(db, activity["class_id"]), EVENT_ACTIVITY_SUBMITTED,
+        class_id=activity["class_id"], activity_id=activity_id, student_id=student_profile_id,
+        first=submission is None
+    )
     return redirect(url_for("student.view_activity", activity_id=activity_id))
 
 @student_bp.route("/grades")
@@ -706,66 +604,21 @@ def grade_overview():
     """Show all ACTIVE classes with total grades for the logged-in student."""
 
     # Get the student profile ID from the logged-in user
-    student_profile = db.session.execute(
-        text("SELECT id FROM StudentProfile WHERE user_id = :user_id"),
-        {"user_id": current_user.id}
-    ).mappings().first()
+    student_profile_id = get_student_id()
 
-    if not student_profile:
+    if not student_profile_id:
         flash("Student profile not found.", "error")
         return redirect(url_for("student.dashboard"))
 
-    student_profile_id = student_profile["id"]
-
     # Fetch active classes the student is enrolled in
-    classes_query = text("""
-        SELECT 
-            c.id AS class_id,
-            s.name AS subject_name,
-            sec.name AS section_name,
-            co.name AS course_name,
-            COALESCE(el_from_course.name, el_from_year.name) AS education_level
-        FROM ClassStudent cs
-        JOIN Class c ON cs.class_id = c.id
-        JOIN Subject s ON c.subject_id = s.id
-        JOIN Section sec ON c.section_id = sec.id
-        LEFT JOIN Course co ON sec.course_id = co.id
-        LEFT JOIN EducationLevel el_from_course ON co.education_level_id = el_from_course.id
-        LEFT JOIN YearLevel yl ON sec.year_id = yl.id
-        LEFT JOIN EducationLevel el_from_year ON yl.education_level_id = el_from_year.id
-        WHERE cs.student_id = :student_profile_id
-          AND c.status = 'active'         
-        ORDER BY s.name
-    """)
-    enrolled_classes = db.session.execute(classes_query, {"student_profile_id": student_profile_id}).mappings().all()
+    enrolled_classes = db.session.execute(text(GRADE_OVERVIEW_QUERY), {"student_profile_id": student_profile_id}).mappings().all()
 
-    # Compute total grades for each class
+    # Total grades for every class in one grouped query
+    grades = student_grades(db, student_profile_id, [cls["class_id"] for cls in enrolled_classes])
     classes_with_grades = []
     for cls in enrolled_classes:
-        grade_query = text("""
-            SELECT
-                COALESCE(SUM(asub.score), 0) AS total_score,
-                COALESCE(SUM(a.max_score), 0) AS max_score
-            FROM Activity a
-            LEFT JOIN ActivitySubmission asub
-                ON asub.activity_id = a.id
-                AND asub.student_id = :student_profile_id
-            WHERE a.class_id = :class_id
-        """)
-        grade_result = db.session.execute(grade_query, {
-            "student_profile_id": student_profile_id,
-            "class_id": cls["class_id"]
-        }).mappings().first()
-
-        total_score = grade_result["total_score"]
-        max_score = grade_result["max_score"]
-        overall_percentage = (total_score / max_score * 100) if max_score > 0 else None
-
         cls_dict = dict(cls)
-        cls_dict["total_score"] = total_score
-        cls_dict["max_score"] = max_score
-        cls_dict["overall_percentage"] = round(overall_percentage, 1) if overall_percentage is not None else None
-
+        cls_dict.update(grades.get(cls["class_id"], grade_totals(0, 0)))
         classes_with_grades.append(cls_dict)
 
     return render_template("student/grade_overview.html", classes=classes_with_grades)
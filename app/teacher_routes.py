@@ -8,6 +8,22 @@ import json
 import os
 from datetime import datetime
 from decorators import role_required
+from identity import current_profile_id
+from inspiration import get_daily_inspiration
+from search import search_filter, search_order, SEARCH_LIMIT
+from enrollment import enroll_students, enroll_section, sync_section_rosters, enrollment_message
+from enrollment_index import enrollment_index
+from pagination import PAGE_SIZE
+from progress_rollup import on_lesson_added, on_lesson_deleted, drop_progress_rollup
+from lesson_manifest import refresh_lesson_manifest
+from reference_data import bump_ref_version, ref_rows
+from activity_feed import recent_events, log_activity_event, EVENT_SUBMISSION_GRADED
+from live_events import publish, class_audience
+from lesson_order import insert_lesson, apply_order, LessonOrderError, LESSON_NUMBER
+from gradebook import (
+    class_grades, student_grade, grade_totals, refresh_grade_summary, adjust_class_possible,
+    remove_activity_from_summary, remove_lesson_from_summary, drop_grade_summary
+)
 
 teacher_bp = Blueprint('teacher', __name__, url_prefix='/teacher')
 
@@ -15,11 +31,105 @@ teacher_bp = Blueprint('teacher', __name__, url_prefix='/teacher')
 UPLOAD_FOLDER = "uploads/lessons"
 
 def get_teacher_id():
-    result = db.session.execute(
-        text("SELECT id FROM TeacherProfile WHERE user_id = :user_id"),
-        {"user_id": current_user.get_id()}
-    ).mappings().first()
-    return result["id"] if result else None
+    return current_profile_id()
+
+
+# =======================
+# Hot queries
+# =======================
+# Shared with query_plans.py, which EXPLAINs exactly this SQL
+ADVISORY_SECTIONS_QUERY = """
+    SELECT
+        sec.id AS section_id,
+        sec.name AS section_name,
+        co.name AS course_name,
+        el.name AS education_level,
+        sec.status AS section_status,
+        COUNT(st.id) AS student_count
+    FROM Section sec
+    JOIN Course co ON sec.course_id = co.id
+    JOIN EducationLevel el ON co.education_level_id = el.id
+    LEFT JOIN StudentProfile st ON st.section_id = sec.id
+    WHERE sec.teacher_id = :teacher_id AND sec.status = 1
+    GROUP BY sec.id, sec.name, co.name, el.name
+    ORDER BY el.name, co.name, sec.name
+"""
+
+# classes() adds the status filter, the search and the order
+TEACHER_CLASSES_QUERY = """
+    SELECT
+        c.id AS class_id,
+        s.name AS subject_name,
+        sec.name AS section_name,
+        el.name AS education_level,
+        c.color,
+        c.status
+    FROM Class c
+    JOIN Subject s ON c.subject_id = s.id
+    JOIN Section sec ON c.section_id = sec.id
+    LEFT JOIN Course co ON sec.course_id = co.id
+    LEFT JOIN EducationLevel el ON co.education_level_id = el.id
+    WHERE c.teacher_id = :teacher_id
+"""
+TEACHER_CLASSES_SEARCH = [("subject", "s"), ("section", "sec"), "el.name"]
+TEACHER_CLASSES_ORDER = "el.name, sec.name, s.name"
+
+CLASS_LESSONS_QUERY = f"""
+    SELECT l.id, {LESSON_NUMBER} AS lesson_number, l.title, l.description
+    FROM Lesson l
+    WHERE l.class_id = :class_id
+    ORDER BY l.lesson_number
+"""
+
+CLASS_ROSTER_QUERY = """
+    SELECT
+        cs.id AS class_student_id,
+        sp.id AS student_profile_id,
+        CONCAT(u.first_name, ' ', u.last_name) AS full_name,
+        sp.year_id,
+        u.school_id,
+        yl.name AS year,
+        cs.status AS enrollment_status
+    FROM ClassStudent cs
+    JOIN StudentProfile sp ON cs.student_id = sp.id
+    JOIN Users u ON sp.user_id = u.id
+    JOIN YearLevel yl ON sp.year_id = yl.id
+    WHERE cs.class_id = :class_id
+    ORDER BY u.last_name
+"""
+
+# Submissions are counted for this class's activities only, not grouped
+# over the whole ActivitySubmission table
+CLASS_ACTIVITIES_QUERY = """
+    SELECT
+        a.id,
+        a.title,
+        a.lesson_id,
+        a.type,
+        a.due_date,
+        a.max_score,
+        a.created_at,
+        COALESCE(sub_count.submitted, 0) AS submitted_count,
+        total_students.total AS student_count,
+        COALESCE(total_students.total, 0) - COALESCE(sub_count.submitted, 0) AS not_submitted_count
+    FROM Activity a
+    -- Count submissions per activity
+    LEFT JOIN (
+        SELECT sub.activity_id, COUNT(*) AS submitted
+        FROM ActivitySubmission sub
+        JOIN Activity sa ON sa.id = sub.activity_id
+        WHERE sa.class_id = :class_id
+        GROUP BY sub.activity_id
+    ) sub_count ON sub_count.activity_id = a.id
+    -- Count total students in class
+    LEFT JOIN (
+        SELECT COUNT(*) AS total
+        FROM ClassStudent
+        WHERE class_id = :class_id
+    ) total_students ON 1=1
+    WHERE a.class_id = :class_id
+    ORDER BY a.created_at DESC
+"""
 
 @teacher_bp.route("/")
 @login_required
@@ -30,68 +140,36 @@ def dashboard():
         return apology("Teacher profile not found.", 404)
 
     # --- Fetch teacher advisory sections ---
-    advisory_sections = db.session.execute(text("""
-        SELECT 
-            sec.id AS section_id,
-            sec.name AS section_name,
-            co.name AS course_name,
-            el.name AS education_level,
-            sec.status AS section_status,
-            COUNT(st.id) AS student_count
-        FROM Section sec
-        JOIN Course co ON sec.course_id = co.id
-        JOIN EducationLevel el ON co.education_level_id = el.id
-        LEFT JOIN StudentProfile st ON st.section_id = sec.id
-        WHERE sec.teacher_id = :teacher_id AND sec.status = 1
-        GROUP BY sec.id, sec.name, co.name, el.name
-        ORDER BY el.name, co.name, sec.name
-    """), {"teacher_id": teacher_id}).mappings().all()
-
-    # --- Fetch lesson progress for students only in teacher's sections ---
-    lesson_progress = db.session.execute(text("""
-    SELECT 
-        slp.id,
-        CONCAT(u.first_name, ' ', u.last_name) AS student_name,
-        c.id AS class_id,
-        sub.name AS subject_name,
-        c.status AS class_status,
-        l.title AS lesson_title,
-        slp.started_at,
-        slp.completed_at
-    FROM StudentLessonProgress slp
-    JOIN StudentProfile sp ON slp.student_id = sp.id
-    JOIN Users u ON sp.user_id = u.id
-    JOIN Class c ON slp.class_id = c.id
-    JOIN Subject sub ON c.subject_id = sub.id
-    JOIN Section sec ON c.section_id = sec.id
-    JOIN Lesson l ON slp.lesson_id = l.id
-    WHERE (slp.status = 'completed' OR slp.status = 'in_progress')
-      AND sec.teacher_id = :teacher_id
-    ORDER BY slp.completed_at DESC
-    LIMIT 15
-"""), {"teacher_id": teacher_id}).mappings().all()
+    advisory_sections = db.session.execute(
+        text(ADVISORY_SECTIONS_QUERY), {"teacher_id": teacher_id}
+    ).mappings().all()
 
+    # --- Latest activity of students in the teacher's sections ---
+    recent_activity = recent_events(db, "teacher", teacher_id)
 
     # --- Fetch daily inspirations ---
-    daily = db.session.execute(text("""
-        SELECT di.*, 
-               q.quote, q.author, 
-               v.verse_text, v.reference, 
-               m.message, m.theme
-        FROM daily_inspirations di
-        LEFT JOIN motivational_quotes q ON di.quote_id = q.id
-        LEFT JOIN bible_verses v ON di.verse_id = v.id
-        LEFT JOIN grateful_peace_messages m ON di.message_id = m.id
-        ORDER BY di.date DESC
-        LIMIT 1
-    """)).mappings().first()
+    daily = get_daily_inspiration(db)
 
     return render_template(
         "teacher/dashboard.html",
         name=session.get("first_name"),
         sections=advisory_sections,
         daily=daily,
-        lesson_progress=lesson_progress
+        recent_activity=recent_activity
+    )
+
+@teacher_bp.route("/activity-feed")
+@login_required
+@role_required("teacher")
+def recent_activity_items():
+    """Dashboard rows newer than ?after_id=, fetched by live.js on a live event."""
+    teacher_id = get_teacher_id()
+    if not teacher_id:
+        return "", 404
+    after_id = request.args.get("after_id", 0, type=int)
+    return render_template(
+        "teacher/activity_feed_items.html",
+        recent_activity=recent_events(db, "teacher", teacher_id, after_id=after_id)
     )
 
 @teacher_bp.route("/classes")
@@ -108,21 +186,7 @@ def classes():
     search = request.args.get("search", "").strip()
 
     # Base SQL
-    query = """
-    SELECT 
-        c.id AS class_id,
-        s.name AS subject_name,
-        sec.name AS section_name,
-        el.name AS education_level,
-        c.color,
-        c.status
-    FROM Class c
-    JOIN Subject s ON c.subject_id = s.id
-    JOIN Section sec ON c.section_id = sec.id
-    LEFT JOIN Course co ON sec.course_id = co.id
-    LEFT JOIN EducationLevel el ON co.education_level_id = el.id
-    WHERE c.teacher_id = :teacher_id
-    """
+    query = TEACHER_CLASSES_QUERY
 
     params = {"teacher_id": teacher_id}
 
@@ -132,17 +196,12 @@ def classes():
         params["status"] = selected_status
 
     # Apply search if provided
-    if search:
-        query += """
-        AND (
-            s.name LIKE :search OR
-            sec.name LIKE :search OR
-            el.name LIKE :search
-        )
-        """
-        params["search"] = f"%{search}%"
+    condition, search_params, relevance = search_filter(search, TEACHER_CLASSES_SEARCH)
+    if condition:
+        query += f" AND {condition}"
+        params.update(search_params)
 
-    query += " ORDER BY el.name, sec.name, s.name"
+    query += " ORDER BY " + search_order(relevance, TEACHER_CLASSES_ORDER)
 
     teacher_classes = db.session.execute(text(query), params).mappings().all()
 
@@ -189,69 +248,24 @@ def view_class(class_id):
         return apology("Class not found.", 404)
 
     # Fetch lessons
-    lessons_query = text("""
-        SELECT id, lesson_number, title, description
-        FROM Lesson
-        WHERE class_id = :class_id
-        ORDER BY lesson_number
-    """)
-    lessons = db.session.execute(lessons_query, {"class_id": class_id}).mappings().all()
+    lessons = db.session.execute(text(CLASS_LESSONS_QUERY), {"class_id": class_id}).mappings().all()
     no_lessons = len(lessons) == 0
 
     # Fetch students
-    students_query = text("""
-    SELECT 
-        cs.id AS class_student_id,
-        sp.id AS student_profile_id,
-        CONCAT(u.first_name, ' ', u.last_name) AS full_name,
-        sp.year_id,
-        u.school_id,
-        yl.name AS year,
-        cs.status AS enrollment_status
-    FROM ClassStudent cs
-    JOIN StudentProfile sp ON cs.student_id = sp.id
-    JOIN Users u ON sp.user_id = u.id
-    JOIN YearLevel yl ON sp.year_id = yl.id
-    WHERE cs.class_id = :class_id
-    ORDER BY u.last_name
-""")
-
-    students_raw = db.session.execute(students_query, {"class_id": class_id}).mappings().all()
+    students_raw = db.session.execute(text(CLASS_ROSTER_QUERY), {"class_id": class_id}).mappings().all()
     no_students = len(students_raw) == 0
 
-    # Convert to mutable dict and compute quick overall grade for each student
+    # Quick overall grade for every student in one grouped query
+    grades = class_grades(db, class_id)
     students = []
     for student in students_raw:
         student_dict = dict(student)  # make mutable
-
-        grade_query = text("""
-            SELECT 
-                COALESCE(SUM(asub.score), 0) AS total_score,
-                COALESCE(SUM(a.max_score), 0) AS max_score
-            FROM Activity a
-            LEFT JOIN ActivitySubmission asub
-                ON asub.activity_id = a.id
-                AND asub.student_id = :student_id
-            WHERE a.class_id = :class_id
-        """)
-        grade_result = db.session.execute(grade_query, {
-            "student_id": student_dict["student_profile_id"],
-            "class_id": class_id
-        }).mappings().first()
-
-        total_score = grade_result["total_score"]
-        max_score = grade_result["max_score"]
-        overall_percentage = (total_score / max_score * 100) if max_score > 0 else None
-
-        student_dict["total_score"] = total_score
-        student_dict["max_score"] = max_score
-        student_dict["overall_percentage"] = round(overall_percentage, 1) if overall_percentage is not None else None
-
+        student_dict.update(grades.get(student_dict["student_profile_id"], grade_totals(0, 0)))
         students.append(student_dict)
 
     # Dropdown options
-    subjects = db.session.execute(text("SELECT id, name FROM Subject WHERE status = 1")).mappings().all()
-    sections = db.session.execute(text("SELECT id, name FROM Section WHERE status = 1")).mappings().all()
+    subjects = ref_rows(db, "Subject", status=1)
+    sections = ref_rows(db, "Section", status=1)
 
     # Handle inline edit submission
     if request.method == "POST":
@@ -345,31 +359,12 @@ def manage_lesson(class_id):
             flash("Lesson title is required.", "danger")
             return redirect(request.url)
 
-        # Determine next lesson number
-        next_num_query = text("""
-            SELECT COALESCE(MAX(lesson_number), 0) + 1 AS next_number
-            FROM Lesson
-            WHERE class_id = :class_id
-        """)
-        next_number = db.session.execute(next_num_query, {"class_id": class_id}).scalar()
-
-        # Insert lesson
-        insert_lesson = text("""
-            INSERT INTO Lesson (class_id, lesson_number, title, description, created_at, updated_at)
-            VALUES (:class_id, :lesson_number, :title, :description, NOW(), NOW())
-        """)
-        db.session.execute(insert_lesson, {
-            "class_id": class_id,
-            "lesson_number": next_number,
-            "title": title,
-            "description": description
-        })
+        # Append at the end of the class (keys are allocated under a class lock)
+        lesson_id = insert_lesson(db, class_id, title, description)
+        refresh_lesson_manifest(db, lesson_id)
+        on_lesson_added(db, class_id)
         db.session.commit()
 
-        # Get inserted lesson ID
-        lesson_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).scalar()
-
-
         # Handle file upload
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
@@ -386,18 +381,19 @@ def manage_lesson(class_id):
                 "file_path": filepath,
                 "file_type": file.mimetype
             })
+            refresh_lesson_manifest(db, lesson_id)
             db.session.commit()
 
         flash("Lesson added successfully!", "success")
         return redirect(url_for("teacher.manage_lesson", class_id=class_id))
 
     # Fetch lessons with a flag indicating if they have an activity
-    lessons = db.session.execute(text("""
+    lessons = db.session.execute(text(f"""
         SELECT 
-            l.*,
-            CASE WHEN a.id IS NOT NULL THEN 1 ELSE 0 END AS has_activity
+            l.id, l.class_id, l.title, l.description, l.created_at, l.updated_at,
+            {LESSON_NUMBER} AS lesson_number,
+            EXISTS (SELECT 1 FROM Activity a WHERE a.lesson_id = l.id) AS has_activity
         FROM Lesson l
-        LEFT JOIN Activity a ON a.lesson_id = l.id
         WHERE l.class_id = :class_id
         ORDER BY l.lesson_number ASC
     """), {"class_id": class_id}).mappings().all()
@@ -417,22 +413,20 @@ def update_lesson_order(class_id):
         return redirect(url_for("teacher.manage_lesson", class_id=class_id))
 
     try:
-        order_list = json.loads(order_data)
-        for item in order_list:
-            db.session.execute(text("""
-                UPDATE Lesson
-                SET lesson_number = :new_order
-                WHERE id = :lesson_id AND class_id = :class_id
-            """), {
-                "new_order": item["new_order"],
-                "lesson_id": item["id"],
-                "class_id": class_id
-            })
+        order_list = sorted(json.loads(order_data), key=lambda item: int(item["new_order"]))
+        ordered_ids = [int(item["id"]) for item in order_list]
+    except (ValueError, KeyError, TypeError):
+        flash("Invalid order data.", "danger")
+        return redirect(url_for("teacher.manage_lesson", class_id=class_id))
+
+    # One UPDATE for the whole drop; only lessons that actually moved are written
+    try:
+        apply_order(db, class_id, ordered_ids)
         db.session.commit()
         flash("Lesson order updated successfully!", "success")
-    except Exception as e:
+    except LessonOrderError as e:
         db.session.rollback()
-        flash(f"Error updating lesson order: {e}", "danger")
+        flash(str(e), "danger")
 
     return redirect(url_for("teacher.manage_lesson", class_id=class_id))
 
@@ -500,6 +494,7 @@ def edit_lesson(class_id, lesson_id):
                     "file_type": file.mimetype
                 })
 
+            refresh_lesson_manifest(db, lesson_id)
             db.session.commit()
 
 
@@ -533,6 +528,8 @@ def edit_lesson(class_id, lesson_id):
 @login_required
 @role_required("teacher")
 def delete_lesson(class_id, lesson_id):
+    # Take the lesson's activities out of the gradebook first
+    remove_lesson_from_summary(db, lesson_id)
 
     # 1. Delete ActivitySubmissions for activities under this lesson
     db.session.execute(text("""
@@ -557,6 +554,7 @@ def delete_lesson(class_id, lesson_id):
 
     # 4. Delete the lesson itself
     db.session.execute(text("DELETE FROM Lesson WHERE id = :lesson_id"), {"lesson_id": lesson_id})
+    on_lesson_deleted(db, class_id)
 
     db.session.commit()
 
@@ -571,27 +569,16 @@ def delete_lesson(class_id, lesson_id):
 @login_required
 @role_required("teacher")
 def manage_student(class_id):
-    search_query = request.form.get("search", "").strip()
+    search_query = request.values.get("search", "").strip()
     selected_students = request.form.getlist("student_ids")  # checkboxes for multiple add
 
     if request.method == "POST" and selected_students:
-        for student_id in selected_students:
-            # Add student to class
-            db.session.execute(
-                text(
-                    "INSERT IGNORE INTO ClassStudent (class_id, student_id) VALUES (:class_id, :student_id)"
-                ),
-                {"class_id": class_id, "student_id": student_id}
-            )
-
-            
-        
+        result = enroll_students(db, class_id, selected_students)
         db.session.commit()
-        flash("Student(s) added successfully.", "success")
+        enrollment_index.class_changed(class_id)
+        flash(enrollment_message(result), "success")
         return redirect(url_for("teacher.manage_student", class_id=class_id))
 
-    search_pattern = f"%{search_query}%"
-
     # Fetch the education level of this class via its section
     class_edu_level = db.session.execute(
         text("""
@@ -602,44 +589,15 @@ def manage_student(class_id):
         """), {"class_id": class_id}
     ).scalar()
 
-    # Students NOT yet in the class with section and education level info
-    students = db.session.execute(
-        text("""
-            SELECT 
-                sp.id AS student_id,
-                u.first_name,
-                u.last_name,
-                u.school_id,
-                sp.section_id,
-                sec.name AS section_name,
-                el.name AS education_level_name
-            FROM StudentProfile sp
-            JOIN Users u 
-                ON sp.user_id = u.id
-            LEFT JOIN ClassStudent cs 
-                ON cs.student_id = sp.id 
-                AND cs.class_id = :class_id
-            LEFT JOIN Section sec 
-                ON sp.section_id = sec.id
-            LEFT JOIN EducationLevel el
-                ON sp.education_level_id = el.id
-            WHERE cs.id IS NULL
-              AND sp.education_level_id = :edu_level
-              AND (
-                  u.first_name LIKE :search 
-                  OR u.last_name LIKE :search 
-                  OR u.school_id LIKE :search 
-                  OR sec.name LIKE :search 
-                  OR el.name LIKE :search
-              )
-            ORDER BY u.last_name, u.first_name
-        """),
-        {
-            "class_id": class_id,
-            "search": search_pattern,
-            "edu_level": class_edu_level
-        }
-    ).fetchall()
+    # Students of the level NOT yet in the class, from the in-memory index
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+    candidates = enrollment_index.candidates(
+        db, class_id, class_edu_level, search_query, offset=offset, limit=PAGE_SIZE
+    )
+    students = candidates["rows"]
 
     # Students ALREADY in the class with section info
     existing_students = db.session.execute(
@@ -661,9 +619,21 @@ def manage_student(class_id):
         students=students,
         existing_students=existing_students,
         class_id=class_id,
-        search_query=search_query
+        search_query=search_query,
+        candidates=candidates
     )
 
+# Enroll the class's whole section
+@teacher_bp.route("/classes/view/<int:class_id>/enroll-section", methods=["POST"])
+@login_required
+@role_required("teacher")
+def enroll_class_section(class_id):
+    result = enroll_section(db, class_id)
+    db.session.commit()
+    enrollment_index.class_changed(class_id)
+    flash(enrollment_message(result, "section student(s)"), "success")
+    return redirect(url_for("teacher.manage_student", class_id=class_id))
+
 # Remove student
 @teacher_bp.route("/classes/view/<int:class_id>/remove-student", methods=["POST"])
 @login_required
@@ -705,8 +675,11 @@ def remove_student_from_class(class_id):
         """),
         {"class_id": class_id, "student_id": student_id}
     )
+    drop_grade_summary(db, class_id, student_id)
+    drop_progress_rollup(db, class_id, student_id)
 
     db.session.commit()
+    enrollment_index.class_changed(class_id)
     flash("Student removed successfully, including all progress and submissions.", "success")
     return redirect(url_for("teacher.manage_student", class_id=class_id))
 
@@ -734,10 +707,10 @@ def student_progress(class_id, school_id):
     student_profile_id = sp_row["student_profile_id"]
 
     # 2) Get lessons + student's lesson progress
-    lessons_query = text("""
+    lessons_query = text(f"""
         SELECT 
             l.id AS lesson_id,
-            l.lesson_number,
+            {LESSON_NUMBER} AS lesson_number,
             l.title,
             l.description,
             IFNULL(slp.status, 'not_started') AS status,
@@ -778,12 +751,11 @@ def student_progress(class_id, school_id):
         "student_profile_id": student_profile_id
     }).mappings().all()
 
-    # Compute overall activity score percentage
-    total_max_score = sum(a["max_score"] for a in activities)
-    total_obtained_score = sum(a["student_score"] for a in activities)
-    overall_activity_percentage = (
-        (total_obtained_score / total_max_score * 100) if total_max_score > 0 else 0
-    )
+    # Overall activity score percentage
+    grade = student_grade(db, student_profile_id, class_id)
+    total_max_score = grade["max_score"]
+    total_obtained_score = grade["total_score"]
+    overall_activity_percentage = grade["overall_percentage"] or 0
 
     # 4) Build student_info
     student_info = {
@@ -869,19 +841,13 @@ def manage_sections():
 
     params = {"teacher_lvl_id": teacher_lvl_id, "teacher_id": teacher_id, "status": 0 if show_archive else 1}
 
-    if search:
-        base_query += """
-            AND (
-                sec.name LIKE :search
-                OR sec.academic_year LIKE :search
-                OR co.name LIKE :search
-                OR yl.name LIKE :search
-                OR el.name LIKE :search
-                OR u.first_name LIKE :search
-                OR u.last_name LIKE :search
-            )
-        """
-        params["search"] = f"%{search}%"
+    # Grouped per section, so results keep the usual order rather than relevance
+    condition, search_params, _ = search_filter(search, [
+        ("section", "sec"), ("course", "co"), ("people", "u"), "yl.name", "el.name"
+    ])
+    if condition:
+        base_query += f" AND {condition}"
+        params.update(search_params)
 
     base_query += """
         GROUP BY sec.id, sec.name, yl.name, co.name, el.name, sec.academic_year, sec.status, tp.id, u.first_name, u.last_name
@@ -942,17 +908,9 @@ def edit_section(section_id):
         return redirect(url_for("teacher.manage_sections"))
 
     # Load dropdown options
-    education_levels = db.session.execute(text("SELECT id, name FROM EducationLevel")).mappings().all()
-
-    courses = db.session.execute(text("""
-        SELECT id, name FROM Course
-        WHERE education_level_id = :lvl_id AND status = 1
-    """), {"lvl_id": teacher_lvl_id}).mappings().all()
-
-    year_levels = db.session.execute(text("""
-        SELECT id, name FROM YearLevel
-        WHERE education_level_id = :lvl_id
-    """), {"lvl_id": teacher_lvl_id}).mappings().all()
+    education_levels = ref_rows(db, "EducationLevel")
+    courses = ref_rows(db, "Course", education_level_id=teacher_lvl_id, status=1)
+    year_levels = ref_rows(db, "YearLevel", education_level_id=teacher_lvl_id)
 
     # Handle POST request (update section)
     if request.method == "POST":
@@ -1021,6 +979,7 @@ def edit_section(section_id):
                 "section_id": section_id,
                 "education_lvl_id": ed_lvl_id
             })
+            bump_ref_version(db, "Section")
             db.session.commit()
             flash("Section updated successfully!", "success")
             return redirect(url_for("teacher.manage_sections"))
@@ -1055,6 +1014,7 @@ def toggle_section_status(section_id):
         """),
         {"section_id": section_id}
     )
+    bump_ref_version(db, "Section")
     db.session.commit()
     flash("Section archive status updated.", "success")
     return redirect(url_for("teacher.manage_sections"))
@@ -1103,9 +1063,17 @@ def section_manage_students(section_id):
             SET section_id = :section_id
             WHERE id IN :ids
         """), {"section_id": section_id, "ids": tuple(student_ids)})
+
+        message = "Added student(s) to this section."
+        if request.form.get("sync_classes"):
+            # Also enroll them in the section's active classes
+            result = sync_section_rosters(db, section_id, student_ids)
+            if result["classes"]:
+                message += f" {enrollment_message(result, 'class enrollment(s)')}"
         db.session.commit()
+        enrollment_index.students_changed()
 
-        flash(f"Added student(s) to this section.", "success")
+        flash(message, "success")
         return redirect(url_for("teacher.section_manage_students", section_id=section_id))
 
     assigned_students = db.session.execute(text("""
@@ -1120,22 +1088,23 @@ def section_manage_students(section_id):
 
     search_query = request.args.get("q", "").strip()
     if search_query:
-        unassigned_students = db.session.execute(text("""
+        condition, params, relevance = search_filter(search_query, [("people", "u"), ("section", "s")])
+        if search_query.isdigit():
+            # Student profile IDs are shown in the picker; match them exactly
+            condition = f"({condition} OR sp.id = :student_pk)"
+            params["student_pk"] = int(search_query)
+
+        unassigned_students = db.session.execute(text(f"""
             SELECT sp.id AS student_id, u.first_name, u.middle_name AS second_name, u.last_name, u.email,
                 s.name AS section_name                    
             FROM StudentProfile sp
             JOIN Users u ON sp.user_id = u.id
             LEFT JOIN Section s ON sp.section_id = s.id
             WHERE (sp.section_id IS NULL OR s.status = 0)
-            AND (
-                    CAST(sp.id AS CHAR) LIKE :search OR
-                    u.first_name LIKE :search OR
-                    u.middle_name LIKE :search OR
-                    u.last_name LIKE :search OR
-                    s.name LIKE :search
-                )
-            ORDER BY u.last_name ASC
-        """), {"search": f"%{search_query}%"}).mappings().all()
+            AND {condition}
+            ORDER BY {search_order(relevance, "u.last_name ASC")}
+            LIMIT {SEARCH_LIMIT}
+        """), params).mappings().all()
     else:
         unassigned_students = db.session.execute(text("""
                 SELECT 
@@ -1191,6 +1160,7 @@ def remove_student_from_section(section_id, student_id):
     """), {"student_id": student_id})
 
     db.session.commit()
+    enrollment_index.students_changed()
     flash("Student successfully unassigned from section.", "success")
     return redirect(url_for("teacher.section_manage_students", section_id=section_id))
 
@@ -1225,12 +1195,17 @@ def activity_form(lesson_id):
         title = request.form.get("title")
         instructions = request.form.get("instructions")
         due_date = request.form.get("due_date")
-        max_score = request.form.get("max_score", 100)
+        # A blank field means the default; anything else must be a whole number >= 0
+        max_score = request.form.get("max_score", type=int) if request.form.get("max_score", "").strip() else 100
 
         if not title:
             flash("Title is required.", "error")
             return redirect(request.url)
 
+        if max_score is None or max_score < 0:
+            flash("Max score must be a whole number of 0 or more.", "error")
+            return redirect(request.url)
+
         # ---------------------------
         # INSERT or UPDATE ACTIVITY
         # ---------------------------
@@ -1253,6 +1228,7 @@ def activity_form(lesson_id):
                 "activity_id": activity.id
             })
             activity_id = activity.id
+            adjust_class_possible(db, lesson.class_id, max_score - (activity.max_score or 0))
             flash("Assignment updated successfully.", "success")
 
         else:
@@ -1269,8 +1245,10 @@ def activity_form(lesson_id):
                 "max_score": max_score
             })
             activity_id = result.lastrowid
+            adjust_class_possible(db, lesson.class_id, max_score)
             flash("Assignment created successfully.", "success")
 
+        refresh_lesson_manifest(db, lesson_id)
         db.session.commit()
 
         # ---------------------------
@@ -1329,34 +1307,7 @@ def activity_list(class_id):
     """), {"class_id": class_id, "teacher_id": teacher_id}).fetchone()
 
     # Fetch activities under this class with submission stats
-    activities = db.session.execute(text("""
-        SELECT 
-            a.id,
-            a.title,
-            a.lesson_id,
-            a.type,
-            a.due_date,
-            a.max_score,
-            a.created_at,
-            COALESCE(sub_count.submitted, 0) AS submitted_count,
-            total_students.total AS student_count,
-            COALESCE(total_students.total, 0) - COALESCE(sub_count.submitted, 0) AS not_submitted_count
-        FROM Activity a
-        -- Count submissions per activity
-        LEFT JOIN (
-            SELECT activity_id, COUNT(*) AS submitted
-            FROM ActivitySubmission
-            GROUP BY activity_id
-        ) sub_count ON sub_count.activity_id = a.id
-        -- Count total students in class
-        LEFT JOIN (
-            SELECT COUNT(*) AS total
-            FROM ClassStudent
-            WHERE class_id = :class_id
-        ) total_students ON 1=1
-        WHERE a.class_id = :class_id
-        ORDER BY a.created_at DESC
-    """), {"class_id": class_id}).fetchall()
+    activities = db.session.execute(text(CLASS_ACTIVITIES_QUERY), {"class_id": class_id}).fetchall()
 
     return render_template(
         "teacher/classes/activity_list.html",
@@ -1376,7 +1327,9 @@ def delete_activity(activity_id):
         return redirect(request.referrer or url_for("teacher.dashboard"))
 
     # Delete activity (submissions and files will cascade)
+    remove_activity_from_summary(db, activity_id)
     db.session.execute(text("DELETE FROM Activity WHERE id = :aid"), {"aid": activity_id})
+    refresh_lesson_manifest(db, activity.lesson_id)
     db.session.commit()
     flash("Assignment deleted successfully.", "success")
     return redirect(url_for("teacher.activity_form", lesson_id=activity.lesson_id))
@@ -1507,8 +1460,17 @@ def grade_submission(submission_id):
         SET score = :score, feedback = :feedback
         WHERE id = :sid
     """), {"score": score, "feedback": feedback, "sid": submission_id})
+    refresh_grade_summary(db, sub.class_id, [sub.student_id])
+    log_activity_event(db, EVENT_SUBMISSION_GRADED, sub.student_id, sub.activity_id, score)
 
     db.session.commit()
+    totals = student_grade(db, sub.student_id, sub.class_id)
+    publish(
+        class_audience(db, sub.class_id, sub.student_id), EVENT_SUBMISSION_GRADED,
+        class_id=sub.class_id, activity_id=sub.activity_id, student_id=sub.student_id,
+        score=score, max_score=sub.max_score, class_total=totals["total_score"],
+        class_possible=totals["max_score"], class_percentage=totals["overall_percentage"]
+    )
 
     flash("Grade saved successfully!", "success")
     return redirect(url_for("teacher.view_activity_submissions", activity_id=sub.activity_id))